@@ -1,20 +1,57 @@
 import argparse
 import asyncio
 import json
+import re
+import sys
+from typing import Any, Dict, List, Optional
 
+from python_client.benchmark import WORKLOADS, run_transport_benchmark
 from python_client.client import (
     DEFAULT_LEDGER_HOST,
     DEFAULT_LEDGER_PORT,
     DEFAULT_PARTY,
+    DEFAULT_TRANSPORT,
+    TRANSPORTS,
     RealEstateHandler,
 )
+from python_client.cid_index import DEFAULT_CID_CACHE_DIR, cid_cache_path
+from python_client.export import DEFAULT_BATCH_SIZE, FORMATS, export_registry
+from python_client.history import DEFAULT_HISTORY_DIR, history_path
+from python_client.json_api import DEFAULT_JSON_API_SECRET, DEFAULT_JSON_API_URL
+from python_client.retry import DuplicateCommandError
+from python_client.order_book import MatchingEngine
+from python_client.read_model import serve_read_model
+from python_client.reconcile import reconcile_mirror
+from python_client.search import MODES as SEARCH_MODES
+from python_client.workload import replay_trace
 
 
-def parse_args() -> argparse.Namespace:
+def add_target_arguments(cmd: argparse.ArgumentParser) -> None:
+    target = cmd.add_mutually_exclusive_group(required=True)
+    target.add_argument("--cid", help="RealEstate contract id")
+    target.add_argument("--property-id", help="propertyId; the current contract id is resolved through the local cache")
+
+
+def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(description="dazl gRPC client for RealEstate template.")
     parser.add_argument("--host", default=DEFAULT_LEDGER_HOST)
     parser.add_argument("--port", type=int, default=DEFAULT_LEDGER_PORT)
     parser.add_argument("--party", default=DEFAULT_PARTY, help="Default party for list; required for exercises.")
+    parser.add_argument("--rate-limit", type=float, help="cap on ledger submissions per second (on top of adaptive concurrency)")
+    parser.add_argument("--timeout", type=float, help="deadline in seconds for each ledger call")
+    parser.add_argument("--hedge-reads", action="store_true", help="re-issue slow list reads after their p95 latency")
+    parser.add_argument("--transport", choices=TRANSPORTS, default=DEFAULT_TRANSPORT, help="ledger API: gRPC or HTTP JSON API")
+    parser.add_argument("--json-api-url", default=DEFAULT_JSON_API_URL, help="JSON API base URL for --transport json")
+    parser.add_argument("--json-api-secret", default=DEFAULT_JSON_API_SECRET,
+                        help="HS256 key signing JSON API tokens (default JSON_API_SECRET)")
+    parser.add_argument("--read-endpoints", nargs="+", help="extra participants (host:port) to balance list reads across")
+    parser.add_argument("--read-fanout", action="store_true", help="read from all participants and merge by contract id")
+    parser.add_argument("--cid-cache-dir", default=DEFAULT_CID_CACHE_DIR,
+                        help="directory of the persistent propertyId -> contract id caches used by --property-id")
+    parser.add_argument("--no-cid-cache", action="store_true", help="resolve --property-id from the ledger without the local cache")
+    parser.add_argument("--history-dir", default=DEFAULT_HISTORY_DIR,
+                        help="directory of the registry history (checkpoints and delta log) used by --as-of")
+    parser.add_argument("--trace", help="append every ledger call (parties and contract ids anonymized) to this trace file")
     sub = parser.add_subparsers(dest="cmd", required=True)
 
     create_cmd = sub.add_parser("create", help="Create a RealEstate contract")
@@ -28,23 +65,59 @@ def parse_args() -> argparse.Namespace:
     create_cmd.add_argument("--price", required=True, help="asking price, decimal")
     create_cmd.add_argument("--currency", required=True, help="currency code, e.g. USD")
     create_cmd.add_argument("--listed", action="store_true", help="mark as listed on creation")
+    create_cmd.add_argument("--history-limit", type=int, help="owners kept in on-ledger history; 0 = count + last owner only")
+    create_cmd.add_argument("--idempotency-key", help="re-running with the same key does not create a second contract")
+
+    bulk_cmd = sub.add_parser("bulk-create", help="Register many properties via the registrar's Registry")
+    bulk_cmd.add_argument("--registrar", required=True)
+    bulk_cmd.add_argument("--file", required=True, help="NDJSON file with one property per line (create options as keys)")
+    bulk_cmd.add_argument("--chunk-size", type=int, default=200, help="properties per transaction")
+    bulk_cmd.add_argument("--history-limit", type=int, help="owners kept in on-ledger history; 0 = count + last owner only")
+    bulk_cmd.add_argument("--idempotency-key", help="re-running with the same key and file skips chunks already registered")
+
+    lineage_cmd = sub.add_parser("lineage", help="Full owner lineage rebuilt from the transaction stream")
+    lineage_cmd.add_argument("--party", help="Party to query as; defaults to --party")
+    lineage_cmd.add_argument("--property-id", nargs="+", help="only these propertyIds")
 
     transfer_cmd = sub.add_parser("transfer", help="Transfer a RealEstate contract to a new owner")
-    transfer_cmd.add_argument("--cid", required=True)
+    add_target_arguments(transfer_cmd)
     transfer_cmd.add_argument("--new-owner", required=True)
     transfer_cmd.add_argument("--party", required=True, help="Current owner")
 
     update_cmd = sub.add_parser("update-meta", help="Update metadata JSON for a RealEstate contract")
-    update_cmd.add_argument("--cid", required=True)
+    add_target_arguments(update_cmd)
     update_cmd.add_argument("--meta-json", required=True)
     update_cmd.add_argument("--party", required=True, help="Current owner")
 
     archive_cmd = sub.add_parser("archive", help="Archive a RealEstate contract")
-    archive_cmd.add_argument("--cid", required=True)
+    add_target_arguments(archive_cmd)
     archive_cmd.add_argument("--party", required=True, help="Registrar")
 
     list_cmd = sub.add_parser("list", help="List RealEstate contracts visible to the party")
     list_cmd.add_argument("--party", help="Party to query as; defaults to --party")
+    list_cmd.add_argument("--where", nargs="+", help="filters on fields and metaJson attributes, e.g. 'meta.rooms==3' 'area>=50'")
+    geo_filter = list_cmd.add_mutually_exclusive_group()
+    geo_filter.add_argument("--near", nargs=3, type=float, metavar=("LAT", "LON", "KM"),
+                            help="only properties with metaJson coordinates within KM of the point, nearest first")
+    geo_filter.add_argument("--bbox", nargs=4, type=float, metavar=("SOUTH", "WEST", "NORTH", "EAST"),
+                            help="only properties with metaJson coordinates inside the box")
+    list_cmd.add_argument("--as-of", help="list the registry at a ledger offset or ISO time, e.g. 2026-03-01T12:00:00Z")
+
+    search_cmd = sub.add_parser("search", help="Search properties by address, propertyId or type")
+    search_cmd.add_argument("query", help="text to search for; typos are tolerated in fuzzy/auto mode")
+    search_cmd.add_argument("--party", help="Party to query as; defaults to --party")
+    search_cmd.add_argument("--mode", choices=list(SEARCH_MODES), default="auto")
+    search_cmd.add_argument("--limit", type=int, default=20)
+
+    export_cmd = sub.add_parser("export", help="Export RealEstate and Cash contracts to Parquet or Arrow files")
+    export_cmd.add_argument("--party", help="Party to query as; defaults to --party")
+    export_cmd.add_argument("--format", choices=FORMATS, default="parquet")
+    export_cmd.add_argument("--out", default="export", help="output directory; one file per template")
+    export_cmd.add_argument("--template", nargs="+", choices=["RealEstate", "Cash"], help="only these templates")
+    export_cmd.add_argument("--where", nargs="+", help="filters on fields and metaJson attributes, as for list")
+    export_cmd.add_argument("--as-of", help="ledger offset or ISO time to export the state at")
+    export_cmd.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="rows per record batch")
+    export_cmd.add_argument("--compression", default="zstd", help="codec, e.g. zstd, lz4, snappy (parquet) or none")
 
     alloc_cmd = sub.add_parser("allocate-parties", help="Ensure parties exist on ledger")
     alloc_cmd.add_argument("--parties", nargs="+", required=True, help="Party hints/display names to ensure")
@@ -52,39 +125,116 @@ def parse_args() -> argparse.Namespace:
     sub.add_parser("list-parties", help="List known parties")
 
     list_for_sale_cmd = sub.add_parser("list-for-sale", help="List a property for sale")
-    list_for_sale_cmd.add_argument("--cid", required=True)
+    add_target_arguments(list_for_sale_cmd)
     list_for_sale_cmd.add_argument("--price", required=True)
     list_for_sale_cmd.add_argument("--currency", required=True)
     list_for_sale_cmd.add_argument("--party", required=True, help="Current owner")
 
     delist_cmd = sub.add_parser("delist", help="Remove a property from sale")
-    delist_cmd.add_argument("--cid", required=True)
+    add_target_arguments(delist_cmd)
     delist_cmd.add_argument("--party", required=True, help="Current owner")
 
     buy_cmd = sub.add_parser("buy", help="Purchase a listed property")
-    buy_cmd.add_argument("--cid", required=True)
+    add_target_arguments(buy_cmd)
     buy_cmd.add_argument("--price", required=True, help="expected price")
     buy_cmd.add_argument("--currency", required=True, help="expected currency")
     buy_cmd.add_argument("--party", required=True, help="Acting party (seller/owner)")
     buy_cmd.add_argument("--buyer", required=True, help="New owner")
     buy_cmd.add_argument("--seller", required=True, help="Current owner/seller")
-    buy_cmd.add_argument("--payment-cid", required=True, help="Cash contract to transfer to seller")
+    buy_cmd.add_argument("--payment-cid", help="Cash contract to transfer to seller; default: pick from the buyer's wallet")
 
     mint_cash_cmd = sub.add_parser("mint-cash", help="Mint cash for a user")
     mint_cash_cmd.add_argument("--issuer", required=True)
     mint_cash_cmd.add_argument("--owner", required=True)
     mint_cash_cmd.add_argument("--amount", required=True)
     mint_cash_cmd.add_argument("--currency", required=True)
+    mint_cash_cmd.add_argument("--idempotency-key", help="re-running with the same key does not mint twice")
+
+    split_cash_cmd = sub.add_parser("split-cash", help="Split a cash holding in two")
+    split_cash_cmd.add_argument("--cid", required=True)
+    split_cash_cmd.add_argument("--amount", required=True, help="amount of the split-off part")
+    split_cash_cmd.add_argument("--party", required=True, help="Cash owner")
+
+    merge_cash_cmd = sub.add_parser("merge-cash", help="Merge cash holdings of one issuer/currency")
+    merge_cash_cmd.add_argument("--cid", required=True)
+    merge_cash_cmd.add_argument("--others", nargs="+", required=True, help="cash cids merged into --cid")
+    merge_cash_cmd.add_argument("--party", required=True, help="Cash owner")
 
     list_cash_cmd = sub.add_parser("list-cash", help="List cash visible to a party")
     list_cash_cmd.add_argument("--party", help="Party to query as; defaults to --party")
-    return parser.parse_args()
+
+    seed_cmd = sub.add_parser("seed", help="Allocate parties, mint cash and register synthetic properties")
+    seed_cmd.add_argument("--registrar", default="Registrar")
+    seed_cmd.add_argument("--prefix", default="Seed", help="party hint / propertyId prefix")
+    seed_cmd.add_argument("--parties", type=int, default=10, help="number of owner parties to allocate")
+    seed_cmd.add_argument("--properties", type=int, default=100, help="number of properties to register")
+    seed_cmd.add_argument("--cash", default="1000000.0", help="cash minted per party, decimal")
+    seed_cmd.add_argument("--currency", default="USD")
+    seed_cmd.add_argument("--rate", type=float, default=0.0, help="target submissions per second, 0 = unlimited")
+    seed_cmd.add_argument("--concurrency", type=int, default=16, help="max submissions in flight")
+
+    match_cmd = sub.add_parser("match", help="Match buyer bids against listed properties and settle them")
+    match_cmd.add_argument("--bids", required=True, help="NDJSON file: buyer, max-price, currency[, property-type, property-id]")
+    match_cmd.add_argument("--party", help="Party whose view of listings is matched; defaults to --party")
+    match_cmd.add_argument("--batch-size", type=int, default=50, help="settlements per batch")
+    match_cmd.add_argument("--concurrency", type=int, default=16, help="max settlements in flight")
+    match_cmd.add_argument("--rounds", type=int, default=10, help="max match/settle rounds")
+
+    bench_cmd = sub.add_parser("bench-transport", help="Compare gRPC and JSON API latency/throughput")
+    bench_cmd.add_argument("--party", help="Party to run as (owner of properties for the exercise workload); defaults to --party")
+    bench_cmd.add_argument("--transports", nargs="+", choices=TRANSPORTS, default=list(TRANSPORTS))
+    bench_cmd.add_argument("--workloads", nargs="+", choices=WORKLOADS, default=list(WORKLOADS))
+    bench_cmd.add_argument("--iterations", type=int, default=200, help="measured operations per workload")
+    bench_cmd.add_argument("--concurrency", type=int, default=8, help="operations in flight")
+
+    replay_cmd = sub.add_parser("replay", help="Re-run a recorded --trace against a ledger and compare latencies")
+    replay_cmd.add_argument("trace_file", help="trace written with --trace")
+    replay_cmd.add_argument("--speed", type=replay_speed, default=1.0,
+                            help="time scale: 1 replays at the recorded pace, N is N times faster, 'max' runs without pauses")
+    replay_cmd.add_argument("--concurrency", type=int, default=64, help="calls in flight at --speed max")
+    replay_cmd.add_argument("--party-prefix", default="Replay", help="prefix of the parties allocated for anonymized ones")
+
+    watch_cmd = sub.add_parser("watch", help="Stream RealEstate/Cash events as NDJSON")
+    watch_cmd.add_argument("--party", help="Party to subscribe as; defaults to --party")
+    watch_cmd.add_argument("--offset", help="offset to start after; 'begin' for the whole ledger, default: ledger end")
+    watch_cmd.add_argument("--template", nargs="+", choices=["RealEstate", "Cash"], help="only these templates")
+    watch_cmd.add_argument("--involving", nargs="+", help="only events where one of these parties is a stakeholder or actor")
+    watch_cmd.add_argument("--property-id", nargs="+", help="only events for these propertyIds")
+
+    read_model_cmd = sub.add_parser("read-model", help="Serve an indexed ledger mirror over local HTTP")
+    read_model_cmd.add_argument("--party", help="Party to subscribe as; defaults to --party")
+    read_model_cmd.add_argument("--bind", default="127.0.0.1")
+    read_model_cmd.add_argument("--http-port", type=int, default=8780)
+    read_model_cmd.add_argument("--reconcile-interval", type=float, help="seconds between ACS reconciliations of the mirror")
+
+    reconcile_cmd = sub.add_parser("reconcile", help="Compare a running read-model with the ledger ACS by bucket hashes")
+    reconcile_cmd.add_argument("--party", help="Party the read-model runs as; defaults to --party")
+    reconcile_cmd.add_argument("--read-model", default="http://127.0.0.1:8780", help="read-model base URL")
+
+    batch_cmd = sub.add_parser("batch", help="Run NDJSON command lines over a shared connection")
+    batch_cmd.add_argument("--file", required=True, help="NDJSON file with one command object per line, '-' for stdin")
+    batch_cmd.add_argument("--parallel", type=int, default=1, help="max lines in flight; lines referencing $N wait for line N")
+    return parser
+
+
+def replay_speed(value: str) -> Optional[float]:
+    if value == "max":
+        return None
+    speed = float(value)
+    if speed <= 0:
+        raise argparse.ArgumentTypeError("speed must be positive or 'max'")
+    return speed
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    return build_parser().parse_args(argv)
 
 
 def party_for_command(args: argparse.Namespace) -> str:
-    if args.cmd == "create":
+    if args.cmd in {"create", "bulk-create"}:
         return args.registrar or args.party
-    if args.cmd in {"transfer", "update-meta", "archive", "list", "list-for-sale", "delist", "list-cash"}:
+    if args.cmd in {"transfer", "update-meta", "archive", "list", "search", "export", "list-for-sale", "delist", "list-cash", "watch", "read-model",
+                    "split-cash", "merge-cash", "lineage", "match", "bench-transport", "reconcile"}:
         return args.party
     if args.cmd == "allocate-parties":
         return args.party or (args.parties[0] if args.parties else DEFAULT_PARTY)
@@ -94,75 +244,453 @@ def party_for_command(args: argparse.Namespace) -> str:
         return args.owner
     if args.cmd == "buy":
         return args.buyer
+    if args.cmd == "seed":
+        return args.registrar
     return DEFAULT_PARTY
 
 
-async def run_command(args: argparse.Namespace) -> dict:
+async def execute_command(handler: RealEstateHandler, args: argparse.Namespace) -> Any:
+    if args.cmd == "create":
+        return await handler.create_property_async(
+            registrar=args.registrar,
+            owner=args.owner,
+            property_id=args.property_id,
+            address=args.address,
+            property_type=args.property_type,
+            area=args.area,
+            meta_json=args.meta_json,
+            price=args.price,
+            currency=args.currency,
+            listed=args.listed,
+            history_limit=args.history_limit,
+            idempotency_key=args.idempotency_key,
+        )
+    if args.cmd == "bulk-create":
+        return await handler.bulk_create_properties_async(
+            registrar=args.registrar,
+            properties=[
+                {k.replace("-", "_"): v for k, v in line.items()}
+                for line in _read_batch(args.file)
+            ],
+            chunk_size=args.chunk_size,
+            history_limit=args.history_limit,
+            idempotency_key=args.idempotency_key,
+        )
+    if args.cmd == "lineage":
+        lineage = await handler.load_lineage_async(args.property_id)
+        return lineage.to_dict()
+    if args.cmd == "transfer":
+        return await handler.transfer_property_async(
+            contract_id=args.cid,
+            new_owner=args.new_owner,
+            property_id=args.property_id,
+        )
+    if args.cmd == "update-meta":
+        return await handler.update_meta_async(
+            contract_id=args.cid,
+            meta_json=args.meta_json,
+            property_id=args.property_id,
+        )
+    if args.cmd == "archive":
+        return await handler.archive_property_async(contract_id=args.cid, property_id=args.property_id)
+    if args.cmd == "list":
+        if args.near or args.bbox:
+            handler.geo.load(await handler.list_properties_async(where=args.where, as_of=args.as_of))
+            return handler.geo.within(*args.near) if args.near else handler.geo.bbox(*args.bbox)
+        return await handler.list_properties_async(where=args.where, as_of=args.as_of)
+    if args.cmd == "search":
+        return await handler.search_properties_async(args.query, limit=args.limit, mode=args.mode)
+    if args.cmd == "export":
+        return await export_registry(
+            handler, args.out, args.format,
+            templates=tuple(f"RealEstate:{t}" for t in args.template or ["RealEstate", "Cash"]),
+            batch_size=args.batch_size,
+            where=args.where,
+            as_of=args.as_of,
+            compression=args.compression,
+        )
+    if args.cmd == "list-for-sale":
+        return await handler.list_for_sale_async(
+            contract_id=args.cid,
+            price=args.price,
+            currency=args.currency,
+            property_id=args.property_id,
+        )
+    if args.cmd == "delist":
+        return await handler.delist_property_async(contract_id=args.cid, property_id=args.property_id)
+    if args.cmd == "buy":
+        return await handler.buy_property_async(
+            contract_id=args.cid,
+            price=args.price,
+            currency=args.currency,
+            buyer=args.buyer,
+            payment_cid=args.payment_cid,
+            seller=args.seller,
+            property_id=args.property_id,
+        )
+    if args.cmd == "allocate-parties":
+        return await handler.allocate_parties_async(hints=args.parties)
+    if args.cmd == "list-parties":
+        return await handler.list_parties_async()
+    if args.cmd == "mint-cash":
+        return await handler.mint_cash_async(
+            issuer=args.issuer,
+            owner=args.owner,
+            amount=args.amount,
+            currency=args.currency,
+            idempotency_key=args.idempotency_key,
+        )
+    if args.cmd == "list-cash":
+        return await handler.list_cash_async()
+    if args.cmd == "split-cash":
+        return await handler.split_cash_async(contract_id=args.cid, amount=args.amount)
+    if args.cmd == "merge-cash":
+        return await handler.merge_cash_async(contract_id=args.cid, other_cids=args.others)
+    if args.cmd == "seed":
+        return await run_seed(handler, args)
+    if args.cmd == "match":
+        return await run_match(handler, args)
+    if args.cmd == "reconcile":
+        return await reconcile_mirror(handler, args.read_model)
+    raise SystemExit(f"Unknown command: {args.cmd}")
+
+
+async def run_paced(jobs: List[Any], rate: float, concurrency: int) -> Dict[str, Any]:
+    window = asyncio.Semaphore(max(1, concurrency))
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    stats: Dict[str, Any] = {"ok": 0, "duplicate": 0, "failed": 0, "errors": []}
+
+    async def run(job) -> None:
+        try:
+            await job()
+            stats["ok"] += 1
+        except DuplicateCommandError:
+            stats["duplicate"] += 1
+        except Exception as ex:
+            stats["failed"] += 1
+            if len(stats["errors"]) < 10:
+                stats["errors"].append(f"{type(ex).__name__}: {ex}")
+        finally:
+            window.release()
+
+    tasks = []
+    for i, job in enumerate(jobs):
+        if rate > 0:
+            delay = start + i / rate - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        await window.acquire()
+        tasks.append(asyncio.create_task(run(job)))
+    await asyncio.gather(*tasks)
+    stats["seconds"] = round(loop.time() - start, 3)
+    stats["rate"] = round(len(jobs) / stats["seconds"], 2) if stats["seconds"] else None
+    return stats
+
+
+_SEED_TYPES = ("apartment", "house", "loft", "land")
+
+
+async def run_seed(handler: RealEstateHandler, args: argparse.Namespace) -> Dict[str, Any]:
+    hints = [f"{args.prefix}{i:05d}" for i in range(1, args.parties + 1)]
+    allocated = await handler.allocate_parties_async([args.registrar, *hints], concurrency=args.concurrency)
+    resolved = await handler.resolve_parties_async([args.registrar, *hints])
+    registrar = resolved[args.registrar]
+    owners = [resolved[h] for h in hints] or [registrar]
+
+    cash_jobs = [
+        lambda owner=owner: handler.mint_cash_async(
+            issuer=registrar, owner=owner, amount=args.cash, currency=args.currency,
+            idempotency_key=f"seed:{args.prefix}:cash:{owner}",
+        )
+        for owner in owners
+    ]
+    property_jobs = [
+        lambda i=i: handler.create_property_async(
+            registrar=registrar,
+            owner=owners[i % len(owners)],
+            property_id=f"{args.prefix}-P{i:06d}",
+            address=f"{i} Synthetic St",
+            property_type=_SEED_TYPES[i % len(_SEED_TYPES)],
+            area=f"{40 + i % 160}.0",
+            meta_json=json.dumps({"rooms": 1 + i % 5, "seed": True}),
+            price=f"{100000 + (i % 50) * 5000}.0",
+            currency=args.currency,
+            listed=i % 2 == 0,
+            idempotency_key=f"seed:{args.prefix}:property:{i}",
+        )
+        for i in range(1, args.properties + 1)
+    ]
+    return {
+        "partiesAllocated": len(allocated),
+        "cash": await run_paced(cash_jobs, args.rate, args.concurrency),
+        "properties": await run_paced(property_jobs, args.rate, args.concurrency),
+    }
+
+
+async def run_match(handler: RealEstateHandler, args: argparse.Namespace) -> Dict[str, Any]:
+    engine = MatchingEngine(handler, batch_size=args.batch_size, concurrency=args.concurrency)
+    await engine.refresh()
+    for line in _read_batch(args.bids):
+        bid = {k.replace("-", "_"): v for k, v in line.items()}
+        await engine.place_bid(
+            buyer=bid["buyer"],
+            max_price=bid["max_price"],
+            currency=bid["currency"],
+            property_type=bid.get("property_type"),
+            property_id=bid.get("property_id"),
+        )
+    report = await engine.run(max_rounds=args.rounds)
+    report["unfilled"] = [bid["bidId"] for bid in engine.open_bids()]
+    return report
+
+
+def cid_cache_for(args: argparse.Namespace, party: str) -> Optional[str]:
+    if args.no_cid_cache:
+        return None
+    return cid_cache_path(args.host, args.port, party, args.cid_cache_dir)
+
+
+def history_dir_for(args: argparse.Namespace, party: str) -> str:
+    return history_path(args.host, args.port, party, args.history_dir)
+
+
+async def run_command(args: argparse.Namespace) -> Any:
     party_hint = party_for_command(args)
-    async with RealEstateHandler(host=args.host, port=args.port, party=party_hint) as handler:
-        if args.cmd == "create":
-            return await handler.create_property_async(
-                registrar=args.registrar,
-                owner=args.owner,
-                property_id=args.property_id,
-                address=args.address,
-                property_type=args.property_type,
-                area=args.area,
-                meta_json=args.meta_json,
-                price=args.price,
-                currency=args.currency,
-                listed=args.listed,
-            )
-        if args.cmd == "transfer":
-            return await handler.transfer_property_async(
-                contract_id=args.cid,
-                new_owner=args.new_owner,
-            )
-        if args.cmd == "update-meta":
-            return await handler.update_meta_async(
-                contract_id=args.cid,
-                meta_json=args.meta_json,
-            )
-        if args.cmd == "archive":
-            return await handler.archive_property_async(contract_id=args.cid)
-        if args.cmd == "list":
-            return await handler.list_properties_async()
-        if args.cmd == "list-for-sale":
-            return await handler.list_for_sale_async(
-                contract_id=args.cid,
-                price=args.price,
-                currency=args.currency,
-            )
-        if args.cmd == "delist":
-            return await handler.delist_property_async(contract_id=args.cid)
-        if args.cmd == "buy":
-            return await handler.buy_property_async(
-                contract_id=args.cid,
-                price=args.price,
-                currency=args.currency,
-                buyer=args.buyer,
-                payment_cid=args.payment_cid,
-                seller=args.seller,
-            )
-        if args.cmd == "allocate-parties":
-            return await handler.allocate_parties_async(hints=args.parties)
-        if args.cmd == "list-parties":
-            return await handler.list_parties_async()
-        if args.cmd == "mint-cash":
-            return await handler.mint_cash_async(
-                issuer=args.issuer,
-                owner=args.owner,
-                amount=args.amount,
-                currency=args.currency,
-            )
-        if args.cmd == "list-cash":
-            return await handler.list_cash_async()
-    raise SystemExit("Unknown command")
+    async with RealEstateHandler(host=args.host, port=args.port, party=party_hint, rate_limit=args.rate_limit,
+                                 timeout=args.timeout, hedge_reads=args.hedge_reads,
+                                 transport=args.transport, json_api_url=args.json_api_url,
+                                 json_api_secret=args.json_api_secret,
+                                 read_endpoints=args.read_endpoints, read_fanout=args.read_fanout,
+                                 cid_cache=cid_cache_for(args, party_hint),
+                                 history_dir=history_dir_for(args, party_hint), trace=args.trace) as handler:
+        return await execute_command(handler, args)
+
+
+async def run_bench_transport(args: argparse.Namespace) -> Dict[str, Any]:
+    def make_handler(transport: str) -> RealEstateHandler:
+        return RealEstateHandler(host=args.host, port=args.port, party=party_for_command(args),
+                                 rate_limit=args.rate_limit, timeout=args.timeout,
+                                 transport=transport, json_api_url=args.json_api_url,
+                                 json_api_secret=args.json_api_secret)
+
+    return await run_transport_benchmark(make_handler, args.transports, args.workloads,
+                                         iterations=args.iterations, concurrency=args.concurrency)
+
+
+async def run_replay(args: argparse.Namespace) -> Dict[str, Any]:
+    def make_handler(party: str) -> RealEstateHandler:
+        return RealEstateHandler(host=args.host, port=args.port, party=party, rate_limit=args.rate_limit,
+                                 timeout=args.timeout, transport=args.transport, json_api_url=args.json_api_url,
+                                 json_api_secret=args.json_api_secret)
+
+    return await replay_trace(args.trace_file, make_handler, speed=args.speed,
+                              concurrency=args.concurrency, party_prefix=args.party_prefix)
+
+
+_REF_RE = re.compile(r"^\$(\d+)((?:\.[\w-]+)*)$")
+
+
+def _line_refs(value: Any) -> set:
+    if isinstance(value, str):
+        m = _REF_RE.match(value)
+        return {int(m.group(1))} if m else set()
+    if isinstance(value, dict):
+        return set().union(*(_line_refs(v) for v in value.values()))
+    if isinstance(value, list):
+        return set().union(*(_line_refs(v) for v in value))
+    return set()
+
+
+def _resolve_refs(value: Any, results: Dict[int, Any]) -> Any:
+    if isinstance(value, dict):
+        return {k: _resolve_refs(v, results) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_resolve_refs(v, results) for v in value]
+    if not isinstance(value, str):
+        return value
+    m = _REF_RE.match(value)
+    if not m:
+        return value
+    resolved = results[int(m.group(1))]
+    for key in filter(None, m.group(2).split(".")):
+        resolved = resolved[int(key)] if isinstance(resolved, list) else resolved[key]
+    # contract ids are rendered as {"contractId": ..., "contractType": ...}; unwrap to the raw id
+    while isinstance(resolved, dict) and "contractId" in resolved:
+        resolved = resolved["contractId"]
+    return resolved
+
+
+# subcommands that stream or run until interrupted: a batch line cannot wait for them
+BATCH_UNSUPPORTED = {"batch", "watch", "read-model", "bench-transport", "replay"}
+
+
+def _option_flags(parser: argparse.ArgumentParser) -> set:
+    return {flag for action in parser._actions for flag in action.option_strings}
+
+
+def command_argv(op: Dict[str, Any], parser: Optional[argparse.ArgumentParser] = None) -> List[str]:
+    parser = parser or build_parser()
+    subparsers = next(a for a in parser._actions if isinstance(a, argparse._SubParsersAction))
+    op = dict(op)
+    cmd = str(op.pop("cmd"))
+    command = subparsers.choices.get(cmd)
+    global_flags = _option_flags(parser)
+    command_flags = _option_flags(command) if command is not None else set()
+    before: List[str] = []
+    after: List[str] = []
+    for key, value in op.items():
+        flag = "--" + key.replace("_", "-")
+        # options only the top-level parser knows (--party for list-parties, ...) go before the subcommand
+        argv = before if flag in global_flags and flag not in command_flags else after
+        if value is True:
+            argv.append(flag)
+        elif value is False or value is None:
+            continue
+        elif isinstance(value, list):
+            argv.append(flag)
+            argv.extend(str(v) for v in value)
+        elif isinstance(value, dict):
+            argv.extend([flag, json.dumps(value)])
+        else:
+            argv.extend([flag, str(value)])
+    return [*before, cmd, *after]
+
+
+def _read_batch(path: str) -> List[Dict[str, Any]]:
+    stream = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    with stream:
+        return [json.loads(line) for line in stream if line.strip()]
+
+
+async def run_batch(args: argparse.Namespace) -> None:
+    ops = _read_batch(args.file)
+    results: Dict[int, Any] = {}
+    done: Dict[int, asyncio.Event] = {n: asyncio.Event() for n in range(1, len(ops) + 1)}
+    failed: set = set()
+    window = asyncio.Semaphore(max(1, args.parallel))
+    # with --parallel 1 lines keep their file order even without explicit $N references
+    ordered = args.parallel <= 1
+
+    def emit(record: Dict[str, Any]) -> None:
+        print(json.dumps(record), flush=True)
+
+    async def run_line(n: int, op: Dict[str, Any], handler: RealEstateHandler) -> None:
+        try:
+            refs = _line_refs(op)
+            bad = sorted(d for d in refs if d < 1 or d >= n)
+            if bad:
+                raise ValueError(f"line {n} references lines {bad} that do not precede it")
+            for dep in sorted(refs | ({n - 1} if ordered and n > 1 else set())):
+                await done[dep].wait()
+            if refs & failed:
+                raise RuntimeError(f"referenced lines failed: {sorted(refs & failed)}")
+            async with window:
+                if op.get("cmd") in BATCH_UNSUPPORTED:
+                    raise ValueError(f"{op.get('cmd')} is not supported in a batch")
+                try:
+                    line_args = parse_args(command_argv(_resolve_refs(op, results)))
+                except SystemExit:
+                    raise ValueError(f"invalid command: {op}") from None
+                actor = await handler.with_party(party_for_command(line_args) or handler.party)
+                result = await execute_command(actor, line_args)
+            results[n] = result
+            emit({"line": n, "ok": True, "result": result})
+        except Exception as ex:
+            failed.add(n)
+            emit({"line": n, "ok": False, "error": f"{type(ex).__name__}: {ex}"})
+        finally:
+            done[n].set()
+
+    async with RealEstateHandler(host=args.host, port=args.port, party=args.party, rate_limit=args.rate_limit,
+                                 timeout=args.timeout, hedge_reads=args.hedge_reads,
+                                 transport=args.transport, json_api_url=args.json_api_url,
+                                 json_api_secret=args.json_api_secret,
+                                 read_endpoints=args.read_endpoints, read_fanout=args.read_fanout,
+                                 cid_cache=cid_cache_for(args, args.party),
+                                 history_dir=history_dir_for(args, args.party), trace=args.trace) as handler:
+        await asyncio.gather(*(run_line(n, op, handler) for n, op in enumerate(ops, start=1)))
+
+
+_STAKEHOLDER_FIELDS = ("owner", "registrar", "issuer")
+
+
+def _track_live(live: Dict[str, Dict[str, Any]], event: Dict[str, Any]) -> None:
+    if event["event"] == "created":
+        live[event["contractId"]] = event["payload"]
+    elif event["event"] == "archived":
+        live.pop(event["contractId"], None)
+
+
+async def run_watch(args: argparse.Namespace) -> None:
+    async with RealEstateHandler(host=args.host, port=args.port, party=party_for_command(args)) as handler:
+        involving = set((await handler.resolve_parties_async(args.involving or [])).values())
+        property_ids = set(args.property_id or [])
+        templates = [f"RealEstate:{t}" for t in args.template or ["RealEstate", "Cash"]]
+        # payload of live contracts, so archives and choices can be filtered like creates
+        live: Dict[str, Dict[str, Any]] = {}
+        filtered = bool(property_ids or involving)
+        if args.offset == "begin":
+            offset = None
+        elif args.offset:
+            offset = args.offset
+            if filtered:
+                # no snapshot at a past offset: replay the stream up to it
+                async for event in handler.stream_events_async(None, templates, end_offset=offset):
+                    _track_live(live, event)
+        elif filtered:
+            # start at the snapshot offset so contracts created before the watch are known
+            offset = None
+            async for record in handler.iter_snapshot_async(templates):
+                if "contractId" in record:
+                    live[record["contractId"]] = record["payload"]
+                else:
+                    offset = record["offset"]
+            offset = offset or await handler.get_ledger_end_async()
+        else:
+            offset = await handler.get_ledger_end_async()
+
+        def matches(event: Dict[str, Any]) -> bool:
+            payload = event.get("payload") or live.get(event["contractId"])
+            if property_ids and (payload is None or payload.get("propertyId") not in property_ids):
+                return False
+            if involving:
+                parties = set(event.get("actingParties", []))
+                if payload is not None:
+                    parties.update(payload.get(f) for f in _STAKEHOLDER_FIELDS)
+                if not parties & involving:
+                    return False
+            return True
+
+        async for event in handler.stream_events_async(offset=offset, templates=templates):
+            if matches(event):
+                print(json.dumps(event), flush=True)
+            _track_live(live, event)
+
+
+async def run_read_model(args: argparse.Namespace) -> None:
+    async with RealEstateHandler(host=args.host, port=args.port, party=party_for_command(args)) as handler:
+        await serve_read_model(handler, host=args.bind, port=args.http_port,
+                               reconcile_interval=args.reconcile_interval)
 
 
 def main() -> None:
     args = parse_args()
-    output = asyncio.run(run_command(args))
+    if args.cmd == "batch":
+        asyncio.run(run_batch(args))
+        return
+    if args.cmd in {"watch", "read-model"}:
+        try:
+            asyncio.run(run_watch(args) if args.cmd == "watch" else run_read_model(args))
+        except KeyboardInterrupt:
+            pass
+        return
+    if args.cmd == "bench-transport":
+        output = asyncio.run(run_bench_transport(args))
+    elif args.cmd == "replay":
+        output = asyncio.run(run_replay(args))
+    else:
+        output = asyncio.run(run_command(args))
     print(json.dumps(output, indent=2))
 
 
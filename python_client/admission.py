@@ -0,0 +1,156 @@
+import asyncio
+import contextlib
+import time
+from typing import Any, Dict, Optional
+
+
+# fragments of errors meaning the participant is overloaded rather than the command is invalid
+OVERLOAD_MARKERS = (
+    "RESOURCE_EXHAUSTED",
+    "DEADLINE_EXCEEDED",
+    "UNAVAILABLE",
+    "BACKPRESSURE",
+    "timed out",
+)
+
+
+def is_overload_error(ex: BaseException) -> bool:
+    """
+    Проверяет, сигнализирует ли ошибка о перегрузке участника леджера.
+    """
+    if isinstance(ex, asyncio.TimeoutError):
+        return True
+    text = str(ex)
+    return any(marker in text for marker in OVERLOAD_MARKERS)
+
+
+class TokenBucket:
+    """
+    Ограничитель частоты отправки: не более rate команд в секунду в среднем
+    и не более burst подряд.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self._tokens = self.burst
+        self._stamp = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """
+        Ждет, пока в корзине появится токен, и забирает его.
+        """
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+                self._stamp = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class AdaptiveLimiter:
+    """
+    Адаптивное ограничение числа одновременных команд к леджеру (AIMD).
+
+    Лимит растет на 1 за каждое окно успешных команд (аддитивно), пока
+    задержка команды не превышает базовую (минимальную наблюдаемую) более
+    чем в tolerance раз. При росте задержки выше порога или при ошибке
+    перегрузки (таймаут, RESOURCE_EXHAUSTED и т.п.) лимит умножается на
+    backoff, не чаще одного раза за время одной команды. Ошибки самих
+    команд (валидация, авторизация) лимит не меняют.
+
+    Опционально поверх лимита действует TokenBucket с жестким потолком частоты.
+    """
+
+    def __init__(self, initial: int = 8, min_limit: int = 1, max_limit: int = 256,
+                 tolerance: float = 2.0, backoff: float = 0.7,
+                 rate: Optional[float] = None, burst: Optional[float] = None):
+        """
+        Args:
+            initial: Начальный лимит одновременных команд.
+            min_limit: Нижняя граница лимита.
+            max_limit: Верхняя граница лимита.
+            tolerance: Во сколько раз задержка может превышать базовую без снижения лимита.
+            backoff: Множитель лимита при перегрузке.
+            rate: Потолок частоты (команд в секунду); None — без ограничения.
+            burst: Размер всплеска для rate (по умолчанию max(1, rate)).
+        """
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.bucket = TokenBucket(rate, burst) if rate else None
+        self.in_flight = 0
+        self.baseline: Optional[float] = None  # minimal observed latency, seconds
+        self.last_latency: Optional[float] = None
+        self.overloads = 0
+        self._last_decrease = 0.0
+        self._cond = asyncio.Condition()
+
+    def _decrease(self, now: float, latency: float) -> None:
+        if now - self._last_decrease < max(latency, self.baseline or 0.0):
+            return
+        self._last_decrease = now
+        self.overloads += 1
+        self.limit = max(float(self.min_limit), self.limit * self.backoff)
+
+    def _record(self, latency: float, overloaded: bool) -> None:
+        now = time.monotonic()
+        self.last_latency = latency
+        if overloaded:
+            self._decrease(now, latency)
+            return
+        if self.baseline is None or latency < self.baseline:
+            self.baseline = latency
+        else:
+            # let the baseline drift up slowly so a permanently slower participant is not punished forever
+            self.baseline += (latency - self.baseline) * 0.01
+        if latency > self.baseline * self.tolerance:
+            self._decrease(now, latency)
+        else:
+            self.limit = min(float(self.max_limit), self.limit + 1.0 / self.limit)
+
+    @contextlib.asynccontextmanager
+    async def slot(self):
+        """
+        Контекст одной команды к леджеру: ждет свободного места в лимите
+        (и токена, если задан rate), измеряет задержку и корректирует лимит.
+        """
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+        if self.bucket is not None:
+            await self.bucket.acquire()
+        started = time.monotonic()
+        overloaded = False
+        try:
+            yield
+        except BaseException as ex:
+            overloaded = is_overload_error(ex)
+            if not overloaded:
+                started = None
+            raise
+        finally:
+            if started is not None:
+                self._record(time.monotonic() - started, overloaded)
+            async with self._cond:
+                self.in_flight -= 1
+                self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Возвращает текущее состояние ограничителя.
+        """
+        return {
+            "limit": int(self.limit),
+            "inFlight": self.in_flight,
+            "baselineMs": round(self.baseline * 1000, 1) if self.baseline is not None else None,
+            "lastLatencyMs": round(self.last_latency * 1000, 1) if self.last_latency is not None else None,
+            "overloads": self.overloads,
+            "rate": self.bucket.rate if self.bucket is not None else None,
+        }
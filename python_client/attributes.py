@@ -0,0 +1,322 @@
+import bisect
+import decimal
+import json
+import re
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+
+PROPERTY_TEMPLATE = "RealEstate:RealEstate"
+
+# payload fields indexed next to the metaJson attributes, with their Daml types
+PAYLOAD_COLUMNS = {
+    "propertyId": "string",
+    "propertyType": "string",
+    "address": "string",
+    "owner": "string",
+    "currency": "string",
+    "listed": "boolean",
+    "area": "number",
+    "price": "number",
+}
+META_PREFIX = "meta."
+
+OPERATORS = ("==", "!=", ">=", "<=", ">", "<")
+_PREDICATE_RE = re.compile(r"^\s*([\w.:\-]+)\s*(==|!=|>=|<=|>|<|=)\s*(.*?)\s*$")
+
+
+class MetaCache:
+    """
+    Кэш разобранного metaJson по cid.
+
+    Контракт неизменяем, поэтому результат разбора для cid действителен,
+    пока контракт существует; новая версия объекта получает новый cid и
+    разбирается один раз. Размер ограничен (вытесняются давно не использованные).
+    """
+
+    def __init__(self, max_size: int = 100000):
+        self.max_size = max_size
+        self._parsed: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, contract_id: str, meta_json: Optional[str]) -> Dict[str, Any]:
+        """
+        Возвращает metaJson контракта как dict (не-объекты и ошибки разбора — {}).
+        """
+        parsed = self._parsed.get(contract_id)
+        if parsed is not None:
+            self.hits += 1
+            self._parsed.move_to_end(contract_id)
+            return parsed
+        self.misses += 1
+        try:
+            parsed = json.loads(meta_json) if meta_json else {}
+        except ValueError:
+            parsed = {}
+        if not isinstance(parsed, dict):
+            parsed = {}
+        self._parsed[contract_id] = parsed
+        if len(self._parsed) > self.max_size:
+            self._parsed.popitem(last=False)
+        return parsed
+
+
+def flatten(meta: Dict[str, Any], prefix: str = META_PREFIX) -> Dict[str, Any]:
+    """
+    Разворачивает вложенные объекты в плоские колонки ("meta.geo.lat").
+
+    Списки и null не индексируются.
+    """
+    result = {}
+    for key, value in meta.items():
+        if isinstance(value, dict):
+            result.update(flatten(value, f"{prefix}{key}."))
+        elif value is not None and not isinstance(value, list):
+            result[f"{prefix}{key}"] = value
+    return result
+
+
+def kind_of(value: Any) -> str:
+    if isinstance(value, bool):
+        return "boolean"
+    if isinstance(value, (int, float, decimal.Decimal)):
+        return "number"
+    return "string"
+
+
+def coerce(value: Any, kind: str) -> Any:
+    """
+    Приводит значение к типу колонки (числа — Decimal, точное сравнение).
+
+    Raises:
+        ValueError: Если значение нельзя привести к типу.
+    """
+    if kind == "number":
+        if isinstance(value, bool):
+            raise ValueError(f"not a number: {value!r}")
+        try:
+            return decimal.Decimal(str(value))
+        except decimal.InvalidOperation:
+            raise ValueError(f"not a number: {value!r}") from None
+    if kind == "boolean":
+        if isinstance(value, bool):
+            return value
+        text = str(value).lower()
+        if text not in ("true", "false", "1", "0"):
+            raise ValueError(f"not a boolean: {value!r}")
+        return text in ("true", "1")
+    return str(value)
+
+
+def parse_predicate(text: str) -> Tuple[str, str, str]:
+    """
+    Разбирает условие вида "meta.rooms==3", "area>=50", "propertyType=loft".
+
+    Returns:
+        (колонка, оператор, значение как строка).
+
+    Raises:
+        ValueError: При неверном синтаксисе.
+    """
+    match = _PREDICATE_RE.match(text)
+    if match is None:
+        raise ValueError(f"invalid predicate {text!r}, expected <column><op><value> with op in {OPERATORS}")
+    column, op, value = match.groups()
+    return column, "==" if op == "=" else op, value
+
+
+class Column:
+    """
+    Типизированная колонка: значения по cid, обратный индекс для равенства
+    и отсортированный список (value, cid) для диапазонов.
+
+    Новые значения дописываются в конец списка, а сортировка выполняется
+    при следующем обращении к нему, поэтому загрузка многих записей подряд
+    не стоит O(n) на каждую вставку.
+    """
+
+    def __init__(self, kind: str):
+        self.kind = kind
+        self.values: Dict[str, Any] = {}
+        self.postings: Dict[Any, Set[str]] = {}
+        self.sorted: List[Tuple[Any, str]] = []
+        self._dirty = False
+
+    def _ensure_sorted(self) -> None:
+        if self._dirty:
+            self.sorted.sort()
+            self._dirty = False
+
+    def add(self, cid: str, value: Any) -> None:
+        self.values[cid] = value
+        self.postings.setdefault(value, set()).add(cid)
+        if self.kind != "boolean":
+            self._dirty = self._dirty or bool(self.sorted and self.sorted[-1] > (value, cid))
+            self.sorted.append((value, cid))
+
+    def remove(self, cid: str) -> None:
+        value = self.values.pop(cid)
+        cids = self.postings[value]
+        cids.discard(cid)
+        if not cids:
+            del self.postings[value]
+        if self.kind != "boolean":
+            self._ensure_sorted()
+            del self.sorted[bisect.bisect_left(self.sorted, (value, cid))]
+
+    def select(self, op: str, value: Any) -> Set[str]:
+        if op == "==":
+            return set(self.postings.get(value, ()))
+        if op == "!=":
+            return {cid for v, cids in self.postings.items() if v != value for cid in cids}
+        if self.kind == "boolean":
+            raise ValueError(f"operator {op} is not supported for boolean columns")
+        self._ensure_sorted()
+        if op in (">", ">="):
+            start = (bisect.bisect_right if op == ">" else bisect.bisect_left)(self.sorted, value, key=lambda e: e[0])
+            return {cid for _, cid in self.sorted[start:]}
+        end = (bisect.bisect_left if op == "<" else bisect.bisect_right)(self.sorted, value, key=lambda e: e[0])
+        return {cid for _, cid in self.sorted[:end]}
+
+
+class AttributeIndex:
+    """
+    Колоночный индекс атрибутов объектов RealEstate.
+
+    Колонки — поля payload (PAYLOAD_COLUMNS) и атрибуты metaJson с префиксом
+    "meta." (вложенные объекты разворачиваются: "meta.geo.lat"). Тип колонки
+    metaJson выводится по значениям: number, string или boolean; значение,
+    не приводимое к типу колонки, хранится в ее строковой тени
+    ("meta.rooms" со значением "3+" — в колонке "meta.rooms:string").
+    Разбор metaJson и раскладка по колонкам выполняются один раз на версию
+    объекта (cid), запрос — пересечение выборок по колонкам без разбора JSON.
+
+    Пример:
+        index.load(await handler.list_properties_async())
+        cids = index.select(["propertyType==apartment", "meta.rooms==3", "area>=50"])
+    """
+
+    def __init__(self, meta_cache: Optional[MetaCache] = None):
+        """
+        Args:
+            meta_cache: Кэш разобранного metaJson (можно разделять между индексами).
+        """
+        self.meta_cache = meta_cache if meta_cache is not None else MetaCache()
+        self.columns: Dict[str, Column] = {
+            name: Column(kind) for name, kind in PAYLOAD_COLUMNS.items()
+        }
+        self._columns_by_cid: Dict[str, List[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._columns_by_cid)
+
+    def __contains__(self, contract_id: str) -> bool:
+        return contract_id in self._columns_by_cid
+
+    def _column_for(self, name: str, value: Any) -> Tuple[str, Any]:
+        column = self.columns.get(name)
+        if column is None:
+            column = self.columns[name] = Column(kind_of(value))
+        try:
+            return name, coerce(value, column.kind)
+        except ValueError:
+            shadow = f"{name}:string"
+            self.columns.setdefault(shadow, Column("string"))
+            return shadow, str(value)
+
+    def add(self, record: Dict[str, Any]) -> None:
+        """
+        Индексирует запись RealEstate ({"contractId", "payload"}); повтор cid игнорируется.
+        """
+        cid = record["contractId"]
+        if cid in self._columns_by_cid:
+            return
+        payload = record["payload"]
+        attributes = {name: payload.get(name) for name in PAYLOAD_COLUMNS if payload.get(name) is not None}
+        attributes.update(flatten(self.meta_cache.get(cid, payload.get("metaJson"))))
+        names = []
+        for name, value in attributes.items():
+            name, value = self._column_for(name, value)
+            self.columns[name].add(cid, value)
+            names.append(name)
+        self._columns_by_cid[cid] = names
+
+    def remove(self, contract_id: str) -> None:
+        """
+        Удаляет контракт из индекса (неизвестные cid игнорируются).
+        """
+        for name in self._columns_by_cid.pop(contract_id, ()):
+            self.columns[name].remove(contract_id)
+
+    def load(self, records: Iterable[Dict[str, Any]]) -> None:
+        """
+        Приводит индекс к полному списку объектов (list_properties_async).
+
+        Уже проиндексированные cid не разбираются повторно: добавляются только
+        новые версии, исчезнувшие удаляются.
+        """
+        records = list(records)
+        current = {r["contractId"] for r in records}
+        for cid in [c for c in self._columns_by_cid if c not in current]:
+            self.remove(cid)
+        for record in records:
+            self.add(record)
+
+    def apply(self, event: Dict[str, Any]) -> None:
+        """
+        Применяет событие stream_events_async.
+        """
+        if event.get("template") != PROPERTY_TEMPLATE:
+            return
+        if event["event"] == "created":
+            self.add(event)
+        elif event["event"] == "archived":
+            self.remove(event["contractId"])
+
+    def schema(self) -> Dict[str, str]:
+        """
+        Возвращает выведенную схему: колонка -> тип (number, string, boolean).
+        """
+        return {name: column.kind for name, column in self.columns.items() if column.values}
+
+    def _select_column(self, name: str, op: str, value: Any) -> Set[str]:
+        column = self.columns.get(name)
+        if column is None:
+            return set()  # objects without the attribute match no predicate on it
+        try:
+            typed = coerce(value, column.kind)
+        except ValueError:
+            # a value of another type ("meta.rooms==3+") can only be stored in the string shadow
+            shadow = self.columns.get(f"{name}:string")
+            matched = shadow.select(op, str(value)) if shadow is not None else set()
+            if op == "!=":
+                matched |= set(column.values)
+            return matched
+        return column.select(op, typed)
+
+    def select(self, predicates: Iterable[Any]) -> Set[str]:
+        """
+        Возвращает cid объектов, удовлетворяющих всем условиям.
+
+        Args:
+            predicates: Условия строками ("meta.rooms>=3") или кортежами
+                        (колонка, оператор, значение); операторы OPERATORS.
+
+        Значение, не приводимое к типу колонки ("meta.rooms==3+" для числовой
+        колонки), ищется в ее строковой тени.
+
+        Raises:
+            ValueError: При неверном условии или операторе, не поддерживаемом колонкой.
+        """
+        result: Optional[Set[str]] = None
+        # the most selective predicates (equality) first, so later sets are intersected with fewer cids
+        parsed = [parse_predicate(p) if isinstance(p, str) else tuple(p) for p in predicates]
+        for name, op, value in sorted(parsed, key=lambda p: p[1] != "=="):
+            if op not in OPERATORS:
+                raise ValueError(f"unknown operator {op}")
+            matched = self._select_column(name, op, value)
+            result = matched if result is None else result & matched
+            if not result:
+                return set()
+        return set(self._columns_by_cid) if result is None else result
@@ -0,0 +1,111 @@
+import asyncio
+import time
+from typing import Any, Callable, Dict, List, Sequence
+
+
+WORKLOADS = ("list", "exercise")
+
+
+def summarize(latencies: List[float], seconds: float, errors: int) -> Dict[str, Any]:
+    """
+    Сводка замеров: число операций, пропускная способность и перцентили задержки (мс).
+    """
+    ordered = sorted(latencies)
+
+    def pct(q: float):
+        if not ordered:
+            return None
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 2)
+
+    return {
+        "ops": len(ordered),
+        "errors": errors,
+        "seconds": round(seconds, 3),
+        "opsPerSec": round(len(ordered) / seconds, 2) if seconds else None,
+        "p50Ms": pct(0.5),
+        "p95Ms": pct(0.95),
+        "p99Ms": pct(0.99),
+    }
+
+
+async def _measure(workers: Sequence[Callable[[], Any]], iterations: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    errors = 0
+
+    async def worker(op, count: int) -> None:
+        nonlocal errors
+        for _ in range(count):
+            started = time.perf_counter()
+            try:
+                await op()
+            except Exception:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+
+    share, extra = divmod(iterations, len(workers))
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(op, share + (i < extra)) for i, op in enumerate(workers)))
+    return summarize(latencies, time.perf_counter() - started, errors)
+
+
+async def bench_list(handler, iterations: int, concurrency: int) -> Dict[str, Any]:
+    """
+    Нагрузка чтения: iterations запросов ACS RealEstate в concurrency потоков.
+    """
+    return await _measure([handler.list_properties_async] * max(1, concurrency), iterations)
+
+
+async def bench_exercise(handler, iterations: int, concurrency: int) -> Dict[str, Any]:
+    """
+    Нагрузка команд: UpdateMeta с неизменными метаданными на объектах party.
+
+    Каждый поток работает со своим объектом (через sequencer по propertyId),
+    чтобы команды не конфликтовали за один контракт.
+
+    Raises:
+        LookupError: Если у party нет объектов.
+    """
+    owned = [
+        p["payload"] for p in await handler.list_properties_async()
+        if p["payload"]["owner"] == handler.party
+    ][:max(1, concurrency)]
+    if not owned:
+        raise LookupError(f"party {handler.party} owns no properties to exercise on")
+    workers = [
+        lambda p=p: handler.update_meta_async(None, p["metaJson"], property_id=p["propertyId"])
+        for p in owned
+    ]
+    return await _measure(workers, iterations)
+
+
+async def run_transport_benchmark(make_handler: Callable[[str], Any], transports: Sequence[str],
+                                  workloads: Sequence[str] = WORKLOADS, iterations: int = 200,
+                                  concurrency: int = 8, warmup: int = 5) -> Dict[str, Any]:
+    """
+    Сравнивает транспорты на одинаковых нагрузках.
+
+    Каждый транспорт измеряется в своем соединении; первые warmup операций
+    каждой нагрузки не учитываются (установка соединений, кэши шаблонов).
+
+    Args:
+        make_handler: Функция transport -> неоткрытый RealEstateHandler.
+        transports: Транспорты для сравнения ("grpc", "json").
+        workloads: Нагрузки из WORKLOADS.
+        iterations: Число измеряемых операций на нагрузку.
+        concurrency: Число одновременных потоков операций.
+        warmup: Число прогревочных операций.
+
+    Returns:
+        Dict: transport -> workload -> сводка summarize.
+    """
+    runners = {"list": bench_list, "exercise": bench_exercise}
+    report: Dict[str, Any] = {}
+    for transport in transports:
+        report[transport] = {}
+        async with make_handler(transport) as handler:
+            for workload in workloads:
+                if warmup:
+                    await runners[workload](handler, warmup, 1)
+                report[transport][workload] = await runners[workload](handler, iterations, concurrency)
+    return report
@@ -0,0 +1,176 @@
+import hashlib
+import json
+import os
+import re
+from typing import Any, Dict, Optional
+
+
+PROPERTY_TEMPLATE = "RealEstate:RealEstate"
+DEFAULT_CID_CACHE_DIR = os.getenv(
+    "CID_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "real-estate"),
+)
+
+
+def cid_cache_path(host: str, port: int, party: str, directory: str = DEFAULT_CID_CACHE_DIR) -> str:
+    """
+    Путь файла кэша propertyId -> cid для леджера и party.
+    """
+    digest = hashlib.sha1(party.encode()).hexdigest()[:12]
+    host = re.sub(r"[^\w.-]", "_", host)
+    return os.path.join(directory, f"cids-{host}-{port}-{digest}.json")
+
+
+class PropertyCidIndex:
+    """
+    Индекс propertyId -> текущий cid RealEstate с сохранением на диск.
+
+    Каждый choice RealEstate архивирует контракт и создает новый, поэтому
+    cid объекта меняется после каждой команды. Индекс хранит соответствие
+    вместе с offset, на котором оно было верно. Перед использованием индекс
+    сверяется с концом леджера: если offset совпадает, ответ берется из
+    кэша без чтения ACS; иначе применяются только события RealEstate
+    после сохраненного offset. Полный снимок ACS читается лишь при первом
+    запуске или если события после offset недоступны (pruning, новый
+    леджер).
+
+    Attributes:
+        path: Файл кэша (JSON).
+        party: Party, для которого построен индекс.
+        offset: Offset леджера, на котором индекс актуален.
+        template_type: Полное имя шаблона RealEstate ("<package>:RealEstate:RealEstate");
+                       handler сверяет пакет с леджером перед использованием,
+                       а при перестроении индекса имя сбрасывается.
+        cids: propertyId -> cid.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.party: Optional[str] = None
+        self.offset: Optional[str] = None
+        self.template_type: Optional[str] = None
+        self.cids: Dict[str, str] = {}
+        self._property_ids: Dict[str, str] = {}  # cid -> propertyId
+        self._dirty = False
+
+    # =============================
+    # PERSISTENCE
+    # =============================
+
+    def load(self, party: str) -> None:
+        """
+        Читает кэш с диска; кэш другого party или поврежденный файл отбрасываются.
+        """
+        self.party = party
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if not isinstance(data, dict) or data.get("party") != party:
+            return
+        self.offset = data.get("offset")
+        self.template_type = data.get("templateType")
+        self._reset(data.get("cids") or {})
+
+    def save(self) -> None:
+        """
+        Записывает кэш на диск (атомарно, только если он изменился).
+        """
+        if not self._dirty:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({
+                "party": self.party,
+                "offset": self.offset,
+                "templateType": self.template_type,
+                "cids": self.cids,
+            }, f, separators=(",", ":"))
+        os.replace(tmp, self.path)
+        self._dirty = False
+
+    # =============================
+    # MAINTENANCE
+    # =============================
+
+    def _reset(self, cids: Dict[str, str]) -> None:
+        self.cids = dict(cids)
+        self._property_ids = {cid: property_id for property_id, cid in self.cids.items()}
+
+    def observe(self, property_id: str, contract_id: Optional[str]) -> None:
+        """
+        Запоминает текущий cid объекта (None — объект архивирован).
+        """
+        previous = self.cids.pop(property_id, None)
+        if previous is not None:
+            self._property_ids.pop(previous, None)
+        if contract_id is not None:
+            self.cids[property_id] = contract_id
+            self._property_ids[contract_id] = property_id
+        self._dirty = self._dirty or previous != contract_id
+
+    def set_template_type(self, template_type: Optional[str]) -> None:
+        """
+        Запоминает полное имя шаблона RealEstate (None — сбросить).
+        """
+        self._dirty = self._dirty or template_type != self.template_type
+        self.template_type = template_type
+
+    def apply(self, event: Dict[str, Any]) -> None:
+        """
+        Применяет событие stream_events_async.
+        """
+        if event.get("template") != PROPERTY_TEMPLATE:
+            return
+        if event["event"] == "created":
+            self.observe(event["payload"]["propertyId"], event["contractId"])
+        elif event["event"] == "archived":
+            property_id = self._property_ids.get(event["contractId"])
+            if property_id is not None and self.cids.get(property_id) == event["contractId"]:
+                self.observe(property_id, None)
+
+    async def _rebuild(self, handler) -> None:
+        cids = {}
+        async for record in handler.iter_snapshot_async([PROPERTY_TEMPLATE]):
+            if "contractId" in record:
+                cids[record["payload"]["propertyId"]] = record["contractId"]
+            else:
+                self.offset = record["offset"]
+        self._reset(cids)
+        # a rebuild means the ledger moved on without us: the cached template id may be stale too
+        self.template_type = None
+        self._dirty = True
+
+    async def sync(self, handler) -> None:
+        """
+        Доводит индекс до текущего конца леджера.
+
+        Args:
+            handler: Подключенный RealEstateHandler (gRPC).
+        """
+        end = await handler.get_ledger_end_async()
+        if end == self.offset:
+            return
+        if self.offset is not None:
+            try:
+                async for event in handler.stream_events_async(self.offset, [PROPERTY_TEMPLATE], end_offset=end):
+                    self.apply(event)
+            except Exception:
+                # events after the cached offset are gone (pruned or a fresh ledger): start over
+                await self._rebuild(handler)
+            else:
+                self.offset = end
+                self._dirty = True
+            return
+        await self._rebuild(handler)
+
+    async def resolve(self, handler, property_id: str) -> Optional[str]:
+        """
+        Возвращает текущий cid объекта по propertyId (None — объект не виден party).
+
+        Raises:
+            Exception: При ошибках запроса к леджеру.
+        """
+        await self.sync(handler)
+        return self.cids.get(property_id)
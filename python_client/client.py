@@ -1,4 +1,5 @@
 import asyncio
+import copy
 import datetime
 import decimal
 import os
@@ -9,17 +10,46 @@ from typing import Any, Dict, List, Optional
 from dazl.ledger import ExerciseResponse
 from dazl.ledger.api_types import ContractId
 from dazl.damlast.daml_lf_1 import DottedName, ModuleRef, PackageRef, TypeConName
-from dazl.damlast.daml_lf_1 import DottedName, ModuleRef, PackageRef, TypeConName
-from dazl.damlast.daml_lf_1 import TypeConName
+from dazl.damlast.lookup import parse_type_con_name
+from dazl.damlast.util import package_local_name
 import dazl
 from dazl import Party
-from dazl.ledger.api_types import CreateEvent, ArchiveEvent
+from dazl.ledger.api_types import CreateEvent, ArchiveEvent, Boundary
+from dazl.ledger.api_types import CreateAndExerciseCommand, CreateCommand
+from dazl._gen.com.daml.ledger.api import v1 as lapipb
+
+from python_client.admission import AdaptiveLimiter
+from python_client.attributes import AttributeIndex, MetaCache
+from python_client.cid_index import PropertyCidIndex
+from python_client.deadlines import LatencyTracker, hedged, remaining
+from python_client.geo import GeoIndex
+from python_client.history import RegistryHistory
+from python_client.json_api import DEFAULT_JSON_API_SECRET, DEFAULT_JSON_API_URL, JsonApiConnection
+from python_client.lineage import OwnershipLineage
+from python_client.participants import ParticipantPool
+from python_client.retry import (
+    DuplicateCommandError,
+    backoff_delay,
+    command_id,
+    is_duplicate_error,
+    is_resubmittable_error,
+    status_name,
+)
+from python_client.search import TextIndex
+from python_client.sequencer import PropertySequencer
+from python_client.transaction import TransactionBuilder
+from python_client.wallet import WalletIndex
+from python_client.workload import TraceRecorder
 
 
 DEFAULT_LEDGER_HOST = os.getenv("LEDGER_HOST", "localhost")
 DEFAULT_LEDGER_PORT = int(os.getenv("LEDGER_PORT", "26865"))
 DEFAULT_PARTY = os.getenv("LEDGER_PARTY", "")
 DEFAULT_APP_NAME = os.getenv("LEDGER_APP_NAME", "real-estate-client")
+DEFAULT_TRANSPORT = os.getenv("LEDGER_TRANSPORT", "grpc")
+TRANSPORTS = ("grpc", "json")
+
+STREAM_TEMPLATES = ("RealEstate:RealEstate", "RealEstate:Cash")
 
 
 def to_jsonable(val: Any) -> Any:
@@ -74,8 +104,97 @@ def to_jsonable(val: Any) -> Any:
     return str(val)
 
 
+def select_coins(holdings: List[Dict[str, Any]], amount: str, currency: str) -> Dict[str, Any]:
+    """
+    Выбирает контракты Cash для оплаты точной суммы за минимум транзакций.
+
+    Порядок предпочтений:
+    1. "exact" — есть контракт ровно на нужную сумму (0 транзакций).
+    2. "split" — наименьший контракт больше суммы делится (1 транзакция).
+    3. "merge" / "merge_split" — несколько контрактов одного эмитента
+       объединяются (Merge; при переплате затем Split), выбирается набор
+       из наименьшего числа контрактов (1–2 транзакции).
+
+    Args:
+        holdings: Контракты Cash в формате list_cash_async (одного владельца).
+        amount: Требуемая сумма (строка Decimal).
+        currency: Код валюты.
+
+    Returns:
+        Dict с полями:
+        - action: "exact", "split", "merge" или "merge_split"
+        - cids: выбранные ID контрактов (для merge первый — базовый)
+        - total: сумма выбранных контрактов (строка)
+
+    Raises:
+        ValueError: Если средств в валюте недостаточно ни у одного эмитента.
+    """
+    target = decimal.Decimal(str(amount))
+    coins = sorted(
+        (
+            (decimal.Decimal(str(c["payload"]["amount"])), c["contractId"], c["payload"].get("issuer"))
+            for c in holdings
+            if c["payload"].get("currency") == currency
+        ),
+        key=lambda coin: coin[0],
+    )
+    for value, cid, _ in coins:
+        if value == target:
+            return {"action": "exact", "cids": [cid], "total": str(value)}
+    for value, cid, _ in coins:
+        if value > target:
+            return {"action": "split", "cids": [cid], "total": str(value)}
+
+    # every holding is smaller than the target: merge the largest ones of a single issuer
+    best = None
+    by_issuer: Dict[Any, List] = {}
+    for coin in coins:
+        by_issuer.setdefault(coin[2], []).append(coin)
+    for group in by_issuer.values():
+        picked, total = [], decimal.Decimal(0)
+        for value, cid, _ in reversed(group):
+            picked.append(cid)
+            total += value
+            if total >= target:
+                break
+        if total >= target and (best is None or len(picked) < len(best[0])):
+            best = (picked, total)
+    if best is None:
+        raise ValueError(f"Insufficient {currency} funds for {amount}")
+    picked, total = best
+    return {
+        "action": "merge" if total == target else "merge_split",
+        "cids": picked,
+        "total": str(total),
+    }
+
+
+def is_stakeholder(created_event, parties) -> bool:
+    """
+    Проверяет, является ли один из parties подписантом или наблюдателем контракта.
+
+    Args:
+        created_event: CreatedEvent Ledger API (поля signatories и observers).
+        parties: Множество ID parties (строки).
+    """
+    return any(str(p) in parties for p in (*created_event.signatories, *created_event.observers))
+
+
+async def _as_tree_response(tree):
+    return lapipb.SubmitAndWaitForTransactionTreeResponse(transaction=tree)
+
+
+def _raise_if_deadline(ex: Exception) -> None:
+    # a missed deadline must surface, not turn into an unresolved party hint
+    if isinstance(ex, asyncio.TimeoutError) or status_name(ex) == "DEADLINE_EXCEEDED":
+        raise ex
+
+
 class RealEstateHandler:
     _template_type = None  # cached TypeConName for RealEstate template
+    _template_types: Dict[str, TypeConName] = {}  # other templates of the module, as seen in reads
+    _latency: Dict[str, LatencyTracker] = {}  # read name -> latency window for hedging, shared per process
+    _meta_cache = MetaCache()  # parsed metaJson by cid, shared per process
 
     """
     Асинхронный клиент для взаимодействия с Daml леджером для контрактов RealEstate и Cash.
@@ -94,6 +213,21 @@ class RealEstateHandler:
         app_name: Имя приложения для идентификации в леджере.
         client: Активное соединение dazl (устанавливается в __aenter__).
         party: Канонический ID party после резолюции.
+        read_as_hints: Дополнительные parties, от имени которых читается леджер.
+        read_as: Канонические ID parties для read_as (party и read_as_hints).
+        wallet: Индекс контрактов Cash по владельцу и валюте (WalletIndex).
+        sequencer: Очередь команд по propertyId (PropertySequencer).
+        limiter: Адаптивный ограничитель одновременных команд (AdaptiveLimiter),
+                 общий для всех изменяющих вызовов handler и его копий.
+        transport: Транспорт к леджеру: "grpc" (dazl) или "json" (HTTP JSON API).
+        reads: Пул участников для чтений (ParticipantPool) или None, если
+               все запросы идут на host:port.
+        attributes: Колоночный индекс атрибутов объектов и metaJson (AttributeIndex).
+        search: Текстовый индекс по address, propertyId и propertyType (TextIndex).
+        geo: Пространственный индекс объектов с координатами в metaJson (GeoIndex).
+        history: Журнал изменений и снимки реестра для запросов as_of
+                 (RegistryHistory) или None.
+        recorder: Запись вызовов в файл трассы (TraceRecorder) или None.
     """
 
     def __init__(
@@ -102,6 +236,20 @@ class RealEstateHandler:
         port: int = DEFAULT_LEDGER_PORT,
         party: str = DEFAULT_PARTY,
         app_name: str = DEFAULT_APP_NAME,
+        read_as: Optional[List[str]] = None,
+        rate_limit: Optional[float] = None,
+        deduplication_duration: Optional[datetime.timedelta] = None,
+        retries: int = 3,
+        timeout: Optional[float] = None,
+        hedge_reads: bool = False,
+        transport: str = DEFAULT_TRANSPORT,
+        json_api_url: str = DEFAULT_JSON_API_URL,
+        json_api_secret: Optional[str] = DEFAULT_JSON_API_SECRET,
+        read_endpoints: Optional[List[str]] = None,
+        read_fanout: bool = False,
+        cid_cache: Optional[str] = None,
+        history_dir: Optional[str] = None,
+        trace: Optional[str] = None,
     ):
         """
         Инициализирует handler для работы с леджером.
@@ -112,14 +260,86 @@ class RealEstateHandler:
             party: Подсказка для party (например, "Registrar", "Owner").
                    Будет резолвиться в канонический ID при подключении.
             app_name: Имя приложения для логирования в леджере.
+            read_as: Дополнительные подсказки parties для чтения в одном соединении
+                     (режим многопартийного чтения, см. load_party_views_async).
+            rate_limit: Потолок частоты команд в секунду (None — только адаптивный лимит).
+            deduplication_duration: Период дедупликации команд (None — максимальный
+                                    период, настроенный на участнике леджера).
+            retries: Число повторов команды при временных ошибках gRPC.
+            timeout: Таймаут каждого вызова к леджеру в секундах (None — настройка dazl
+                     для команд и без ограничения для чтений). Более короткий срок
+                     задается блоком python_client.deadlines.deadline(...).
+            hedge_reads: Дублировать медленные идемпотентные чтения (список объектов,
+                         Cash и parties) после p95 задержки (см. deadlines.hedged).
+            transport: "grpc" — Ledger API через dazl; "json" — HTTP JSON API
+                       (JsonApiConnection). Поток транзакций и атомарные
+                       транзакции из нескольких команд доступны только через gRPC.
+            json_api_url: Базовый URL JSON API для transport="json".
+            json_api_secret: Ключ подписи токенов JSON API (по умолчанию
+                             JSON_API_SECRET); обязателен для transport="json".
+            read_endpoints: Дополнительные участники ("host:port") для чтений
+                            (объекты, Cash, parties). Команды и чтения перед
+                            командами всегда идут на host:port — участник,
+                            на котором размещен party. Участники того же
+                            леджера: сессия на них только для чтения и с теми
+                            же ID parties, поэтому parties read_as должны на
+                            них размещаться (проверяется при подключении).
+            read_fanout: Читать со всех участников и объединять
+                         результаты по ID контракта (для parties, размещенных
+                         на разных участниках) вместо балансировки; если
+                         ответили не все, чтение завершается
+                         IncompleteReadError (participants).
+            cid_cache: Файл кэша propertyId -> cid (PropertyCidIndex): команды
+                       по property_id получают текущий cid из кэша, сверенного
+                       с концом леджера по offset, вместо чтения ACS. None —
+                       без кэша.
+            history_dir: Каталог истории реестра (RegistryHistory) для
+                         list_properties_async(as_of=...). None — запросы
+                         на момент в прошлом недоступны.
+            trace: Файл трассы: все вызовы команд и чтений (метод, аргументы
+                   с обезличенными parties и cid, длительность, исход)
+                   дописываются в него для повтора через
+                   python_client.workload.replay_trace. None — без записи.
+
+        Raises:
+            ValueError: Если transport неизвестен.
         """
+        if transport not in TRANSPORTS:
+            raise ValueError(f"Unknown transport {transport!r}, expected one of {TRANSPORTS}")
         self.host = host
         self.port = port
         self.party_hint = party or "Observer"
         self.app_name = app_name
+        self.read_as_hints = list(read_as or [])
 
         self.client = None
         self.party = None  # resolved party id
+        self.read_as = []  # resolved party ids to read as
+        self.wallet = WalletIndex()
+        self.attributes = AttributeIndex(self._meta_cache)
+        self.search = TextIndex()
+        self.geo = GeoIndex(self._meta_cache)
+        self.sequencer = PropertySequencer()
+        self.lineage = OwnershipLineage()
+        self.limiter = AdaptiveLimiter(rate=rate_limit)
+        self.deduplication_duration = deduplication_duration
+        self.retries = retries
+        self.timeout = timeout
+        self.hedge_reads = hedge_reads
+        self.transport = transport
+        self.json_api_url = json_api_url
+        self.json_api_secret = json_api_secret
+        self.read_endpoints = list(read_endpoints or [])
+        self.read_fanout = read_fanout
+        self.reads: Optional[ParticipantPool] = None
+        self.cid_index: Optional[PropertyCidIndex] = PropertyCidIndex(cid_cache) if cid_cache else None
+        self.history: Optional[RegistryHistory] = RegistryHistory(history_dir) if history_dir else None
+        self._history_attributes = AttributeIndex(self._meta_cache)  # where over as_of results
+        self.recorder: Optional[TraceRecorder] = None
+        if trace:
+            self.recorder = TraceRecorder(trace)
+            self.recorder.attach(self)
+        self._registry_cids = {}  # (registrar id, history limit) -> Registry contract id
 
     def _url(self) -> str:
         """
@@ -130,6 +350,27 @@ class RealEstateHandler:
         """
         return f"grpc://{self.host}:{self.port}"
 
+    def _connect(self, endpoint: Optional[str] = None, **kwargs):
+        """
+        Создает (не открывая) соединение выбранного транспорта.
+
+        Args:
+            endpoint: "host:port" другого участника (None — host:port handler
+                      или json_api_url).
+            kwargs: party, read_as, act_as, application_name, как у dazl.connect.
+
+        Returns:
+            Async context manager соединения dazl или JsonApiConnection.
+        """
+        if self.transport == "json":
+            return JsonApiConnection(f"http://{endpoint}" if endpoint else self.json_api_url,
+                                     secret=self.json_api_secret, **kwargs)
+        return dazl.connect(url=f"grpc://{endpoint}" if endpoint else self._url(), **kwargs)
+
+    def _require_grpc(self, feature: str) -> None:
+        if self.transport != "grpc":
+            raise NotImplementedError(f"{feature} requires the gRPC transport")
+
     # =============================
     # CONTEXT MANAGER
     # =============================
@@ -149,30 +390,61 @@ class RealEstateHandler:
             Exception: При ошибках подключения к леджеру.
         """
         # First: connect with hint
-        raw_conn = dazl.connect(
-            url=self._url(),
+        raw_conn = self._connect(
             party=Party(self.party_hint),
             application_name=self.app_name,
         )
         resolver = await raw_conn.__aenter__()
 
-        # Resolve actual party
-        self.party = await self._resolve_party(resolver, self.party_hint)
-
-        # resolver is no longer needed
-        await raw_conn.__aexit__(None, None, None)
+        # Resolve actual party (and extra read_as parties) with a single party listing
+        try:
+            resolved = await self._resolve_parties(resolver, [self.party_hint, *self.read_as_hints])
+        finally:
+            # resolver is no longer needed
+            await raw_conn.__aexit__(None, None, None)
+        self.party = resolved[self.party_hint]
+        self.read_as = list(dict.fromkeys(resolved.values()))
+        self._resolved_parties = resolved
 
         # Second: open real session with resolved party
-        conn = dazl.connect(
-            url=self._url(),
+        session = dict(
             party=Party(self.party),
-            read_as=[Party(self.party)],
+            read_as=[Party(p) for p in self.read_as],
             act_as=[Party(self.party)],
             application_name=self.app_name,
         )
+        conn = self._connect(**session)
         self.client = await conn.__aenter__()
         self._conn_cm = conn  # to close on exit
-        await self.list_properties_async()
+
+        if self.read_endpoints:
+            primary = self.json_api_url if self.transport == "json" else f"{self.host}:{self.port}"
+            self.reads = ParticipantPool()
+            self.reads.add(primary, self.client)
+            # replicas only serve reads: no act_as there
+            read_session = {k: v for k, v in session.items() if k not in ("party", "act_as")}
+            for endpoint in dict.fromkeys(self.read_endpoints):
+                if endpoint == primary:
+                    continue
+                replica = self._connect(endpoint, **read_session)
+                try:
+                    client = await replica.__aenter__()
+                    self.reads.add(endpoint, client, replica)
+                    await self._check_replica(endpoint, client)
+                except BaseException as ex:
+                    await self.__aexit__(type(ex), ex, ex.__traceback__)
+                    raise
+        if self.cid_index is not None:
+            self.cid_index.load(self.party)
+            if self._template_type is None and self.cid_index.template_type:
+                if await self._has_package(self.cid_index.template_type):
+                    type(self)._template_type = parse_type_con_name(self.cid_index.template_type)
+                else:
+                    # the cached template comes from a package this ledger does not have (reset, redeploy)
+                    self.cid_index.set_template_type(None)
+        if self._template_type is None:
+            # warm up the RealEstate template type once per process
+            await self.list_properties_async()
         return self
 
     async def __aexit__(self, exc_type, exc, tb):
@@ -184,10 +456,72 @@ class RealEstateHandler:
             exc: Экземпляр исключения (если было).
             tb: Traceback исключения (если было).
         """
+        if self.reads is not None:
+            await self.reads.close()
+        self.reads = None
+        if self.cid_index is not None and self.cid_index.party is not None:
+            if self._template_type is not None:
+                self.cid_index.set_template_type(str(self._template_type))
+            self.cid_index.save()
+        if self.recorder is not None:
+            self.recorder.flush()
         if self.client is not None:
             await self._conn_cm.__aexit__(exc_type, exc, tb)
         self.client = None
 
+    async def _has_package(self, template_type: str) -> bool:
+        """
+        Проверяет, загружен ли в леджер пакет шаблона ("<package>:Module:Entity").
+
+        Через JSON API список пакетов не запрашивается, и ответ всегда False.
+        """
+        if self.transport != "grpc":
+            return False
+        package_ids = await self.client.list_package_ids(timeout=remaining(self.timeout))
+        return template_type.split(":", 1)[0] in {str(package_id) for package_id in package_ids}
+
+    async def _check_replica(self, endpoint: str, conn) -> None:
+        """
+        Проверяет, что участник из read_endpoints может обслуживать чтения.
+
+        Без read_fanout чтение может уйти на любого участника, поэтому на
+        каждом должны размещаться все parties read_as; с read_fanout
+        результаты объединяются, и достаточно одного из них.
+
+        Raises:
+            ValueError: Если участник не размещает нужные parties.
+        """
+        infos = await conn.list_known_parties(timeout=remaining(self.timeout))
+        hosted = {str(info.party) for info in infos if info.is_local}
+        missing = [party for party in self.read_as if party not in hosted]
+        if len(missing) == len(self.read_as) or (missing and not self.read_fanout):
+            raise ValueError(
+                f"Read endpoint {endpoint} does not host {', '.join(missing)}; "
+                "read endpoints must host the parties read as (all of them without read_fanout)"
+            )
+
+    async def with_party(self, party: str) -> "RealEstateHandler":
+        """
+        Возвращает копию handler, действующую от имени другого party поверх того же соединения.
+
+        Копия разделяет открытое соединение dazl с исходным handler, поэтому
+        закрывать её не нужно: соединение закрывается вместе с исходным handler.
+        Используется, когда последовательность команд от разных parties
+        выполняется без переподключения (например, `main.py batch`).
+
+        Args:
+            party: Подсказка или канонический ID party.
+
+        Returns:
+            RealEstateHandler: Копия с резолвнутым party.
+        """
+        view = copy.copy(self)
+        view.party_hint = party
+        view.party = await self._resolve_party(self.client, party)
+        if view.recorder is not None:
+            view.recorder.attach(view)
+        return view
+
     # =============================
     # HELPERS
     # =============================
@@ -206,23 +540,87 @@ class RealEstateHandler:
         Returns:
             Канонический ID party (например, "Registrar-123::abc...") или
             исходная подсказка, если party не найден.
+
+        Raises:
+            asyncio.TimeoutError: Если срок вызова истек.
         """
         if "::" in hint:
             return hint
         try:
-            infos = await conn.list_known_parties()
+            infos = await conn.list_known_parties(timeout=remaining(self.timeout))
             for info in infos:
                 if str(info.party).startswith(f"{hint}-") or info.display_name == hint:
                     return str(info.party)
-        except Exception:
-            pass
+        except Exception as ex:
+            _raise_if_deadline(ex)
         return hint
 
+    async def _resolve_parties(self, conn, hints: List[str]) -> Dict[str, str]:
+        """
+        Резолвит несколько подсказок parties за один запрос списка parties.
+
+        Правила совпадения те же, что в _resolve_party.
+
+        Args:
+            conn: Активное dazl соединение для запроса parties.
+            hints: Подсказки parties.
+
+        Returns:
+            Dict: подсказка -> канонический ID (или сама подсказка, если party не найден).
+
+        Raises:
+            asyncio.TimeoutError: Если срок вызова истек.
+        """
+        resolved = {hint: hint for hint in hints}
+        pending = [hint for hint in hints if "::" not in hint]
+        if not pending:
+            return resolved
+        try:
+            infos = await conn.list_known_parties(timeout=remaining(self.timeout))
+        except Exception as ex:
+            _raise_if_deadline(ex)
+            return resolved
+        for hint in pending:
+            for info in infos:
+                if str(info.party).startswith(f"{hint}-") or info.display_name == hint:
+                    resolved[hint] = str(info.party)
+                    break
+        return resolved
+
+    def _contract_id(self, contract_id, template: str = "RealEstate") -> ContractId:
+        """
+        Оборачивает строковый ID в ContractId шаблона модуля RealEstate.
+
+        Тип берется из прочитанных ранее контрактов шаблона; если их еще не
+        было (например, у party есть только Cash), шаблон ищется по имени
+        во всех пакетах леджера ("*:RealEstate:<template>").
+        """
+        if not isinstance(contract_id, str):
+            return contract_id
+        if template == "RealEstate":
+            template_type = self._template_type
+        else:
+            template_type = self._template_types.get(template)
+        if template_type is None:
+            template_type = parse_type_con_name(f"*:RealEstate:{template}")
+        return ContractId(template_type, contract_id)
+
+    def _remember_template(self, value_type: TypeConName) -> None:
+        # cache the exact template id (with package) of a contract seen in a read
+        template = package_local_name(value_type).split(":")[-1]
+        if template == "RealEstate":
+            if self._template_type is None:
+                type(self)._template_type = value_type
+        else:
+            self._template_types.setdefault(template, value_type)
+
     async def _exercise(self, contract_id: str,
                         choice: str,
-                        argument: Dict[str, Any], extra_act_as=None):
+                        argument: Dict[str, Any], extra_act_as=None,
+                        template: str = "RealEstate",
+                        idempotency_key: Optional[str] = None):
         """
-        Выполняет choice на контракте RealEstate.
+        Выполняет choice на контракте RealEstate (или другом шаблоне модуля RealEstate).
 
         Args:
             contract_id: ID контракта для выполнения choice.
@@ -230,30 +628,301 @@ class RealEstateHandler:
             argument: Аргументы choice в виде словаря.
             extra_act_as: Дополнительные parties для multi-controller choices
                           (например, для Buy нужны buyer и seller).
+            template: Имя шаблона в модуле RealEstate ("RealEstate" или "Cash").
+            idempotency_key: Ключ идемпотентности (см. _submit).
 
         Returns:
             JSON-совместимый результат выполнения choice.
 
         Raises:
+            DuplicateCommandError: Если команда с этим ключом уже была принята.
             Exception: При ошибках выполнения choice (валидация, авторизация и т.д.).
         """
         act_as = [Party(self.party)]
         if extra_act_as:
             act_as.extend(extra_act_as)
 
-        cid = contract_id
+        res = await self._submit(
+            lambda cmd_id: self.client.exercise(
+                self._contract_id(contract_id, template),
+                choice,
+                argument,
+                act_as=act_as,
+                read_as=act_as,
+                command_id=cmd_id,
+                deduplication_duration=self.deduplication_duration,
+                timeout=remaining(self.timeout),
+            ),
+            idempotency_key, "exercise", template, choice,
+            committed=lambda tree: self.client.codec.decode_exercise_response(tree),
+        )
+        return to_jsonable(res)
+
+    async def _create(self, template: str, payload: Dict[str, Any], act_as: List[Party],
+                      idempotency_key: Optional[str] = None) -> CreateEvent:
+        """
+        Создает контракт шаблона "Module:Entity" (с повторами и ограничителем команд, см. _submit).
+        """
+        return await self._submit(
+            lambda cmd_id: self.client.create(
+                template,
+                payload,
+                act_as=act_as,
+                command_id=cmd_id,
+                deduplication_duration=self.deduplication_duration,
+                timeout=remaining(self.timeout),
+            ),
+            idempotency_key, "create", template,
+            committed=lambda tree: self.client.codec.decode_created_event(
+                tree.events_by_id[tree.root_event_ids[0]].created,
+            ),
+        )
+
+    async def _submit(self, send, idempotency_key: Optional[str], *scope: str, committed=None):
+        """
+        Отправляет команду с постоянным command id и повторяет ее при временных ошибках.
+
+        Command id вычисляется один раз до первой попытки: из idempotency_key
+        (детерминированно, с учетом приложения, party и scope) или случайно.
+        Все повторы используют тот же id, поэтому дедупликация леджера не даст
+        применить команду дважды, даже если прерванная попытка на самом деле прошла.
+        Повторы — с экспоненциальной паузой и джиттером, только для ошибок,
+        которые не повторяет dazl (см. is_resubmittable_error). ABORTED не
+        повторяется: конфликт по устаревшему cid разрешает PropertySequencer.
+
+        Если повтор получил ALREADY_EXISTS, значит, прерванная попытка на самом
+        деле прошла: результат берется из принятой транзакции (см.
+        _committed_tree), а не возвращается как ошибка.
+
+        Args:
+            send: Функция command_id -> корутина отправки.
+            idempotency_key: Ключ идемпотентности вызывающего кода или None.
+            scope: Дополнительные компоненты ключа (вид команды, шаблон, choice).
+            committed: Функция TransactionTree -> корутина результата в форме
+                       send; None — результат принятой транзакции не восстанавливается.
+
+        Raises:
+            DuplicateCommandError: Команда с этим id была принята до вызова
+                                   (или ее транзакцию не удалось найти).
+        """
+        cmd_id = command_id(idempotency_key, self.app_name, self.party, *scope)
+        for attempt in range(self.retries + 1):
+            try:
+                async with self.limiter.slot():
+                    return await send(cmd_id)
+            except Exception as ex:
+                if is_duplicate_error(ex):
+                    if attempt and committed is not None:
+                        tree = await self._committed_tree(cmd_id)
+                        if tree is not None:
+                            return await committed(tree)
+                    raise DuplicateCommandError(cmd_id, str(ex)) from ex
+                if attempt == self.retries or not is_resubmittable_error(ex):
+                    raise
+            await asyncio.sleep(backoff_delay(attempt))
+
+    async def _committed_tree(self, cmd_id: str):
+        """
+        Находит дерево транзакции, принятой леджером с этим command id.
+
+        Читает деревья транзакций party с начала леджера до текущего конца:
+        command id виден в транзакциях, отправленных самим party. Нужен
+        редко — только после неоднозначной ошибки, поэтому полный проход
+        допустим.
+
+        Returns:
+            TransactionTree или None, если транзакция не найдена, срок вызова
+            истек или transport="json" (JSON API не отдает транзакции по command id).
+        """
+        if self.transport != "grpc":
+            return None
+        codec = self.client.codec
+
+        async def find():
+            end = await self.get_ledger_end_async()
+            with self.client._call(read_as=[Party(self.party)]) as call:
+                request = lapipb.GetTransactionsRequest(
+                    ledger_id=call.ledger_id,
+                    filter=lapipb.TransactionFilter(filters_by_party={self.party: lapipb.Filters()}),
+                    begin=codec.encode_begin_offset(None),
+                    end=codec.encode_end_offset(end),
+                )
+                stub = call.grpc_stub(lapipb.TransactionServiceStub)
+                stream = stub.GetTransactionTrees(request, **call.grpc_kwargs_infinite_timeout)
+            try:
+                async for response in stream:
+                    for tx in response.transactions:
+                        if tx.command_id == cmd_id:
+                            return tx
+            finally:
+                stream.cancel()
+            return None
+
+        try:
+            return await asyncio.wait_for(find(), remaining(self.timeout))
+        except asyncio.TimeoutError:
+            return None
+
+    async def _on_reader(self, call, key, primary: bool = False):
+        """
+        Выполняет чтение на участнике из пула чтений (см. ParticipantPool).
+
+        Args:
+            call: Функция соединение -> корутина чтения, возвращающая список.
+            key: Ключ удаления дубликатов при read_fanout.
+            primary: Читать с участника party (host:port), например
+                     перед командой, которой нужен актуальный cid.
+        """
+        if primary or self.reads is None:
+            return await call(self.client)
+        if self.read_fanout:
+            return await self.reads.fanout(call, key)
+        return await self.reads.call(call)
+
+    async def _query_events(self, *templates: str, query: Optional[Dict[str, Any]] = None,
+                            read_as=None, primary: bool = False) -> List[CreateEvent]:
+        """
+        Читает активные контракты шаблонов с учетом срока вызова.
+
+        Поток запроса открывается как контекст, поэтому при истечении срока,
+        отмене задачи или ошибке gRPC-стрим закрывается сразу, а не при сборке мусора.
 
-        if isinstance(cid, str):
-            cid = ContractId(self._template_type, contract_id)
+        Args:
+            templates: Шаблоны "Module:Entity".
+            query: Фильтр по полям (только для одного шаблона).
+            read_as: Parties для чтения (по умолчанию — текущий party).
+            primary: Читать с участника party, а не из пула чтений.
 
-        res = await self.client.exercise(
-            cid,
-            choice,
-            argument,
-            act_as=act_as,
-            read_as=act_as,
+        Raises:
+            asyncio.TimeoutError: Если срок вызова истек.
+        """
+        read_as = read_as or [Party(self.party)]
+
+        async def collect(client):
+            if query is not None:
+                stream = client.query(templates[0], query, read_as=read_as)
+            else:
+                stream = client.query_many(*templates, read_as=read_as)
+            async with stream:
+                return [event async for event in stream.creates()]
+
+        return await asyncio.wait_for(
+            self._on_reader(collect, key=lambda event: str(event.contract_id), primary=primary),
+            remaining(self.timeout),
         )
-        return to_jsonable(res)
+
+    async def _read(self, name: str, call):
+        """
+        Выполняет идемпотентное чтение, дублируя его при hedge_reads (см. deadlines.hedged).
+        """
+        if not self.hedge_reads:
+            return await call()
+        return await hedged(call, self._latency.setdefault(name, LatencyTracker()))
+
+    async def _exercise_property(self, contract_id: Optional[str], property_id: Optional[str],
+                                 choice: str, argument: Dict[str, Any], extra_act_as=None):
+        """
+        Выполняет choice RealEstate напрямую по cid или через sequencer по propertyId.
+
+        Если задан property_id, команда встает в очередь объекта, а cid
+        подставляется из результата предыдущей команды (contract_id служит
+        начальной подсказкой и может быть None). Первый cid объекта берется
+        из cid_index, если он настроен, и после команды индекс обновляется.
+        Индекс строится по контрактам, видимым party, поэтому для команд с
+        другими участниками (Buy от имени покупателя) он не используется:
+        sequencer читает cid от имени extra_act_as, в том числе продавца.
+        """
+        if property_id is None:
+            return await self._exercise(contract_id, choice, argument, extra_act_as=extra_act_as)
+        index = self.cid_index if self.transport == "grpc" else None
+        own = not extra_act_as or {str(p) for p in extra_act_as} <= {self.party}
+        if index is not None and own and contract_id is None and self.sequencer.current_cid(property_id) is None:
+            contract_id = await index.resolve(self, property_id)
+        res = await self.sequencer.submit(
+            self, property_id, choice, argument,
+            extra_act_as=extra_act_as, contract_id=contract_id,
+        )
+        if index is not None:
+            index.observe(property_id, self.sequencer.current_cid(property_id))
+        return res
+
+    # =============================
+    # TRANSACTIONS
+    # =============================
+
+    def transaction(self, idempotency_key: Optional[str] = None) -> TransactionBuilder:
+        """
+        Создает сборщик атомарной транзакции из нескольких команд (см. TransactionBuilder).
+        """
+        return TransactionBuilder(self, idempotency_key=idempotency_key)
+
+    async def submit_commands_async(self, commands, extra_act_as=None,
+                                    idempotency_key: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Отправляет команды dazl одной транзакцией и возвращает результат каждой.
+
+        dazl.submit не возвращает результатов, поэтому транзакция отправляется
+        через SubmitAndWaitForTransactionTree, а корневые события дерева
+        сопоставляются командам по порядку (createAndExercise дает два корня).
+
+        Args:
+            commands: CreateCommand / ExerciseCommand / CreateAndExerciseCommand.
+            extra_act_as: Дополнительные parties (подсказки или ID) для act_as.
+            idempotency_key: Ключ идемпотентности транзакции (см. _submit).
+
+        Returns:
+            List[Dict]: JSON-совместимые результаты по порядку команд.
+
+        Raises:
+            DuplicateCommandError: Если транзакция с этим ключом уже была принята.
+            NotImplementedError: Для transport="json" (JSON API v1 не принимает
+                                 несколько команд в одной транзакции).
+            Exception: При отклонении транзакции.
+        """
+        self._require_grpc("multi-command transactions")
+        if not commands:
+            return []
+        act_as = [Party(self.party)]
+        for hint in extra_act_as or []:
+            party = Party(await self._resolve_party(self.client, hint))
+            if party not in act_as:
+                act_as.append(party)
+
+        codec = self.client.codec
+        command_seq = await asyncio.gather(*(codec.encode_command(cmd) for cmd in commands))
+
+        async def send(cmd_id):
+            with self.client._call(act_as=act_as, read_as=act_as, command_id=cmd_id,
+                                   deduplication_duration=self.deduplication_duration,
+                                   timeout=remaining(self.timeout)) as call:
+                stub = call.grpc_stub(lapipb.CommandServiceStub)
+                request = self.client._submit_and_wait_request(command_seq, await call.command_meta())
+                return await stub.SubmitAndWaitForTransactionTree(request, **call.grpc_kwargs)
+
+        response = await self._submit(
+            send, idempotency_key, "transaction",
+            committed=_as_tree_response,
+        )
+
+        tree = response.transaction
+        roots = list(tree.root_event_ids)
+        results = []
+        pos = 0
+        for cmd in commands:
+            width = 2 if isinstance(cmd, CreateAndExerciseCommand) else 1
+            # decode_exercise_response reads only root_event_ids, so narrow it to this command
+            del tree.root_event_ids[:]
+            tree.root_event_ids.extend(roots[pos:pos + width])
+            pos += width
+            decoded = await codec.decode_exercise_response(tree)
+            if isinstance(cmd, CreateCommand):
+                res = to_jsonable(decoded.events[0])
+                self.wallet.apply_events([res])
+            else:
+                res = to_jsonable(decoded)
+                self.wallet.apply_events(res["events"])
+            results.append(res)
+        return results
 
     # =============================
     # MAIN METHODS
@@ -271,6 +940,8 @@ class RealEstateHandler:
         price: str,
         currency: str,
         listed: bool = False,
+        history_limit: Optional[int] = None,
+        idempotency_key: Optional[str] = None,
     ):
         """
         Создает новый контракт RealEstate в леджере.
@@ -286,6 +957,11 @@ class RealEstateHandler:
             price: Начальная цена (строка, будет преобразована в Decimal).
             currency: Код валюты (например, "USD", "EUR").
             listed: Выставить на продажу сразу при создании (по умолчанию False).
+            history_limit: Сколько последних владельцев хранить в поле history
+                           (None — без ограничения, 0 — только transferCount и lastOwner;
+                           полная история доступна через load_lineage_async).
+            idempotency_key: Ключ идемпотентности: повторный вызов с тем же ключом
+                             в пределах периода дедупликации не создаст второй контракт.
 
         Returns:
             Dict с полями:
@@ -293,12 +969,13 @@ class RealEstateHandler:
             - payload: Данные контракта
 
         Raises:
+            DuplicateCommandError: Если контракт с этим ключом уже был создан.
             Exception: При ошибках создания контракта или валидации.
         """
         registrar_id = await self._resolve_party(self.client, registrar)
         owner_id = await self._resolve_party(self.client, owner)
 
-        event = await self.client.create(
+        event = await self._create(
             "RealEstate:RealEstate",
             {
                 "registrar": registrar_id,
@@ -310,21 +987,142 @@ class RealEstateHandler:
                 "metaJson": meta_json,
                 "status": "Active",
                 "history": [],
+                "historyLimit": history_limit,
+                "transferCount": 0,
+                "lastOwner": None,
                 "listed": listed,
                 "price": price,
                 "currency": currency,
             },
             act_as=[Party(registrar_id)],
+            idempotency_key=idempotency_key,
         )
         return to_jsonable(event)
 
-    async def transfer_property_async(self, contract_id: str, new_owner: str):
+    async def ensure_registry_async(self, registrar: str, history_limit: Optional[int] = None) -> str:
+        """
+        Возвращает ID контракта Registry регистратора, создавая его при отсутствии.
+
+        Args:
+            registrar: Party регистратора.
+            history_limit: historyLimit объектов, регистрируемых через этот Registry.
+
+        Returns:
+            str: ID контракта Registry.
+
+        Raises:
+            Exception: При ошибках запроса или создания контракта.
+        """
+        registrar_id = await self._resolve_party(self.client, registrar)
+        key = (registrar_id, history_limit)
+        if key in self._registry_cids:
+            return self._registry_cids[key]
+        registry_cid = None
+        for event in await self._query_events(
+            "RealEstate:Registry", query={"registrar": registrar_id}, read_as=[Party(registrar_id)],
+            primary=True,
+        ):
+            if to_jsonable(event.payload.get("historyLimit")) == history_limit:
+                registry_cid = str(event.contract_id)
+                self._remember_template(event.contract_id.value_type)
+                break
+        if registry_cid is None:
+            # created by name: works on a fresh ledger before any RealEstate exists
+            event = await self._create(
+                "RealEstate:Registry",
+                {"registrar": registrar_id, "historyLimit": history_limit},
+                act_as=[Party(registrar_id)],
+            )
+            registry_cid = str(event.contract_id)
+            self._remember_template(event.contract_id.value_type)
+        self._registry_cids[key] = registry_cid
+        return registry_cid
+
+    async def bulk_create_properties_async(
+        self,
+        registrar: str,
+        properties: List[Dict[str, Any]],
+        chunk_size: int = 200,
+        concurrency: int = 4,
+        history_limit: Optional[int] = None,
+        idempotency_key: Optional[str] = None,
+    ):
+        """
+        Регистрирует много объектов через choice Registry.BulkRegister.
+
+        Вместо отдельной транзакции на каждый объект входные данные делятся
+        на порции по chunk_size, и каждая порция создается одной транзакцией.
+        Порции независимы (BulkRegister — nonconsuming), поэтому отправляются
+        параллельно, не более concurrency одновременно.
+
+        Args:
+            registrar: Party регистратора.
+            properties: Список словарей с ключами как у create_property_async:
+                owner, property_id, address, property_type, area, meta_json,
+                price, currency и необязательный listed.
+            chunk_size: Максимальное число объектов в одной транзакции.
+            concurrency: Максимальное число одновременно отправляемых порций.
+            history_limit: historyLimit создаваемых объектов (см. create_property_async).
+            idempotency_key: Ключ идемпотентности всего набора; порция N отправляется
+                             с ключом "<key>:N", поэтому повторный запуск с теми же
+                             входными данными не регистрирует уже принятые порции.
+
+        Returns:
+            List[str]: ID созданных контрактов RealEstate в порядке properties
+            (None для объектов порций, принятых при предыдущем запуске).
+
+        Raises:
+            Exception: При ошибках валидации или выполнения choice; порции,
+            отправленные до ошибки, остаются зарегистрированными.
+        """
+        registrar_id = await self._resolve_party(self.client, registrar)
+        registry_cid = await self.ensure_registry_async(registrar_id, history_limit)
+        owners = await self._resolve_parties(self.client, list({p["owner"] for p in properties}))
+        specs = [
+            {
+                "owner": owners[p["owner"]],
+                "propertyId": p["property_id"],
+                "address": p["address"],
+                "propertyType": p["property_type"],
+                "area": p["area"],
+                "metaJson": p["meta_json"],
+                "listed": bool(p.get("listed", False)),
+                "price": p["price"],
+                "currency": p["currency"],
+            }
+            for p in properties
+        ]
+        chunks = [specs[i:i + chunk_size] for i in range(0, len(specs), max(1, chunk_size))]
+        window = asyncio.Semaphore(max(1, concurrency))
+
+        async def register(n, chunk):
+            async with window:
+                try:
+                    res = await self._exercise(
+                        registry_cid,
+                        "BulkRegister",
+                        {"specs": chunk},
+                        extra_act_as=[Party(registrar_id)],
+                        template="Registry",
+                        idempotency_key=f"{idempotency_key}:{n}" if idempotency_key is not None else None,
+                    )
+                except DuplicateCommandError:
+                    return [None] * len(chunk)
+            return [cid["contractId"] for cid in res["result"]]
+
+        results = await asyncio.gather(*(register(n, chunk) for n, chunk in enumerate(chunks)))
+        return [cid for chunk_cids in results for cid in chunk_cids]
+
+    async def transfer_property_async(self, contract_id: Optional[str], new_owner: str,
+                                      property_id: Optional[str] = None):
         """
         Передает право собственности новому владельцу (choice Transfer).
 
         Args:
             contract_id: ID контракта RealEstate.
             new_owner: Party нового владельца.
+            property_id: ID объекта; если задан — команда выполняется через
+                         sequencer, и contract_id может быть None.
 
         Returns:
             Результат выполнения choice (новый контракт с обновленным owner).
@@ -332,15 +1130,18 @@ class RealEstateHandler:
         Raises:
             Exception: Если контракт архивирован или вызов не авторизован.
         """
-        return await self._exercise(contract_id, "Transfer", {"newOwner": new_owner})
+        return await self._exercise_property(contract_id, property_id, "Transfer", {"newOwner": new_owner})
 
-    async def update_meta_async(self, contract_id: str, meta_json: str):
+    async def update_meta_async(self, contract_id: Optional[str], meta_json: str,
+                                property_id: Optional[str] = None):
         """
         Обновляет метаданные объекта недвижимости (choice UpdateMeta).
 
         Args:
             contract_id: ID контракта RealEstate.
             meta_json: Новая JSON строка с метаданными.
+            property_id: ID объекта; если задан — команда выполняется через
+                         sequencer, и contract_id может быть None.
 
         Returns:
             Результат выполнения choice (новый контракт с обновленными метаданными).
@@ -348,9 +1149,9 @@ class RealEstateHandler:
         Raises:
             Exception: Если контракт архивирован или вызов не авторизован.
         """
-        return await self._exercise(contract_id, "UpdateMeta", {"newMetaJson": meta_json})
+        return await self._exercise_property(contract_id, property_id, "UpdateMeta", {"newMetaJson": meta_json})
 
-    async def archive_property_async(self, contract_id: str):
+    async def archive_property_async(self, contract_id: Optional[str], property_id: Optional[str] = None):
         """
         Архивирует контракт RealEstate (choice ArchiveProperty).
 
@@ -358,6 +1159,8 @@ class RealEstateHandler:
 
         Args:
             contract_id: ID контракта RealEstate.
+            property_id: ID объекта; если задан — команда выполняется через
+                         sequencer, и contract_id может быть None.
 
         Returns:
             Результат выполнения choice (пустой объект).
@@ -365,32 +1168,172 @@ class RealEstateHandler:
         Raises:
             Exception: Если контракт уже архивирован или вызов не авторизован.
         """
-        return await self._exercise(contract_id, "ArchiveProperty", {})
+        return await self._exercise_property(contract_id, property_id, "ArchiveProperty", {})
 
-    async def list_properties_async(self):
+    async def list_properties_async(self, where: Optional[List[Any]] = None, as_of: Optional[Any] = None):
         """
         Получает список всех активных контрактов RealEstate, видимых текущему party.
 
+        Args:
+            where: Условия на поля и атрибуты metaJson ("meta.rooms==3",
+                   "area>=50"; см. AttributeIndex.select). metaJson разбирается
+                   один раз на cid, запрос выполняется по индексу.
+            as_of: Offset или время (datetime / ISO строка), на которое нужен
+                   реестр. История (self.history) сначала дописывается до
+                   конца леджера, затем ответ собирается из ближайшего
+                   снимка и журнала изменений после него.
+
         Returns:
             List[Dict]: Список контрактов, каждый содержит:
             - contractId: ID контракта
             - payload: Данные контракта (все поля RealEstate)
 
         Raises:
+            ValueError: При неверном условии where, при as_of без history_dir
+                        или позже конца леджера.
             Exception: При ошибках запроса к леджеру.
         """
+        if as_of is not None:
+            if self.history is None:
+                raise ValueError("as_of queries need a history directory (history_dir)")
+            await self.history.sync(self)
+            result = self.history.state_at(as_of)
+            if where:
+                self._history_attributes.load(result)
+                matched = self._history_attributes.select(where)
+                result = [r for r in result if r["contractId"] in matched]
+            return result
         result = []
-        async for event in self.client.query("RealEstate:RealEstate"):
-            if isinstance(event, CreateEvent):
-                if self._template_type is None:
-                    self._template_type = event.contract_id.value_type
-                result.append({
-                    "contractId": str(event.contract_id),
-                    "payload": to_jsonable(event.payload),
-                })
+        for event in await self._read("properties", lambda: self._query_events("RealEstate:RealEstate")):
+            if self._template_type is None:
+                type(self)._template_type = event.contract_id.value_type
+            result.append({
+                "contractId": str(event.contract_id),
+                "payload": to_jsonable(event.payload),
+            })
+        if where:
+            self.attributes.load(result)
+            matched = self.attributes.select(where)
+            result = [r for r in result if r["contractId"] in matched]
         return result
 
-    async def mint_cash_async(self, issuer: str, owner: str, amount: str, currency: str):
+    async def search_properties_async(self, query: str, limit: int = 20, mode: str = "auto",
+                                      refresh: bool = True):
+        """
+        Ищет объекты по address, propertyId и propertyType (префикс, подстрока, опечатки).
+
+        Индекс (self.search) обновляется по текущему ACS только для изменившихся
+        cid; при refresh=False поиск выполняется по уже загруженному индексу
+        без обращения к леджеру (например, для подсказок при наборе).
+
+        Args:
+            query: Текст запроса.
+            limit: Максимальное число результатов.
+            mode: "auto", "prefix", "substring" или "fuzzy" (см. TextIndex.search).
+            refresh: Синхронизировать индекс с леджером перед поиском.
+
+        Returns:
+            List[Dict]: Записи {"contractId", "payload", "score"} по убыванию релевантности.
+
+        Raises:
+            ValueError: Если mode неизвестен.
+            Exception: При ошибках запроса к леджеру.
+        """
+        if refresh or not len(self.search):
+            self.search.load(await self.list_properties_async())
+        return self.search.search(query, limit=limit, mode=mode)
+
+    async def properties_near_async(self, lat: float, lon: float, radius_km: float,
+                                    limit: Optional[int] = None, refresh: bool = True):
+        """
+        Ищет объекты в радиусе от точки по координатам из metaJson.
+
+        Индекс (self.geo) обновляется по текущему ACS только для изменившихся
+        cid; при refresh=False запрос выполняется по уже загруженному индексу.
+
+        Args:
+            lat: Широта центра.
+            lon: Долгота центра.
+            radius_km: Радиус, км.
+            limit: Максимальное число результатов (ближайшие).
+            refresh: Синхронизировать индекс с леджером перед запросом.
+
+        Returns:
+            List[Dict]: Записи {"contractId", "payload", "lat", "lon", "distanceKm"}
+            от ближних к дальним.
+
+        Raises:
+            Exception: При ошибках запроса к леджеру.
+        """
+        if refresh or not len(self.geo):
+            self.geo.load(await self.list_properties_async())
+        return self.geo.within(lat, lon, radius_km, limit=limit)
+
+    async def properties_in_bbox_async(self, south: float, west: float, north: float, east: float,
+                                       refresh: bool = True):
+        """
+        Ищет объекты внутри прямоугольника координат (west > east — через антимеридиан).
+
+        Returns:
+            List[Dict]: Записи {"contractId", "payload", "lat", "lon"}.
+
+        Raises:
+            Exception: При ошибках запроса к леджеру.
+        """
+        if refresh or not len(self.geo):
+            self.geo.load(await self.list_properties_async())
+        return self.geo.bbox(south, west, north, east)
+
+    async def load_party_views_async(self):
+        """
+        Читает объединенный ACS для всех read_as parties и раскладывает его по parties.
+
+        Вместо отдельного соединения и сканирования ACS на каждого party
+        выполняется один запрос RealEstate и Cash от имени всех read_as parties.
+        Вид каждого party вычисляется по полям-стейкхолдерам контрактов:
+        owner/registrar для RealEstate и owner/issuer для Cash — ровно те
+        контракты, которые party видит сам как signatory или observer.
+
+        Returns:
+            Dict: подсказка party (как передана в read_as/party) ->
+            {"properties": [...], "cash": [...]} в формате list_properties_async
+            и list_cash_async.
+
+        Raises:
+            Exception: При ошибках запроса к леджеру.
+        """
+        properties = []
+        cash = []
+        for event in await self._query_events(
+            "RealEstate:RealEstate", "RealEstate:Cash",
+            read_as=[Party(p) for p in self.read_as],
+        ):
+            record = {
+                "contractId": str(event.contract_id),
+                "payload": to_jsonable(event.payload),
+            }
+            self._remember_template(event.contract_id.value_type)
+            if package_local_name(event.contract_id.value_type) == "RealEstate:Cash":
+                cash.append(record)
+            else:
+                properties.append(record)
+
+        views = {}
+        for hint, party_id in self._resolved_parties.items():
+            views[hint] = {
+                "properties": [
+                    r for r in properties
+                    if party_id in (r["payload"].get("owner"), r["payload"].get("registrar"))
+                ],
+                "cash": [
+                    r for r in cash
+                    if party_id in (r["payload"].get("owner"), r["payload"].get("issuer"))
+                ],
+            }
+        return views
+
+    async def mint_cash_async(self, issuer: str, owner: str, amount: str, currency: str,
+                              idempotency_key: Optional[str] = None):
         """
         Создает новый контракт Cash (демо-деньги для оплаты покупки).
 
@@ -399,6 +1342,8 @@ class RealEstateHandler:
             owner: Party владельца денег (обычно покупатель).
             amount: Сумма (строка, будет преобразована в Decimal).
             currency: Код валюты (например, "USD", "EUR").
+            idempotency_key: Ключ идемпотентности: повторный вызов с тем же ключом
+                             не выпустит деньги второй раз.
 
         Returns:
             Dict с полями:
@@ -406,11 +1351,12 @@ class RealEstateHandler:
             - payload: Данные контракта
 
         Raises:
+            DuplicateCommandError: Если контракт с этим ключом уже был создан.
             Exception: При ошибках создания контракта или валидации (amount > 0).
         """
         issuer_id = await self._resolve_party(self.client, issuer)
         owner_id = await self._resolve_party(self.client, owner)
-        event = await self.client.create(
+        event = await self._create(
             "RealEstate:Cash",
             {
                 "issuer": issuer_id,
@@ -419,8 +1365,11 @@ class RealEstateHandler:
                 "amount": amount,
             },
             act_as=[Party(owner_id)],
+            idempotency_key=idempotency_key,
         )
-        return to_jsonable(event)
+        result = to_jsonable(event)
+        self.wallet.apply_events([result])
+        return result
 
     async def list_cash_async(self):
         """
@@ -435,15 +1384,101 @@ class RealEstateHandler:
             Exception: При ошибках запроса к леджеру.
         """
         result = []
-        async for event in self.client.query("RealEstate:Cash"):
-            if isinstance(event, CreateEvent):
-                result.append({
-                    "contractId": str(event.contract_id),
-                    "payload": to_jsonable(event.payload),
-                })
+        for event in await self._read("cash", lambda: self._query_events("RealEstate:Cash")):
+            self._remember_template(event.contract_id.value_type)
+            result.append({
+                "contractId": str(event.contract_id),
+                "payload": to_jsonable(event.payload),
+            })
+        # only this party's own holdings are authoritative: with_party copies share the wallet
+        self.wallet.load(result, owner=self.party)
         return result
 
-    async def list_for_sale_async(self, contract_id: str, price: str, currency: str):
+    async def _wallet_holdings(self, owner: str, currency: str) -> List[Dict[str, Any]]:
+        """
+        Возвращает контракты Cash владельца из индекса кошелька.
+
+        Контракты владельца загружаются из леджера (list_cash_async) при
+        первом обращении к нему и далее поддерживаются событиями
+        mint/split/merge/buy. Кошелек общий для копий with_party, поэтому
+        загрузка одного владельца не затирает контракты других.
+        """
+        if owner not in self.wallet.owners:
+            records = await self.list_cash_async()
+            if owner != self.party:
+                self.wallet.load(records, owner=owner)
+        return self.wallet.holdings(owner, currency)
+
+    async def split_cash_async(self, contract_id: str, amount: str):
+        """
+        Делит контракт Cash на два (choice Split).
+
+        Args:
+            contract_id: ID контракта Cash (владелец — текущий party).
+            amount: Сумма отделяемой части (0 < amount < суммы контракта).
+
+        Returns:
+            Результат выполнения choice: result содержит пару
+            (ID контракта на amount, ID контракта с остатком).
+
+        Raises:
+            Exception: Если сумма вне допустимого диапазона или вызов не авторизован.
+        """
+        res = await self._exercise(contract_id, "Split", {"splitAmount": amount}, template="Cash")
+        self.wallet.apply_events(res["events"])
+        return res
+
+    async def merge_cash_async(self, contract_id: str, other_cids: List[str]):
+        """
+        Объединяет несколько контрактов Cash в один (choice Merge).
+
+        Args:
+            contract_id: ID базового контракта Cash.
+            other_cids: ID контрактов того же владельца, эмитента и валюты.
+
+        Returns:
+            Результат выполнения choice (ID объединенного контракта).
+
+        Raises:
+            Exception: Если владелец, эмитент или валюта не совпадают.
+        """
+        res = await self._exercise(contract_id, "Merge", {"otherCids": other_cids}, template="Cash")
+        self.wallet.apply_events(res["events"])
+        return res
+
+    async def fund_payment_async(self, amount: str, currency: str, holdings=None) -> str:
+        """
+        Готовит контракт Cash текущего party ровно на amount для choice Buy.
+
+        Подбирает контракты через select_coins и при необходимости выполняет
+        Merge и/или Split (не более двух транзакций).
+
+        Args:
+            amount: Требуемая сумма (строка Decimal).
+            currency: Код валюты.
+            holdings: Контракты Cash владельца; если не переданы, берутся из индекса кошелька.
+
+        Returns:
+            str: ID контракта Cash на точную сумму.
+
+        Raises:
+            ValueError: Если средств недостаточно.
+            Exception: При ошибках выполнения Merge/Split.
+        """
+        if holdings is None:
+            holdings = await self._wallet_holdings(self.party, currency)
+        plan = select_coins(holdings, amount, currency)
+        cid = plan["cids"][0]
+        if plan["action"] in ("merge", "merge_split"):
+            merged = await self.merge_cash_async(cid, plan["cids"][1:])
+            cid = merged["result"]["contractId"]
+        if plan["action"] in ("split", "merge_split"):
+            split = await self.split_cash_async(cid, amount)
+            cid = split["result"]["_1"]["contractId"]
+        return cid
+
+    async def list_for_sale_async(self, contract_id: Optional[str], price: str, currency: str,
+                                  property_id: Optional[str] = None):
         """
         Выставляет объект недвижимости на продажу (choice ListForSale).
 
@@ -453,6 +1488,8 @@ class RealEstateHandler:
             contract_id: ID контракта RealEstate.
             price: Цена продажи (строка, будет преобразована в Decimal, должна быть > 0).
             currency: Код валюты (не может быть пустым).
+            property_id: ID объекта; если задан — команда выполняется через
+                         sequencer, и contract_id может быть None.
 
         Returns:
             Результат выполнения choice (новый контракт с listed=True).
@@ -460,13 +1497,14 @@ class RealEstateHandler:
         Raises:
             Exception: Если контракт архивирован, цена <= 0, или currency пустая.
         """
-        return await self._exercise(
+        return await self._exercise_property(
             contract_id,
+            property_id,
             "ListForSale",
             {"newPrice": price, "newCurrency": currency},
         )
 
-    async def delist_property_async(self, contract_id: str):
+    async def delist_property_async(self, contract_id: Optional[str], property_id: Optional[str] = None):
         """
         Снимает объект недвижимости с продажи (choice Delist).
 
@@ -474,6 +1512,8 @@ class RealEstateHandler:
 
         Args:
             contract_id: ID контракта RealEstate.
+            property_id: ID объекта; если задан — команда выполняется через
+                         sequencer, и contract_id может быть None.
 
         Returns:
             Результат выполнения choice (новый контракт с listed=False).
@@ -481,9 +1521,10 @@ class RealEstateHandler:
         Raises:
             Exception: Если контракт архивирован или вызов не авторизован.
         """
-        return await self._exercise(contract_id, "Delist", {})
+        return await self._exercise_property(contract_id, property_id, "Delist", {})
 
-    async def buy_property_async(self, contract_id: str, price: str, currency: str, buyer: str, payment_cid: str, seller: str):
+    async def buy_property_async(self, contract_id: Optional[str], price: str, currency: str, buyer: str, payment_cid: Optional[str], seller: str,
+                                 property_id: Optional[str] = None):
         """
         Покупает объект недвижимости (choice Buy - multi-controller).
 
@@ -500,7 +1541,12 @@ class RealEstateHandler:
             currency: Валюта (должна совпадать с валютой в контракте).
             buyer: Party покупателя.
             payment_cid: ID контракта Cash с точной суммой и валютой.
+                         None — подобрать из индекса кошелька: контракт buyer
+                         на точную сумму, а если его нет и handler действует от
+                         имени buyer — подготовить его через fund_payment_async.
             seller: Party продавца (текущий owner).
+            property_id: ID объекта; если задан — команда выполняется через
+                         sequencer, и contract_id может быть None.
 
         Returns:
             Результат выполнения choice (новый контракт с buyer как owner).
@@ -512,11 +1558,20 @@ class RealEstateHandler:
             - payment contract не принадлежит buyer
             - сумма в payment контракте не совпадает
             - вызов не авторизован обоими parties
+            ValueError: Если payment_cid=None и подходящих средств нет.
         """
         buyer_id = await self._resolve_party(self.client, buyer)
         seller_id = await self._resolve_party(self.client, seller)
-        return await self._exercise(
+        if payment_cid is None:
+            holdings = await self._wallet_holdings(buyer_id, currency)
+            payment_cid = self.wallet.find_exact(buyer_id, currency, price)
+            if payment_cid is None:
+                if buyer_id != self.party:
+                    raise ValueError(f"No {currency} holding of exactly {price} for buyer")
+                payment_cid = await self.fund_payment_async(price, currency, holdings=holdings)
+        res = await self._exercise_property(
             contract_id,
+            property_id,
             "Buy",
             {
                 "offeredPrice": price,
@@ -526,6 +1581,8 @@ class RealEstateHandler:
             },
             extra_act_as=[Party(buyer_id), Party(seller_id)],
         )
+        self.wallet.apply_events(res["events"])
+        return res
 
     async def list_parties_async(self):
         """
@@ -539,37 +1596,273 @@ class RealEstateHandler:
         Raises:
             Exception: При ошибках запроса к леджеру.
         """
-        infos = await self.client.list_known_parties()
+        infos = await self._read(
+            "parties",
+            lambda: self._on_reader(
+                lambda client: client.list_known_parties(timeout=remaining(self.timeout)),
+                key=lambda info: str(info.party),
+            ),
+        )
         return [
             {"id": str(info.party), "displayName": info.display_name}
             for info in infos
         ]
 
-    async def allocate_parties_async(self, hints: List[str]):
+    async def resolve_parties_async(self, hints: List[str]) -> Dict[str, str]:
+        """
+        Резолвит подсказки parties в канонические ID одним запросом списка parties.
+
+        Args:
+            hints: Подсказки или канонические ID parties.
+
+        Returns:
+            Dict: подсказка -> канонический ID (или сама подсказка, если party не найден).
+        """
+        return await self._resolve_parties(self.client, list(hints))
+
+    async def allocate_parties_async(self, hints: List[str], concurrency: int = 16, retries: int = 3):
         """
         Создает новые parties в леджере (пропускает уже существующие).
 
-        Проверяет существование каждого party перед созданием.
-        Party считается существующим, если его ID начинается с "{hint}-"
+        Список известных parties запрашивается один раз; недостающие parties
+        создаются параллельно, но не более concurrency запросов одновременно
+        и в пределах общего лимита команд self.limiter. Party считается существующим, если его ID начинается с "{hint}-"
         или displayName совпадает с hint.
 
+        Повтор безопасен: ID party определяется подсказкой, поэтому повторная
+        аллокация не создает дубликат, а ответ "already exists" (например,
+        если первая попытка прошла, но ответ был потерян) считается успехом.
+
         Args:
             hints: Список подсказок для создания parties (например, ["Buyer", "Seller"]).
+            concurrency: Максимальное число одновременных запросов аллокации.
+            retries: Число повторов при временных ошибках для каждого party.
 
         Returns:
-            List[str]: Список канонических ID созданных parties.
+            List[str]: Список канонических ID созданных parties (в порядке hints).
             Пустой список, если все parties уже существовали.
 
         Raises:
-            Exception: При ошибках создания parties в леджере.
+            Exception: При ошибках создания parties после исчерпания повторов.
         """
-        infos = await self.client.list_known_parties()
-
-        created = []
-        for hint in hints:
-            if any(str(info.party).startswith(f"{hint}-") or info.display_name == hint for info in infos):
-                continue
-            p = await self.client.allocate_party(identifier_hint=hint, display_name=hint)
-            created.append(str(p.party))
+        infos = await self.client.list_known_parties(timeout=remaining(self.timeout))
+
+        existing = set()
+        for info in infos:
+            existing.add(info.display_name)
+            party_id = str(info.party)
+            # every "{hint}-" prefix of the id matches, as in _resolve_party
+            for i, ch in enumerate(party_id):
+                if ch == "-":
+                    existing.add(party_id[:i])
+
+        window = asyncio.Semaphore(max(1, concurrency))
+
+        async def allocate(hint: str) -> Optional[str]:
+            for attempt in range(retries + 1):
+                try:
+                    async with window, self.limiter.slot():
+                        p = await self.client.allocate_party(
+                            identifier_hint=hint, display_name=hint, timeout=remaining(self.timeout),
+                        )
+                    return str(p.party)
+                except Exception as ex:
+                    if "already exists" in str(ex).lower() or "ALREADY_EXISTS" in str(ex):
+                        return None
+                    if attempt == retries:
+                        raise
+                    await asyncio.sleep(0.2 * 2 ** attempt)
+
+        missing = list(dict.fromkeys(hint for hint in hints if hint not in existing))
+        allocated = await asyncio.gather(*(allocate(hint) for hint in missing))
+        created = [party for party in allocated if party is not None]
 
         return to_jsonable(created)
+
+    # =============================
+    # STREAMING
+    # =============================
+
+    async def get_ledger_end_async(self) -> str:
+        """
+        Возвращает текущий offset конца леджера.
+
+        Returns:
+            str: Абсолютный offset, с которого можно начинать поток событий.
+        """
+        self._require_grpc("ledger offsets")
+        return await self.client.get_ledger_end(timeout=remaining(self.timeout))
+
+    async def load_snapshot_async(self, templates=STREAM_TEMPLATES):
+        """
+        Читает активные контракты (ACS) нескольких шаблонов за один проход.
+
+        Возвращаемый offset указывает, с какого места продолжать чтение
+        через stream_events_async, чтобы не пропустить и не задвоить события.
+
+        Args:
+            templates: Шаблоны "Module:Entity" для чтения.
+
+        Returns:
+            Dict с полями:
+            - offset: offset, на котором снят снимок ACS
+            - contracts: список {"template", "contractId", "payload"}
+
+        Raises:
+            Exception: При ошибках запроса к леджеру.
+        """
+        contracts = []
+        offset = None
+        async for record in self.iter_snapshot_async(templates):
+            if "contractId" in record:
+                contracts.append(record)
+            else:
+                offset = record["offset"]
+        return {"offset": offset, "contracts": contracts}
+
+    async def iter_snapshot_async(self, templates=STREAM_TEMPLATES):
+        """
+        Читает ACS потоком, не накапливая контракты в памяти.
+
+        Args:
+            templates: Шаблоны "Module:Entity" для чтения.
+
+        Yields:
+            Записи {"template", "contractId", "payload"} по одной, а последней —
+            {"offset": offset снимка} (как в load_snapshot_async).
+
+        Raises:
+            asyncio.TimeoutError: Если очередная запись не пришла в срок вызова.
+            Exception: При ошибках запроса к леджеру.
+        """
+        async with self.client.query_many(*templates, read_as=[Party(self.party)]) as stream:
+            events = aiter(stream)
+            while True:
+                # the ACS can be large: the deadline bounds the wait for each record, not the whole read
+                try:
+                    event = await asyncio.wait_for(events.__anext__(), remaining(self.timeout))
+                except StopAsyncIteration:
+                    break
+                if isinstance(event, CreateEvent):
+                    yield {
+                        "template": package_local_name(event.contract_id.value_type),
+                        "contractId": str(event.contract_id),
+                        "payload": to_jsonable(event.payload),
+                    }
+                elif isinstance(event, Boundary):
+                    yield {"offset": event.offset}
+
+    async def stream_events_async(self, offset: Optional[str] = None,
+                                  templates=STREAM_TEMPLATES,
+                                  end_offset: Optional[str] = None):
+        """
+        Асинхронный генератор событий RealEstate и Cash из потока транзакций.
+
+        Читает дерево транзакций (GetTransactionTrees), поэтому помимо
+        создания и архивации контрактов отдает имена выполненных choice.
+        Создания отдаются только для контрактов, где party (или read_as)
+        подписант или наблюдатель: остальные party лишь видел в дереве, и их
+        архивацию он не получит. Архивация может прийти и для контракта,
+        созданного без party (например, Buy от имени покупателя).
+        Без end_offset поток не завершается сам: вызывающий код прерывает
+        итерацию (break или отмена задачи), при этом gRPC-стрим отменяется.
+
+        Args:
+            offset: Offset, после которого начинать чтение. None — с начала леджера.
+            templates: Шаблоны "Module:Entity", события которых нужно отдавать.
+            end_offset: Offset, на котором поток завершается (включительно).
+
+        Yields:
+            Dict с полями:
+            - offset: offset транзакции
+            - effectiveAt: время транзакции (ISO)
+            - event: "created", "archived" (consuming choice) или "exercised"
+            - template: имя шаблона ("RealEstate:Cash" и т.п.)
+            - contractId: ID контракта
+            - payload: данные контракта (только для "created")
+            - choice, actingParties: для "archived"/"exercised"
+
+        Raises:
+            Exception: При ошибках gRPC-стрима.
+        """
+        self._require_grpc("the transaction stream")
+        wanted = set(templates)
+        codec = self.client.codec
+        # dazl exposes only the flat transaction stream, which carries no choice names;
+        # trees are read directly over the connection's channel
+        with self.client._call(read_as=[Party(self.party)]) as call:
+            read_as = await call.get_read_as()
+            stakeholders = {str(party) for party in read_as}
+            tx_filter = lapipb.TransactionFilter(
+                filters_by_party={party: lapipb.Filters() for party in read_as}
+            )
+            request = lapipb.GetTransactionsRequest(
+                ledger_id=call.ledger_id,
+                filter=tx_filter,
+                begin=codec.encode_begin_offset(offset),
+                end=codec.encode_end_offset(end_offset),
+            )
+            stub = call.grpc_stub(lapipb.TransactionServiceStub)
+            response_stream = stub.GetTransactionTrees(request, **call.grpc_kwargs_infinite_timeout)
+        try:
+            async for response in response_stream:
+                for tx in response.transactions:
+                    effective_at = tx.effective_at.ToDatetime().isoformat()
+                    pending = list(reversed(tx.root_event_ids))
+                    while pending:
+                        tree_event = tx.events_by_id[pending.pop()]
+                        if tree_event.WhichOneof("kind") == "created":
+                            ev = tree_event.created
+                            template = f"{ev.template_id.module_name}:{ev.template_id.entity_name}"
+                            # trees also carry creates the party only witnessed (the new owner's
+                            # RealEstate after Transfer, the seller's Cash after Buy); their archive
+                            # is never delivered to it, so they must not look active
+                            if template not in wanted or not is_stakeholder(ev, stakeholders):
+                                continue
+                            created = await codec.decode_created_event(ev)
+                            yield {
+                                "offset": tx.offset,
+                                "effectiveAt": effective_at,
+                                "event": "created",
+                                "template": template,
+                                "contractId": created.contract_id.value,
+                                "payload": to_jsonable(created.payload),
+                            }
+                        else:
+                            ev = tree_event.exercised
+                            pending.extend(reversed(ev.child_event_ids))
+                            template = f"{ev.template_id.module_name}:{ev.template_id.entity_name}"
+                            if template not in wanted:
+                                continue
+                            yield {
+                                "offset": tx.offset,
+                                "effectiveAt": effective_at,
+                                "event": "archived" if ev.consuming else "exercised",
+                                "template": template,
+                                "contractId": ev.contract_id,
+                                "choice": ev.choice,
+                                "actingParties": list(ev.acting_parties),
+                            }
+        finally:
+            response_stream.cancel()
+
+    async def load_lineage_async(self, property_ids=None) -> OwnershipLineage:
+        """
+        Возвращает полную историю владельцев по потоку транзакций.
+
+        История хранится в self.lineage вместе с offset: первый вызов читает
+        RealEstate-события от начала леджера, следующие — только новые
+        транзакции до текущего конца. Поэтому работает и для объектов с
+        ограниченной on-ledger историей (historyLimit).
+
+        Args:
+            property_ids: Если задано — вернуть только эти propertyId.
+
+        Returns:
+            OwnershipLineage: Индекс владельцев по propertyId.
+
+        Raises:
+            Exception: При ошибках чтения потока.
+        """
+        await self.lineage.sync(self)
+        return self.lineage if property_ids is None else self.lineage.subset(property_ids)
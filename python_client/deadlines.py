@@ -0,0 +1,121 @@
+import asyncio
+import contextlib
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Awaitable, Callable, Deque, Optional, TypeVar
+
+
+T = TypeVar("T")
+
+# absolute time.monotonic() deadline of the current logical call; inherited by tasks it spawns
+_DEADLINE: ContextVar[Optional[float]] = ContextVar("ledger_deadline", default=None)
+
+
+@contextlib.contextmanager
+def deadline(seconds: float):
+    """
+    Ограничивает по времени все вызовы к леджеру внутри блока.
+
+    Вложенные блоки не могут продлить внешний срок. Срок наследуется
+    задачами, созданными внутри блока (asyncio.gather, create_task).
+
+    Пример:
+        with deadline(2.0):
+            properties = await handler.list_properties_async()
+    """
+    expires = time.monotonic() + seconds
+    current = _DEADLINE.get()
+    if current is not None:
+        expires = min(expires, current)
+    token = _DEADLINE.set(expires)
+    try:
+        yield
+    finally:
+        _DEADLINE.reset(token)
+
+
+def remaining(default: Optional[float] = None) -> Optional[float]:
+    """
+    Возвращает время до срока текущего вызова в секундах.
+
+    Args:
+        default: Таймаут по умолчанию (используется, если он короче срока
+                 или срок не задан).
+
+    Returns:
+        Секунды до срока или None, если ни срок, ни default не заданы.
+
+    Raises:
+        asyncio.TimeoutError: Если срок уже истек.
+    """
+    expires = _DEADLINE.get()
+    if expires is None:
+        return default
+    left = expires - time.monotonic()
+    if left <= 0:
+        raise asyncio.TimeoutError("ledger call deadline exceeded")
+    return min(left, default) if default is not None else left
+
+
+class LatencyTracker:
+    """
+    Скользящее окно задержек вызова для оценки перцентилей.
+    """
+
+    def __init__(self, window: int = 200):
+        self.samples: Deque[float] = deque(maxlen=window)
+
+    def record(self, seconds: float) -> None:
+        self.samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """
+        Возвращает перцентиль q (0..1) или None, если данных нет.
+        """
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def hedged(call: Callable[[], Awaitable[T]], tracker: LatencyTracker,
+                 min_samples: int = 20, initial_delay: float = 0.5) -> T:
+    """
+    Выполняет идемпотентное чтение с дублирующим запросом (hedging).
+
+    Если первый запрос не ответил за p95 наблюдаемой задержки, отправляется
+    второй такой же; возвращается первый успешный ответ, а оставшийся запрос
+    отменяется (его поток gRPC закрывается). Ошибка возвращается, только
+    если не удались оба запроса.
+
+    Args:
+        call: Фабрика корутины запроса (вызывается один или два раза).
+        tracker: Окно задержек этого вида запроса.
+        min_samples: Сколько замеров нужно, прежде чем доверять p95.
+        initial_delay: Задержка перед дублем, пока замеров мало.
+    """
+    delay = tracker.percentile(0.95) if len(tracker.samples) >= min_samples else initial_delay
+    starts = [time.monotonic()]
+    tasks = [asyncio.ensure_future(call())]
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if not done:
+            starts.append(time.monotonic())
+            tasks.append(asyncio.ensure_future(call()))
+        error = None
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    tracker.record(time.monotonic() - starts[tasks.index(task)])
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        losers = [task for task in tasks if not task.done()]
+        for task in losers:
+            task.cancel()
+        # let cancelled reads close their streams before returning
+        await asyncio.gather(*losers, return_exceptions=True)
@@ -0,0 +1,334 @@
+import decimal
+import json
+import operator
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from python_client.attributes import META_PREFIX, coerce, flatten, parse_predicate
+from python_client.client import STREAM_TEMPLATES
+from python_client.history import parse_as_of
+
+
+FORMATS = ("parquet", "arrow")
+DEFAULT_BATCH_SIZE = 10000
+DAML_DECIMAL = (38, 10)  # Daml Decimal is Numeric 10
+
+_COMPARE = {
+    "==": operator.eq, "!=": operator.ne,
+    ">": operator.gt, ">=": operator.ge, "<": operator.lt, "<=": operator.le,
+}
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError("Arrow/Parquet export requires pyarrow: pip install pyarrow") from None
+    return pyarrow
+
+
+def schema_for(template: str):
+    """
+    Схема Arrow шаблона: Decimal — decimal128(38, 10), parties, валюты и
+    типы объектов — словарные строки (dictionary<int32, string>).
+
+    Raises:
+        ValueError: Если шаблон не экспортируется.
+    """
+    pa = _pyarrow()
+    party = pa.dictionary(pa.int32(), pa.string())
+    label = pa.dictionary(pa.int32(), pa.string())
+    amount = pa.decimal128(*DAML_DECIMAL)
+    if template == "RealEstate:RealEstate":
+        fields = [
+            ("contractId", pa.string()),
+            ("registrar", party),
+            ("owner", party),
+            ("propertyId", pa.string()),
+            ("address", pa.string()),
+            ("propertyType", label),
+            ("area", amount),
+            ("metaJson", pa.string()),
+            ("status", label),
+            ("history", pa.list_(pa.string())),
+            ("historyLimit", pa.int64()),
+            ("transferCount", pa.int64()),
+            ("lastOwner", party),
+            ("listed", pa.bool_()),
+            ("price", amount),
+            ("currency", label),
+        ]
+    elif template == "RealEstate:Cash":
+        fields = [
+            ("contractId", pa.string()),
+            ("issuer", party),
+            ("owner", party),
+            ("currency", label),
+            ("amount", amount),
+        ]
+    else:
+        raise ValueError(f"Cannot export template {template!r}, expected one of {STREAM_TEMPLATES}")
+    return pa.schema(fields, metadata={"template": template})
+
+
+def _kind(schema, name: str, value: Any) -> str:
+    pa = _pyarrow()
+    index = schema.get_field_index(name)
+    if index < 0:
+        # metaJson attributes: the type comes from the value itself
+        if isinstance(value, bool):
+            return "boolean"
+        return "number" if isinstance(value, (int, float)) else "string"
+    field_type = schema.field(index).type
+    if pa.types.is_decimal(field_type) or pa.types.is_integer(field_type):
+        return "number"
+    return "boolean" if pa.types.is_boolean(field_type) else "string"
+
+
+def compile_filter(where: Optional[List[str]]):
+    """
+    Разбирает условия where (как в AttributeIndex.select) один раз.
+
+    Returns:
+        Функция (schema, record) -> bool или None, если условий нет.
+
+    Raises:
+        ValueError: При неверном условии.
+    """
+    if not where:
+        return None
+    predicates = [parse_predicate(p) for p in where]
+
+    def matches(schema, record: Dict[str, Any]) -> bool:
+        payload = record["payload"]
+        values = dict(payload)
+        if any(name.startswith(META_PREFIX) for name, _, _ in predicates):
+            try:
+                meta = json.loads(payload.get("metaJson") or "{}")
+            except ValueError:
+                meta = {}
+            values.update(flatten(meta if isinstance(meta, dict) else {}))
+        for name, op, expected in predicates:
+            actual = values.get(name)
+            if actual is None:
+                return False
+            kind = _kind(schema, name, actual)
+            try:
+                if not _COMPARE[op](coerce(actual, kind), coerce(expected, kind)):
+                    return False
+            except (ValueError, TypeError):
+                return False
+        return True
+
+    return matches
+
+
+class BatchBuilder:
+    """
+    Накапливает записи одного шаблона по колонкам и выдает RecordBatch
+    каждые batch_size строк, поэтому в памяти не больше одного батча.
+    """
+
+    def __init__(self, template: str, batch_size: int = DEFAULT_BATCH_SIZE):
+        self.template = template
+        self.schema = schema_for(template)
+        self.batch_size = batch_size
+        self.rows = 0
+        self._columns: Dict[str, List[Any]] = {name: [] for name in self.schema.names}
+        pa = _pyarrow()
+        # the JSON API renders Decimal and Int as strings, dazl renders Int as int
+        self._convert = {
+            field.name: decimal.Decimal if pa.types.is_decimal(field.type) else int
+            for field in self.schema
+            if pa.types.is_decimal(field.type) or pa.types.is_integer(field.type)
+        }
+
+    def __len__(self) -> int:
+        return len(self._columns["contractId"])
+
+    def add(self, record: Dict[str, Any]) -> None:
+        payload = record["payload"]
+        for name, column in self._columns.items():
+            value = record["contractId"] if name == "contractId" else payload.get(name)
+            if value is not None and name in self._convert:
+                value = self._convert[name](value)
+            column.append(value)
+
+    def full(self) -> bool:
+        return len(self) >= self.batch_size
+
+    def flush(self):
+        """
+        Возвращает накопленный RecordBatch (или None, если он пуст) и очищает буфер.
+        """
+        if not len(self):
+            return None
+        pa = _pyarrow()
+        batch = pa.RecordBatch.from_arrays(
+            [pa.array(self._columns[field.name], type=field.type) for field in self.schema],
+            schema=self.schema,
+        )
+        self.rows += batch.num_rows
+        for column in self._columns.values():
+            column.clear()
+        return batch
+
+
+async def _active_contracts(handler, templates, as_of: Optional[str]):
+    if as_of is None:
+        async for record in handler.iter_snapshot_async(templates):
+            yield record
+        return
+    history = getattr(handler, "history", None)
+    if history is not None and set(templates) <= set(history.templates):
+        await history.sync(handler)
+        for template in templates:
+            for record in history.state_at(as_of, template):
+                yield record
+        yield {"offset": as_of}
+        return
+    if parse_as_of(as_of)[0] != "offset":
+        raise ValueError("as_of by time needs the registry history (handler history_dir)")
+    # no snapshot at a past offset in the Ledger API: replay the stream up to it
+    active: Dict[str, Dict[str, Any]] = {}
+    async for event in handler.stream_events_async(None, templates, end_offset=as_of):
+        if event["event"] == "created":
+            active[event["contractId"]] = event
+        elif event["event"] == "archived":
+            active.pop(event["contractId"], None)
+    for record in active.values():
+        yield record
+    yield {"offset": as_of}
+
+
+async def iter_record_batches(handler, templates: Tuple[str, ...] = STREAM_TEMPLATES,
+                              batch_size: int = DEFAULT_BATCH_SIZE,
+                              where: Optional[List[str]] = None,
+                              as_of: Optional[str] = None):
+    """
+    Потоково читает активные контракты и выдает их батчами Arrow.
+
+    Контракты читаются одним проходом ACS и раскладываются по шаблонам; в
+    памяти держится не больше одного незаполненного батча на шаблон. При
+    as_of активный набор берется из handler.history (RegistryHistory), если
+    она настроена, иначе восстанавливается из потока транзакций; в обоих
+    случаях он держится в памяти целиком.
+
+    Args:
+        handler: Подключенный RealEstateHandler.
+        templates: Шаблоны "Module:Entity" (см. schema_for).
+        batch_size: Строк в батче.
+        where: Условия на поля и атрибуты metaJson ("price>=100000",
+               "meta.rooms==3"; синтаксис AttributeIndex.select).
+        as_of: Offset или время (с handler.history), на которые нужен снимок
+               (None — текущий ACS).
+
+    Yields:
+        {"template", "batch": pyarrow.RecordBatch} по мере заполнения, а
+        последним — {"offset": offset снимка}.
+
+    Raises:
+        ImportError: Если pyarrow не установлен.
+        ValueError: При неверном условии или шаблоне, при as_of по времени
+                    без handler.history.
+    """
+    builders = {template: BatchBuilder(template, batch_size) for template in templates}
+    matches = compile_filter(where)
+    offset = None
+    async for record in _active_contracts(handler, list(templates), as_of):
+        if "contractId" not in record:
+            offset = record["offset"]
+            continue
+        builder = builders.get(record["template"])
+        if builder is None or (matches is not None and not matches(builder.schema, record)):
+            continue
+        builder.add(record)
+        if builder.full():
+            yield {"template": builder.template, "batch": builder.flush()}
+    for builder in builders.values():
+        batch = builder.flush()
+        if batch is not None:
+            yield {"template": builder.template, "batch": batch}
+    yield {"offset": offset}
+
+
+def export_path(directory: str, template: str, fmt: str) -> str:
+    """
+    Имя файла шаблона в каталоге экспорта ("realestate.parquet", "cash.arrow").
+    """
+    return os.path.join(directory, f"{template.split(':')[-1].lower()}.{fmt}")
+
+
+class _Writer:
+    def __init__(self, path: str, schema, fmt: str, compression: str):
+        pa = _pyarrow()
+        self.path = path
+        self.fmt = fmt
+        self.rows = 0
+        self.batches = 0
+        if fmt == "parquet":
+            import pyarrow.parquet as pq
+            self._writer = pq.ParquetWriter(path, schema, compression=compression)
+        else:
+            options = pa.ipc.IpcWriteOptions(compression=compression)
+            self._writer = pa.ipc.new_file(path, schema, options=options)
+
+    def write(self, batch) -> None:
+        self._writer.write_batch(batch)
+        self.rows += batch.num_rows
+        self.batches += 1
+
+    def close(self, offset: Optional[str]) -> None:
+        if self.fmt == "parquet" and offset is not None:
+            self._writer.add_key_value_metadata({"ledgerOffset": offset})
+        self._writer.close()
+
+
+async def export_registry(handler, directory: str, fmt: str = "parquet",
+                          templates: Tuple[str, ...] = STREAM_TEMPLATES,
+                          batch_size: int = DEFAULT_BATCH_SIZE,
+                          where: Optional[List[str]] = None,
+                          as_of: Optional[str] = None,
+                          compression: str = "zstd") -> Dict[str, Any]:
+    """
+    Выгружает контракты в колоночные файлы: по файлу на шаблон.
+
+    Args:
+        handler: Подключенный RealEstateHandler.
+        directory: Каталог для файлов (создается при необходимости).
+        fmt: "parquet" или "arrow" (Arrow IPC file).
+        templates, batch_size, where, as_of: См. iter_record_batches.
+        compression: Кодек сжатия ("zstd", "lz4", ... ; "none" — без сжатия).
+
+    Returns:
+        Dict с полями offset и files (шаблон -> {"path", "rows", "batches"}).
+
+    Raises:
+        ValueError: Если формат неизвестен.
+        ImportError: Если pyarrow не установлен.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format {fmt!r}, expected one of {FORMATS}")
+    os.makedirs(directory, exist_ok=True)
+    compression = None if compression == "none" else compression
+    writers = {
+        template: _Writer(export_path(directory, template, fmt), schema_for(template), fmt, compression)
+        for template in templates
+    }
+    offset = None
+    try:
+        async for item in iter_record_batches(handler, templates, batch_size, where, as_of):
+            if "batch" in item:
+                writers[item["template"]].write(item["batch"])
+            else:
+                offset = item["offset"]
+    finally:
+        for writer in writers.values():
+            writer.close(offset)
+    return {
+        "offset": offset,
+        "files": {
+            template: {"path": w.path, "rows": w.rows, "batches": w.batches}
+            for template, w in writers.items()
+        },
+    }
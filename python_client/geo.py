@@ -0,0 +1,303 @@
+import math
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from python_client.attributes import MetaCache
+
+
+PROPERTY_TEMPLATE = "RealEstate:RealEstate"
+EARTH_RADIUS_KM = 6371.0088
+
+# metaJson keys that carry coordinates, checked at the top level and under these objects
+LAT_KEYS = ("lat", "latitude")
+LON_KEYS = ("lon", "lng", "long", "longitude")
+GEO_OBJECTS = ("geo", "location", "coordinates", "coords", "position")
+
+
+def _number(value: Any) -> Optional[float]:
+    if isinstance(value, bool):
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if math.isfinite(number) else None
+
+
+def coordinates(meta: Dict[str, Any]) -> Optional[Tuple[float, float]]:
+    """
+    Извлекает (lat, lon) из разобранного metaJson.
+
+    Поддерживаются ключи lat/latitude и lon/lng/long/longitude на верхнем
+    уровне или во вложенном объекте geo/location/coordinates/coords/position,
+    а также пара [lat, lon] в этих объектах. Числа могут быть строками.
+
+    Returns:
+        (lat, lon) или None, если координат нет или они вне диапазона.
+    """
+    for source in [meta] + [meta.get(key) for key in GEO_OBJECTS]:
+        if isinstance(source, (list, tuple)) and len(source) == 2:
+            lat, lon = _number(source[0]), _number(source[1])
+        elif isinstance(source, dict):
+            lat = next((_number(source[k]) for k in LAT_KEYS if k in source), None)
+            lon = next((_number(source[k]) for k in LON_KEYS if k in source), None)
+        else:
+            continue
+        if lat is not None and lon is not None and -90 <= lat <= 90 and -180 <= lon <= 180:
+            return lat, lon
+    return None
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """
+    Расстояние по дуге большого круга между двумя точками, км.
+    """
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((p2 - p1) / 2) ** 2
+         + math.cos(p1) * math.cos(p2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def zoom_cell_deg(zoom: int) -> float:
+    """
+    Размер ячейки кластеризации в градусах для уровня масштаба карты
+    (как у тайлов: на уровне 0 — весь мир, далее вдвое меньше на уровень;
+    на тайл приходится 4x4 ячейки).
+    """
+    return 360.0 / (2 ** max(0, zoom)) / 4
+
+
+class GeoIndex:
+    """
+    Пространственный индекс объектов RealEstate по координатам из metaJson.
+
+    Точки раскладываются по ячейкам равномерной сетки (cell_deg градусов);
+    запрос по прямоугольнику или радиусу просматривает только ячейки,
+    пересекающие область, и затем проверяет точки точно. Объекты без
+    координат в индекс не попадают. Индекс обновляется по одному контракту
+    (add/remove, события потока); metaJson разбирается один раз на cid
+    через общий MetaCache.
+
+    Пример:
+        index.load(await handler.list_properties_async())
+        index.within(52.52, 13.40, radius_km=5)
+    """
+
+    def __init__(self, meta_cache: Optional[MetaCache] = None, cell_deg: float = 0.05):
+        """
+        Args:
+            meta_cache: Кэш разобранного metaJson (можно разделять с AttributeIndex).
+            cell_deg: Размер ячейки сетки в градусах (0.05° ≈ 5.5 км по широте).
+                      Для уровней масштаба с ячейкой кластера не мельче cell_deg
+                      агрегаты кластеров поддерживаются инкрементально.
+        """
+        self.meta_cache = meta_cache if meta_cache is not None else MetaCache()
+        self.cell_deg = cell_deg
+        self.points: Dict[str, Tuple[float, float]] = {}  # cid -> (lat, lon)
+        self.records: Dict[str, Dict[str, Any]] = {}
+        self.cells: Dict[Tuple[int, int], Set[str]] = {}
+        # zoom -> cluster cell -> [sum of lat, sum of lon, count]
+        self.levels: Dict[int, Dict[Tuple[int, int], List[float]]] = {}
+        zoom = 0
+        while zoom_cell_deg(zoom) >= cell_deg:
+            self.levels[zoom] = {}
+            zoom += 1
+        self._seen: Set[str] = set()  # every indexed cid, with or without coordinates
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+    def __contains__(self, contract_id: str) -> bool:
+        return contract_id in self.points
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return math.floor(lat / self.cell_deg), math.floor(lon / self.cell_deg)
+
+    # =============================
+    # MAINTENANCE
+    # =============================
+
+    def add(self, record: Dict[str, Any]) -> None:
+        """
+        Индексирует запись RealEstate ({"contractId", "payload"}), если в metaJson есть координаты.
+        """
+        cid = record["contractId"]
+        if cid in self._seen:
+            return
+        self._seen.add(cid)
+        point = coordinates(self.meta_cache.get(cid, record["payload"].get("metaJson")))
+        if point is None:
+            return
+        self.points[cid] = point
+        self.records[cid] = record
+        self.cells.setdefault(self._cell(*point), set()).add(cid)
+        self._aggregate(point, 1)
+
+    def remove(self, contract_id: str) -> None:
+        """
+        Удаляет контракт из индекса (неизвестные cid игнорируются).
+        """
+        self._seen.discard(contract_id)
+        point = self.points.pop(contract_id, None)
+        if point is None:
+            return
+        del self.records[contract_id]
+        cell = self._cell(*point)
+        self.cells[cell].discard(contract_id)
+        if not self.cells[cell]:
+            del self.cells[cell]
+        self._aggregate(point, -1)
+
+    def _aggregate(self, point: Tuple[float, float], sign: int) -> None:
+        lat, lon = point
+        for zoom, level in self.levels.items():
+            size = zoom_cell_deg(zoom)
+            key = (math.floor(lat / size), math.floor(lon / size))
+            sums = level.setdefault(key, [0.0, 0.0, 0])
+            sums[0] += sign * lat
+            sums[1] += sign * lon
+            sums[2] += sign
+            if not sums[2]:
+                del level[key]
+
+    def load(self, records: Iterable[Dict[str, Any]]) -> None:
+        """
+        Приводит индекс к полному списку объектов, не разбирая повторно известные cid.
+        """
+        records = list(records)
+        current = {r["contractId"] for r in records}
+        for cid in [c for c in self._seen if c not in current]:
+            self.remove(cid)
+        for record in records:
+            self.add(record)
+
+    def apply(self, event: Dict[str, Any]) -> None:
+        """
+        Применяет событие stream_events_async.
+        """
+        if event.get("template") != PROPERTY_TEMPLATE:
+            return
+        if event["event"] == "created":
+            self.add(event)
+        elif event["event"] == "archived":
+            self.remove(event["contractId"])
+
+    # =============================
+    # QUERIES
+    # =============================
+
+    def _cells_in(self, south: float, west: float, north: float, east: float) -> List[Tuple[int, int]]:
+        (r0, c0), (r1, c1) = self._cell(south, west), self._cell(north, east)
+        if (r1 - r0 + 1) * (c1 - c0 + 1) > len(self.cells):
+            # the box spans more grid cells than are occupied: walk the occupied ones
+            return [(r, c) for r, c in self.cells if r0 <= r <= r1 and c0 <= c <= c1]
+        return [
+            (r, c)
+            for r in range(r0, r1 + 1) for c in range(c0, c1 + 1)
+            if (r, c) in self.cells
+        ]
+
+    def _bbox_cids(self, south: float, west: float, north: float, east: float) -> List[str]:
+        if west > east:
+            # the box crosses the antimeridian
+            return (self._bbox_cids(south, west, north, 180.0)
+                    + self._bbox_cids(south, -180.0, north, east))
+        return [
+            cid
+            for cell in self._cells_in(south, west, north, east)
+            for cid in self.cells[cell]
+            if south <= self.points[cid][0] <= north and west <= self.points[cid][1] <= east
+        ]
+
+    def _result(self, cid: str, **extra) -> Dict[str, Any]:
+        lat, lon = self.points[cid]
+        return {"contractId": cid, "payload": self.records[cid]["payload"], "lat": lat, "lon": lon, **extra}
+
+    def bbox(self, south: float, west: float, north: float, east: float) -> List[Dict[str, Any]]:
+        """
+        Объекты внутри прямоугольника (west > east — через антимеридиан).
+
+        Returns:
+            List[Dict]: Записи {"contractId", "payload", "lat", "lon"}.
+        """
+        return [self._result(cid) for cid in self._bbox_cids(south, west, north, east)]
+
+    def within(self, lat: float, lon: float, radius_km: float,
+               limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Объекты в радиусе radius_km от точки, от ближних к дальним.
+
+        Returns:
+            List[Dict]: Записи {"contractId", "payload", "lat", "lon", "distanceKm"}.
+        """
+        dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+        south, north = max(-90.0, lat - dlat), min(90.0, lat + dlat)
+        cos_lat = min(math.cos(math.radians(south)), math.cos(math.radians(north)))
+        if cos_lat < 1e-9 or dlat / cos_lat >= 180:
+            west, east = -180.0, 180.0  # the circle reaches a pole: every longitude
+        else:
+            dlon = dlat / cos_lat
+            west, east = (lon - dlon + 540) % 360 - 180, (lon + dlon + 540) % 360 - 180
+        found = []
+        for cid in self._bbox_cids(south, west, north, east):
+            distance = haversine_km(lat, lon, *self.points[cid])
+            if distance <= radius_km:
+                found.append((distance, cid))
+        found.sort()
+        return [self._result(cid, distanceKm=round(d, 3)) for d, cid in found[:limit]]
+
+    def clusters(self, zoom: int, bbox: Optional[Tuple[float, float, float, float]] = None) -> List[Dict[str, Any]]:
+        """
+        Агрегирует точки в кластеры для уровня масштаба карты.
+
+        Для уровней из self.levels кластеры, целиком попавшие в область,
+        берутся из инкрементальных агрегатов без обхода точек; точки
+        обходятся только в кластерах на границе области и на крупных
+        масштабах (где область мала).
+
+        Args:
+            zoom: Уровень масштаба (0 — весь мир; размер ячейки см. zoom_cell_deg).
+            bbox: Видимая область (south, west, north, east) или None — все точки.
+
+        Returns:
+            List[Dict]: Кластеры {"lat", "lon" (центр масс), "count", "contractIds"
+            (только для кластеров из одного объекта, иначе пусто)}.
+        """
+        size = zoom_cell_deg(zoom)
+        if bbox is None:
+            areas = [(-90.0, -180.0, 90.0, 180.0)]
+        elif bbox[1] > bbox[3]:
+            areas = [(bbox[0], bbox[1], bbox[2], 180.0), (bbox[0], -180.0, bbox[2], bbox[3])]
+        else:
+            areas = [tuple(bbox)]
+        groups: Dict[Tuple[int, int], List[Any]] = {}  # cluster cell -> [lat sum, lon sum, count]
+
+        def add_points(cids: List[str]) -> None:
+            for cid in cids:
+                lat, lon = self.points[cid]
+                group = groups.setdefault((math.floor(lat / size), math.floor(lon / size)), [0.0, 0.0, 0])
+                group[0] += lat
+                group[1] += lon
+                group[2] += 1
+
+        level = self.levels.get(zoom)
+        for south, west, north, east in areas:
+            if level is None:
+                add_points(self._bbox_cids(south, west, north, east))
+                continue
+            r0, c0, r1, c1 = (math.floor(south / size), math.floor(west / size),
+                              math.floor(north / size), math.floor(east / size))
+            for (r, c), sums in level.items():
+                if not (r0 <= r <= r1 and c0 <= c <= c1):
+                    continue
+                if south <= r * size and (r + 1) * size <= north and west <= c * size and (c + 1) * size <= east:
+                    groups[(r, c)] = list(sums)
+                else:
+                    add_points(self._bbox_cids(max(south, r * size), max(west, c * size),
+                                               min(north, (r + 1) * size), min(east, (c + 1) * size)))
+        result = []
+        for (r, c), (lat_sum, lon_sum, count) in groups.items():
+            cids = []
+            if count == 1:
+                cids = self._bbox_cids(r * size, c * size, min(90.0, (r + 1) * size), min(180.0, (c + 1) * size))
+            result.append({"lat": lat_sum / count, "lon": lon_sum / count, "count": count, "contractIds": cids})
+        return result
@@ -0,0 +1,290 @@
+import bisect
+import datetime
+import hashlib
+import json
+import os
+import re
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+
+PROPERTY_TEMPLATE = "RealEstate:RealEstate"
+HISTORY_TEMPLATES = (PROPERTY_TEMPLATE, "RealEstate:Cash")
+DEFAULT_CHECKPOINT_EVERY = 5000
+DEFAULT_HISTORY_DIR = os.getenv(
+    "HISTORY_DIR", os.path.join(os.path.expanduser("~"), ".cache", "real-estate"),
+)
+
+AsOf = Union[str, datetime.datetime]
+
+
+def history_path(host: str, port: int, party: str, directory: str = DEFAULT_HISTORY_DIR) -> str:
+    """
+    Каталог истории реестра для леджера и party.
+    """
+    digest = hashlib.sha1(party.encode()).hexdigest()[:12]
+    host = re.sub(r"[^\w.-]", "_", host)
+    return os.path.join(directory, f"history-{host}-{port}-{digest}")
+
+
+def parse_as_of(as_of: AsOf) -> Tuple[str, Any]:
+    """
+    Определяет, задан ли момент offset'ом или временем.
+
+    Строка, разбираемая как ISO дата/время ("2026-03-01", "2026-03-01T12:00:00Z"),
+    считается временем, остальные строки — offset'ом. Время без часового
+    пояса считается UTC.
+
+    Returns:
+        ("offset", str) или ("time", datetime с часовым поясом).
+    """
+    moment = as_of
+    if isinstance(moment, str):
+        try:
+            if len(moment) < 10 or moment[4] != "-":
+                raise ValueError(moment)
+            moment = datetime.datetime.fromisoformat(moment.replace("Z", "+00:00"))
+        except ValueError:
+            return "offset", as_of
+    if isinstance(moment, datetime.date) and not isinstance(moment, datetime.datetime):
+        moment = datetime.datetime.combine(moment, datetime.time())
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=datetime.timezone.utc)
+    return "time", moment
+
+
+def _event_time(value: Optional[str]) -> Optional[datetime.datetime]:
+    if not value:
+        return None
+    moment = datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return moment if moment.tzinfo is not None else moment.replace(tzinfo=datetime.timezone.utc)
+
+
+class RegistryHistory:
+    """
+    История активных контрактов для запросов на момент в прошлом.
+
+    Поток транзакций записывается в компактный журнал изменений (NDJSON:
+    offset, время, создание с payload или архивация), а каждые
+    checkpoint_every изменений сохраняется полный снимок активного набора
+    (checkpoint) с позицией в журнале. Ответ на момент as_of — ближайший
+    checkpoint не позже as_of и проигрывание не более checkpoint_every
+    изменений журнала после него. Последние загруженные снимки держатся в
+    памяти, поэтому повторные запросы не читают их с диска.
+
+    Каталог:
+        history.json         — offset, до которого записан журнал, и список checkpoints;
+        deltas.ndjson        — журнал изменений;
+        checkpoint-<n>.json  — снимки активного набора.
+
+    Пример:
+        history = RegistryHistory("/var/lib/real-estate/history")
+        await history.sync(handler)
+        history.state_at("2026-03-01T00:00:00Z")
+    """
+
+    def __init__(self, directory: str, templates=HISTORY_TEMPLATES,
+                 checkpoint_every: int = DEFAULT_CHECKPOINT_EVERY, cached_checkpoints: int = 2):
+        """
+        Args:
+            directory: Каталог истории (создается при необходимости).
+            templates: Шаблоны "Module:Entity", изменения которых записываются.
+            checkpoint_every: Число изменений между снимками.
+            cached_checkpoints: Сколько снимков держать в памяти.
+        """
+        self.directory = directory
+        self.templates = tuple(templates)
+        self.checkpoint_every = checkpoint_every
+        self.cached_checkpoints = cached_checkpoints
+        self.offset: Optional[str] = None  # ledger offset the log is complete up to
+        self.time: Optional[str] = None  # effectiveAt of the last logged event
+        self.checkpoints: List[Dict[str, Any]] = []  # {"offset", "time", "file", "position"}, ordered
+        self._position = 0  # log size consistent with self.offset
+        self._since_checkpoint = 0
+        self._active: Optional[Dict[str, Dict[str, Any]]] = None  # state at self.offset
+        self._segments: "OrderedDict[int, tuple]" = OrderedDict()  # index -> (end, state, deltas)
+        self._load_manifest()
+
+    # =============================
+    # STORAGE
+    # =============================
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _load_manifest(self) -> None:
+        self.offset, self.time, self.checkpoints = None, None, []
+        self._position = self._since_checkpoint = 0
+        try:
+            with open(self._path("history.json"), encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return
+        if tuple(manifest.get("templates", ())) != self.templates:
+            return
+        self.offset = manifest["offset"]
+        self.time = manifest.get("time")
+        self.checkpoints = manifest["checkpoints"]
+        self._position = manifest["position"]
+        self._since_checkpoint = manifest.get("sinceCheckpoint", 0)
+
+    def _save_manifest(self) -> None:
+        tmp = self._path("history.json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({
+                "templates": list(self.templates),
+                "offset": self.offset,
+                "time": self.time,
+                "position": self._position,
+                "sinceCheckpoint": self._since_checkpoint,
+                "checkpoints": self.checkpoints,
+            }, f, separators=(",", ":"))
+        os.replace(tmp, self._path("history.json"))
+
+    def _write_checkpoint(self, state: Dict[str, Dict[str, Any]]) -> None:
+        name = f"checkpoint-{len(self.checkpoints):06d}.json"
+        with open(self._path(name), "w", encoding="utf-8") as f:
+            json.dump({"offset": self.offset, "contracts": list(state.values())}, f, separators=(",", ":"))
+        self.checkpoints.append({"offset": self.offset, "time": self.time, "file": name, "position": self._position})
+        self._since_checkpoint = 0
+
+    def _segment(self, index: int) -> Tuple[Dict[str, Dict[str, Any]], List[tuple]]:
+        # checkpoint `index` (-1: empty state) and the parsed log up to the next checkpoint
+        end = self.checkpoints[index + 1]["position"] if index + 1 < len(self.checkpoints) else self._position
+        cached = self._segments.get(index)
+        if cached is None or cached[0] != end:
+            state, position = {}, 0
+            if index >= 0:
+                with open(self._path(self.checkpoints[index]["file"]), encoding="utf-8") as f:
+                    state = {record["contractId"]: record for record in json.load(f)["contracts"]}
+                position = self.checkpoints[index]["position"]
+            deltas = []
+            if end > position:
+                with open(self._path("deltas.ndjson"), "rb") as log:
+                    log.seek(position)
+                    for line in log.read(end - position).splitlines():
+                        delta = json.loads(line)
+                        deltas.append((delta["o"], _event_time(delta["at"]), delta))
+            cached = (end, state, deltas)
+        self._segments[index] = cached
+        self._segments.move_to_end(index)
+        while len(self._segments) > self.cached_checkpoints:
+            self._segments.popitem(last=False)
+        return cached[1], cached[2]
+
+    # =============================
+    # RECORDING
+    # =============================
+
+    @staticmethod
+    def _apply(state: Dict[str, Dict[str, Any]], delta: Dict[str, Any]) -> None:
+        if delta["e"] == "c":
+            # records are shared between states and returned as is: never mutated
+            state[delta["cid"]] = {"template": delta["t"], "contractId": delta["cid"], "payload": delta["p"]}
+        else:
+            state.pop(delta["cid"], None)
+
+    def _current_state(self) -> Dict[str, Dict[str, Any]]:
+        if self._active is None:
+            self._active = self._replay(len(self.checkpoints) - 1, None)
+        return self._active
+
+    async def sync(self, handler) -> None:
+        """
+        Дописывает в журнал транзакции от последнего записанного offset до конца леджера.
+
+        Первый вызов читает поток с начала леджера.
+
+        Args:
+            handler: Подключенный RealEstateHandler (gRPC).
+        """
+        end = await handler.get_ledger_end_async()
+        if not end or end == self.offset:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        try:
+            await self._record(handler, end)
+        except BaseException:
+            # back to the last saved manifest: the next sync overwrites the unsaved tail
+            self._active = None
+            self._load_manifest()
+            raise
+        self.offset = end
+        self._save_manifest()
+
+    async def _record(self, handler, end: str) -> None:
+        state = self._current_state()
+        with open(self._path("deltas.ndjson"), "ab") as log:
+            # drop a tail written after the last saved manifest (interrupted sync)
+            log.truncate(self._position)
+            async for event in handler.stream_events_async(self.offset, self.templates, end_offset=end):
+                if event["event"] not in ("created", "archived"):
+                    continue
+                delta = {"o": event["offset"], "at": event.get("effectiveAt"),
+                         "e": "c" if event["event"] == "created" else "a",
+                         "t": event["template"], "cid": event["contractId"]}
+                if delta["e"] == "c":
+                    delta["p"] = event["payload"]
+                log.write(json.dumps(delta, separators=(",", ":")).encode() + b"\n")
+                self._apply(state, delta)
+                self.offset, self.time = event["offset"], event.get("effectiveAt") or self.time
+                self._since_checkpoint += 1
+                if self._since_checkpoint >= self.checkpoint_every:
+                    log.flush()
+                    self._position = log.tell()
+                    self._write_checkpoint(dict(state))
+                    self._save_manifest()
+            log.flush()
+            self._position = log.tell()
+
+    # =============================
+    # QUERIES
+    # =============================
+
+    def _checkpoint_before(self, kind: str, moment: Any) -> int:
+        if kind == "offset":
+            return bisect.bisect_right(self.checkpoints, moment, key=lambda c: c["offset"]) - 1
+        return bisect.bisect_right(
+            self.checkpoints, moment,
+            key=lambda c: _event_time(c["time"]) or datetime.datetime.min.replace(tzinfo=datetime.timezone.utc),
+        ) - 1
+
+    def _replay(self, index: int, until: Optional[Tuple[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        # checkpoint `index` plus the log after it, up to `until` inclusive
+        base, deltas = self._segment(index)
+        state = dict(base)
+        for offset, at, delta in deltas:
+            if until is not None:
+                kind, moment = until
+                if (offset if kind == "offset" else at or moment) > moment:
+                    break
+            self._apply(state, delta)
+        return state
+
+    def state_at(self, as_of: AsOf, template: str = PROPERTY_TEMPLATE) -> List[Dict[str, Any]]:
+        """
+        Возвращает активные контракты шаблона на момент as_of.
+
+        Args:
+            as_of: Offset (строка) или время (datetime или ISO строка);
+                   включительно — учитываются транзакции с этим offset/временем.
+            template: Шаблон "Module:Entity".
+
+        Returns:
+            List[Dict]: Записи {"template", "contractId", "payload"} (как в
+                        list_properties_async); записи общие с историей и не
+                        должны изменяться.
+
+        Raises:
+            ValueError: Если момент позже записанной истории (нужен sync).
+        """
+        kind, moment = parse_as_of(as_of)
+        # Ledger API offsets are opaque strings ordered lexicographically
+        if kind == "offset" and (self.offset is None or moment > self.offset):
+            raise ValueError(f"offset {moment} is past the recorded history ({self.offset}); sync first")
+        if kind == "time" and (self.time is None or moment >= _event_time(self.time)):
+            # nothing recorded after this moment: the latest state is the answer
+            state = self._current_state()
+        else:
+            state = self._replay(self._checkpoint_before(kind, moment), (kind, moment))
+        return [record for record in state.values() if record["template"] == template]
@@ -0,0 +1,344 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+from typing import Any, Dict, Iterable, List, Optional
+
+import grpc
+from dazl import Party
+from dazl.damlast.lookup import parse_type_con_name
+from dazl.ledger.api_types import ArchiveEvent, Boundary, ContractId, CreateEvent, ExerciseResponse, PartyInfo
+
+
+DEFAULT_JSON_API_URL = os.getenv("JSON_API_URL", "http://localhost:17575")
+DEFAULT_JSON_API_SECRET = os.getenv("JSON_API_SECRET")
+
+_HTTP_STATUS_CODES = {
+    400: grpc.StatusCode.INVALID_ARGUMENT,
+    401: grpc.StatusCode.UNAUTHENTICATED,
+    403: grpc.StatusCode.PERMISSION_DENIED,
+    404: grpc.StatusCode.NOT_FOUND,
+    408: grpc.StatusCode.DEADLINE_EXCEEDED,
+    409: grpc.StatusCode.ABORTED,
+    429: grpc.StatusCode.RESOURCE_EXHAUSTED,
+    503: grpc.StatusCode.UNAVAILABLE,
+    504: grpc.StatusCode.DEADLINE_EXCEEDED,
+}
+
+# ledger error ids reported in JSON API error messages, checked before the HTTP status
+_LEDGER_ERROR_CODES = (
+    ("DUPLICATE_COMMAND", grpc.StatusCode.ALREADY_EXISTS),
+    ("CONTRACT_NOT_FOUND", grpc.StatusCode.NOT_FOUND),
+    ("LOCKED_CONTRACTS", grpc.StatusCode.ABORTED),
+)
+
+
+class JsonApiError(Exception):
+    """
+    Ошибка HTTP JSON API с кодом в терминах gRPC (см. code()).
+
+    Код вычисляется из идентификатора ошибки леджера в тексте ответа или
+    из HTTP-статуса, поэтому классификация ошибок (повторы, конфликты,
+    дубликаты) работает одинаково для обоих транспортов.
+    """
+
+    def __init__(self, status: int, errors: List[str]):
+        self.status = status
+        self.errors = errors
+        text = "; ".join(errors)
+        self._code = next(
+            (code for marker, code in _LEDGER_ERROR_CODES if marker in text),
+            _HTTP_STATUS_CODES.get(status, grpc.StatusCode.INTERNAL),
+        )
+        super().__init__(f"{self._code.name} (HTTP {status}): {text}")
+
+    def code(self) -> grpc.StatusCode:
+        return self._code
+
+
+def _httpx():
+    try:
+        import httpx
+    except ImportError:
+        raise ImportError("The JSON API transport requires httpx: pip install httpx") from None
+    return httpx
+
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def make_token(application_name: str, act_as: Iterable[str], read_as: Iterable[str], secret: str) -> str:
+    """
+    Формирует JWT с claims Daml ledger API для JSON API (подпись HS256).
+
+    Песочница без аутентификации подпись не проверяет, но JSON API
+    берет из токена parties для actAs/readAs; участник с аутентификацией
+    принимает токен, только если secret совпадает с его ключом.
+
+    Raises:
+        ValueError: Если secret пуст.
+    """
+    if not secret:
+        raise ValueError("JSON API token secret is required (JSON_API_SECRET or --json-api-secret)")
+    header = {"alg": "HS256", "typ": "JWT"}
+    claims = {
+        "https://daml.com/ledger-api": {
+            "applicationId": application_name,
+            "actAs": list(act_as),
+            "readAs": list(read_as),
+        }
+    }
+    signing_input = f"{_b64(json.dumps(header).encode())}.{_b64(json.dumps(claims).encode())}"
+    signature = hmac.new(secret.encode(), signing_input.encode(), hashlib.sha256).digest()
+    return f"{signing_input}.{_b64(signature)}"
+
+
+def _seconds(timeout) -> Optional[float]:
+    if timeout is None:
+        return None
+    return timeout.total_seconds() if hasattr(timeout, "total_seconds") else float(timeout)
+
+
+def _template_id(template) -> str:
+    # "*:Module:Entity" (any package) is written without the package: the JSON API resolves it by name
+    name = str(template)
+    return name[2:] if name.startswith("*:") else name
+
+
+class JsonApiQueryStream:
+    """
+    Результат /v1/query в форме потока dazl: CreateEvent и завершающий Boundary.
+
+    JSON API не сообщает offset снимка, поэтому Boundary всегда без offset.
+    """
+
+    def __init__(self, conn: "JsonApiConnection", body: Dict[str, Any], parties: List[str], timeout=None):
+        self.conn = conn
+        self.body = body
+        self.parties = parties
+        self.timeout = timeout
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return None
+
+    async def creates(self):
+        result = await self.conn._post("/v1/query", self.body, read_as=self.parties, timeout=self.timeout)
+        for record in result:
+            yield self.conn._created(record)
+
+    async def items(self):
+        async for event in self.creates():
+            yield event
+        yield Boundary(None)
+
+    def __aiter__(self):
+        return self.items()
+
+
+class JsonApiConnection:
+    """
+    Соединение с леджером через HTTP JSON API (v1) с интерфейсом dazl.
+
+    Реализует подмножество dazl aio Connection, которое использует
+    RealEstateHandler: query/query_many, create, exercise, list_known_parties
+    и allocate_party. Все запросы идут через один httpx.AsyncClient с пулом
+    keep-alive соединений. Запрос нескольких шаблонов (query_many) выполняется
+    одним вызовом /v1/query.
+    """
+
+    def __init__(self, url: str = DEFAULT_JSON_API_URL, party: Optional[Party] = None,
+                 read_as=None, act_as=None, application_name: str = "real-estate-client",
+                 max_connections: int = 32, secret: Optional[str] = DEFAULT_JSON_API_SECRET):
+        """
+        Args:
+            url: Базовый URL JSON API (например, http://localhost:17575).
+            party: Party по умолчанию для actAs и readAs.
+            read_as: Parties для чтения по умолчанию.
+            act_as: Parties для команд по умолчанию.
+            application_name: applicationId в токене.
+            max_connections: Размер пула HTTP-соединений.
+            secret: Ключ подписи токенов (по умолчанию JSON_API_SECRET).
+
+        Raises:
+            ValueError: Если secret не задан.
+        """
+        if not secret:
+            raise ValueError("JSON API token secret is required (JSON_API_SECRET or --json-api-secret)")
+        self.url = url.rstrip("/")
+        self.application_name = application_name
+        self.act_as = [str(p) for p in (act_as or ([party] if party else []))]
+        self.read_as = [str(p) for p in (read_as or ([party] if party else []))]
+        self.max_connections = max_connections
+        self.secret = secret
+        self._http = None  # httpx.AsyncClient while the connection is open
+        self._tokens: Dict[tuple, str] = {}
+
+    async def __aenter__(self):
+        httpx = _httpx()
+        self._http = httpx.AsyncClient(
+            base_url=self.url,
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+            ),
+        )
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if self._http is not None:
+            await self._http.aclose()
+        self._http = None
+
+    # =============================
+    # HTTP
+    # =============================
+
+    def _token(self, act_as: List[str], read_as: List[str]) -> str:
+        key = (tuple(act_as), tuple(read_as))
+        if key not in self._tokens:
+            self._tokens[key] = make_token(self.application_name, act_as, read_as, self.secret)
+        return self._tokens[key]
+
+    async def _request(self, method: str, path: str, body=None, act_as=None, read_as=None, timeout=None):
+        act_as = [str(p) for p in act_as] if act_as else self.act_as
+        read_as = [str(p) for p in read_as] if read_as else self.read_as
+        headers = {"Authorization": f"Bearer {self._token(act_as, read_as)}"}
+        kwargs = {"headers": headers}
+        if body is not None:
+            kwargs["json"] = body
+        if timeout is not None:
+            kwargs["timeout"] = _seconds(timeout)
+        httpx = _httpx()
+        try:
+            response = await self._http.request(method, path, **kwargs)
+        except httpx.TimeoutException as ex:
+            raise JsonApiError(504, [f"timed out: {ex}"]) from ex
+        except httpx.TransportError as ex:
+            raise JsonApiError(503, [str(ex)]) from ex
+        data = response.json() if response.content else {}
+        if response.status_code >= 400 or data.get("errors"):
+            raise JsonApiError(response.status_code, [str(e) for e in data.get("errors", [response.text])])
+        return data.get("result")
+
+    async def _post(self, path: str, body, **kwargs):
+        return await self._request("POST", path, body, **kwargs)
+
+    @staticmethod
+    def _meta(act_as, read_as, command_id, deduplication_duration) -> Dict[str, Any]:
+        meta: Dict[str, Any] = {}
+        if act_as:
+            meta["actAs"] = [str(p) for p in act_as]
+        if read_as:
+            meta["readAs"] = [str(p) for p in read_as]
+        if command_id:
+            meta["commandId"] = command_id
+        if deduplication_duration is not None:
+            meta["deduplicationPeriod"] = {
+                "type": "Duration",
+                "durationInMillis": int(_seconds(deduplication_duration) * 1000),
+            }
+        return meta
+
+    # =============================
+    # DECODING
+    # =============================
+
+    @staticmethod
+    def _contract_id(template_id: str, contract_id: str) -> ContractId:
+        return ContractId(parse_type_con_name(template_id), contract_id)
+
+    def _created(self, record: Dict[str, Any]) -> CreateEvent:
+        return CreateEvent(
+            self._contract_id(record["templateId"], record["contractId"]),
+            record["payload"],
+            [Party(p) for p in record.get("signatories", [])],
+            [Party(p) for p in record.get("observers", [])],
+            record.get("agreementText"),
+            record.get("key"),
+        )
+
+    @staticmethod
+    def _wrap_cids(value: Any, created: Dict[str, ContractId]) -> Any:
+        # JSON results carry bare contract id strings; the ids our choices return are created
+        # in the same transaction, so they are typed from the create events
+        if isinstance(value, str):
+            return created.get(value, value)
+        if isinstance(value, list):
+            return [JsonApiConnection._wrap_cids(v, created) for v in value]
+        if isinstance(value, dict):
+            return {k: JsonApiConnection._wrap_cids(v, created) for k, v in value.items()}
+        return value
+
+    def _exercise_response(self, result: Dict[str, Any]) -> ExerciseResponse:
+        events = []
+        for event in result.get("events", []):
+            if "created" in event:
+                events.append(self._created(event["created"]))
+            elif "archived" in event:
+                archived = event["archived"]
+                events.append(ArchiveEvent(self._contract_id(archived["templateId"], archived["contractId"])))
+        created = {str(e.contract_id): e.contract_id for e in events if isinstance(e, CreateEvent)}
+        return ExerciseResponse(self._wrap_cids(result.get("exerciseResult"), created), events)
+
+    # =============================
+    # DAZL-COMPATIBLE API
+    # =============================
+
+    def query(self, template_id, query=None, *, read_as=None, timeout=None, **_) -> JsonApiQueryStream:
+        return self.query_many(template_id, read_as=read_as, timeout=timeout, _query=query)
+
+    def query_many(self, *template_ids, read_as=None, timeout=None, _query=None, **_) -> JsonApiQueryStream:
+        body: Dict[str, Any] = {"templateIds": [_template_id(t) for t in template_ids]}
+        if _query:
+            body["query"] = _query
+        parties = [str(p) for p in read_as] if read_as else self.read_as
+        return JsonApiQueryStream(self, body, parties, timeout)
+
+    async def create(self, template_id, payload, *, act_as=None, read_as=None, command_id=None,
+                     deduplication_duration=None, timeout=None, **_) -> CreateEvent:
+        result = await self._post(
+            "/v1/create",
+            {
+                "templateId": _template_id(template_id),
+                "payload": payload,
+                "meta": self._meta(act_as, read_as, command_id, deduplication_duration),
+            },
+            act_as=act_as, read_as=read_as, timeout=timeout,
+        )
+        return self._created(result)
+
+    async def exercise(self, contract_id: ContractId, choice_name: str, argument=None, *, act_as=None,
+                       read_as=None, command_id=None, deduplication_duration=None, timeout=None,
+                       **_) -> ExerciseResponse:
+        result = await self._post(
+            "/v1/exercise",
+            {
+                "templateId": _template_id(contract_id.value_type),
+                "contractId": contract_id.value,
+                "choice": choice_name,
+                "argument": argument or {},
+                "meta": self._meta(act_as, read_as, command_id, deduplication_duration),
+            },
+            act_as=act_as, read_as=read_as, timeout=timeout,
+        )
+        return self._exercise_response(result)
+
+    async def list_known_parties(self, *, timeout=None, **_) -> List[PartyInfo]:
+        result = await self._request("GET", "/v1/parties", timeout=timeout)
+        return [
+            PartyInfo(Party(p["identifier"]), p.get("displayName") or "", bool(p.get("isLocal", True)))
+            for p in result
+        ]
+
+    async def allocate_party(self, *, identifier_hint=None, display_name=None, timeout=None, **_) -> PartyInfo:
+        result = await self._post(
+            "/v1/parties/allocate",
+            {"identifierHint": identifier_hint, "displayName": display_name},
+            timeout=timeout,
+        )
+        return PartyInfo(Party(result["identifier"]), result.get("displayName") or "", bool(result.get("isLocal", True)))
@@ -0,0 +1,106 @@
+import asyncio
+from typing import Any, Dict, Iterable, List, Optional
+
+
+PROPERTY_TEMPLATE = "RealEstate:RealEstate"
+
+
+class OwnershipLineage:
+    """
+    Клиентский индекс полной истории владельцев объектов недвижимости.
+
+    Строится из событий stream_events_async: каждое создание контракта
+    RealEstate с новым owner добавляет запись в историю его propertyId.
+    Позволяет хранить на леджере ограниченную историю (historyLimit),
+    не теряя полную родословную объекта.
+
+    Индекс запоминает offset, до которого применены события: sync читает
+    только транзакции после него, поэтому поток с начала леджера
+    проходится один раз.
+
+    Attributes:
+        offset: Offset леджера, на котором история актуальна (None — не читалась).
+    """
+
+    def __init__(self, property_ids: Optional[Iterable[str]] = None):
+        """
+        Args:
+            property_ids: Если задано — отслеживать только эти propertyId.
+        """
+        self.property_ids = set(property_ids) if property_ids is not None else None
+        self._owners: Dict[str, List[Dict[str, Any]]] = {}
+        self.offset: Optional[str] = None
+        self._sync_lock = asyncio.Lock()
+
+    async def sync(self, handler) -> None:
+        """
+        Доводит историю до текущего конца леджера.
+
+        Args:
+            handler: Подключенный RealEstateHandler (gRPC).
+        """
+        async with self._sync_lock:
+            end = await handler.get_ledger_end_async()
+            if not end or end == self.offset:
+                return
+            applied = None
+            async for event in handler.stream_events_async(self.offset, (PROPERTY_TEMPLATE,), end_offset=end):
+                # a transaction is complete once the next one starts; an interrupted sync
+                # resumes from it, and reapplying its events is a no-op for apply
+                if applied is not None and event["offset"] != applied:
+                    self.offset = applied
+                applied = event["offset"]
+                self.apply(event)
+            self.offset = end
+
+    def apply(self, event: Dict[str, Any]) -> None:
+        """
+        Применяет событие потока; учитываются только созданные контракты RealEstate.
+        """
+        if event.get("event") != "created" or event.get("template") != PROPERTY_TEMPLATE:
+            return
+        payload = event["payload"]
+        property_id = payload["propertyId"]
+        if self.property_ids is not None and property_id not in self.property_ids:
+            return
+        owners = self._owners.setdefault(property_id, [])
+        if owners and owners[-1]["owner"] == payload["owner"]:
+            return
+        owners.append({
+            "owner": payload["owner"],
+            "offset": event.get("offset"),
+            "effectiveAt": event.get("effectiveAt"),
+        })
+
+    def subset(self, property_ids: Iterable[str]) -> "OwnershipLineage":
+        """
+        Возвращает копию истории только для заданных propertyId.
+        """
+        subset = OwnershipLineage(property_ids)
+        subset.offset = self.offset
+        subset._owners = {
+            property_id: list(owners) for property_id, owners in self._owners.items()
+            if property_id in subset.property_ids
+        }
+        return subset
+
+    def lineage(self, property_id: str) -> List[Dict[str, Any]]:
+        """
+        Возвращает всех владельцев объекта по порядку, включая текущего.
+
+        Returns:
+            List[Dict]: Записи {"owner", "offset", "effectiveAt"}.
+        """
+        return list(self._owners.get(property_id, []))
+
+    def history(self, property_id: str) -> List[str]:
+        """
+        Возвращает предыдущих владельцев (аналог полного поля history).
+        """
+        return [entry["owner"] for entry in self._owners.get(property_id, [])[:-1]]
+
+    def to_dict(self) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Возвращает историю всех отслеживаемых объектов: {propertyId: lineage}.
+        """
+        return {property_id: list(owners) for property_id, owners in self._owners.items()}
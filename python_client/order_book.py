@@ -0,0 +1,350 @@
+import asyncio
+import bisect
+import decimal
+import itertools
+from typing import Any, Dict, List, Optional, Tuple
+
+
+PROPERTY_TEMPLATE = "RealEstate:RealEstate"
+
+
+class ListingBook:
+    """
+    Индекс выставленных на продажу объектов по валюте и цене.
+
+    Для каждой валюты хранит отсортированный по цене список (price, propertyId),
+    поэтому поиск самого дешевого объекта не дороже заданной цены — бинарный.
+    Наполняется из list_properties_async и поддерживается событиями
+    stream_events_async или результатами расчетов движка.
+    """
+
+    def __init__(self):
+        self.listings: Dict[str, Dict[str, Any]] = {}  # propertyId -> {"contractId", "payload"}
+        self._sorted: Dict[str, List[Tuple[decimal.Decimal, str]]] = {}
+        self._property_ids: Dict[str, str] = {}  # contractId -> propertyId
+
+    def __len__(self) -> int:
+        return len(self.listings)
+
+    @staticmethod
+    def _key(record: Dict[str, Any]) -> Tuple[str, decimal.Decimal]:
+        payload = record["payload"]
+        return payload["currency"], decimal.Decimal(str(payload["price"]))
+
+    def upsert(self, record: Dict[str, Any]) -> None:
+        """
+        Добавляет или обновляет запись RealEstate ({"contractId", "payload"}).
+
+        Снятые с продажи объекты удаляются из индекса.
+        """
+        property_id = record["payload"]["propertyId"]
+        self.remove(property_id)
+        if not record["payload"].get("listed"):
+            return
+        currency, price = self._key(record)
+        self.listings[property_id] = record
+        self._property_ids[record["contractId"]] = property_id
+        bisect.insort(self._sorted.setdefault(currency, []), (price, property_id))
+
+    def remove(self, property_id: str, contract_id: Optional[str] = None) -> None:
+        """
+        Удаляет объект из индекса (если задан contract_id — только при совпадении).
+        """
+        record = self.listings.get(property_id)
+        if record is None or (contract_id is not None and record["contractId"] != contract_id):
+            return
+        del self.listings[property_id]
+        del self._property_ids[record["contractId"]]
+        currency, price = self._key(record)
+        entries = self._sorted[currency]
+        del entries[bisect.bisect_left(entries, (price, property_id))]
+
+    def load(self, records: List[Dict[str, Any]]) -> None:
+        """
+        Заменяет содержимое индекса списком контрактов RealEstate.
+        """
+        self.listings.clear()
+        self._sorted.clear()
+        self._property_ids.clear()
+        for record in records:
+            self.upsert(record)
+
+    def apply(self, event: Dict[str, Any]) -> None:
+        """
+        Применяет событие stream_events_async.
+        """
+        if event.get("template") != PROPERTY_TEMPLATE:
+            return
+        if event["event"] == "created":
+            self.upsert({"contractId": event["contractId"], "payload": event["payload"]})
+        elif event["event"] == "archived":
+            property_id = self._property_ids.get(event["contractId"])
+            if property_id is not None:
+                self.remove(property_id)
+
+    def best(self, currency: str, max_price: decimal.Decimal, skip=None,
+             exclude_owner: Optional[str] = None,
+             property_type: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Возвращает самый дешевый подходящий объект не дороже max_price.
+
+        Args:
+            currency: Валюта объекта.
+            max_price: Максимальная цена.
+            skip: Множество propertyId, которые уже зарезервированы.
+            exclude_owner: Не возвращать объекты этого владельца.
+            property_type: Только объекты этого типа.
+        """
+        entries = self._sorted.get(currency, [])
+        end = bisect.bisect_right(entries, max_price, key=lambda entry: entry[0])
+        for _, property_id in itertools.islice(entries, 0, end):
+            if skip and property_id in skip:
+                continue
+            record = self.listings[property_id]
+            payload = record["payload"]
+            if exclude_owner is not None and payload["owner"] == exclude_owner:
+                continue
+            if property_type is not None and payload.get("propertyType") != property_type:
+                continue
+            return record
+        return None
+
+
+class MatchingEngine:
+    """
+    Офф-леджер книга заявок покупателей и пакетный расчет сделок.
+
+    Покупатели выставляют заявки (максимальная цена, валюта, опционально
+    тип или конкретный propertyId). Каждый раунд заявки сопоставляются
+    с индексом ListingBook по приоритету цены и времени, после чего пары
+    рассчитываются пачками через buy_property_async.
+
+    Расчет берет cid объекта из индекса: покупатель не видит чужой объект
+    и не может перечитать его cid сам, поэтому устаревший cid обновляется
+    при refresh() между раундами. Расчеты одного покупателя выполняются
+    последовательно, чтобы подбор оплаты из кошелька не конфликтовал.
+    Заявка, чей расчет не удался (в том числе без подходящих средств),
+    возвращается в книгу (до max_attempts попыток), а объект убирается из
+    индекса до следующего обновления зеркала.
+    """
+
+    def __init__(self, handler, batch_size: int = 50, concurrency: int = 16, max_attempts: int = 3):
+        """
+        Args:
+            handler: Подключенный RealEstateHandler (его соединение используется
+                     для расчетов от имени покупателей).
+            batch_size: Сколько сделок рассчитывается в одной пачке.
+            concurrency: Максимум одновременных расчетов.
+            max_attempts: Сколько раз заявка может участвовать в неудачном расчете.
+        """
+        self.handler = handler
+        self.book = ListingBook()
+        self.batch_size = max(1, batch_size)
+        self.concurrency = max(1, concurrency)
+        self.max_attempts = max_attempts
+        self.bids: Dict[str, Dict[str, Any]] = {}
+        self._seq = itertools.count(1)
+        self._party_ids: Dict[str, str] = {}  # buyer hint -> party id
+        self._buyers: Dict[str, Any] = {}  # buyer id -> handler acting as the buyer
+        self._buyer_locks: Dict[str, asyncio.Lock] = {}
+
+    # =============================
+    # MIRROR
+    # =============================
+
+    async def refresh(self) -> int:
+        """
+        Перечитывает выставленные объекты с леджера.
+
+        Returns:
+            int: Число объектов в индексе.
+        """
+        self.book.load(await self.handler.list_properties_async())
+        return len(self.book)
+
+    async def follow(self) -> None:
+        """
+        Загружает индекс из снимка ACS и поддерживает его по потоку транзакций.
+        """
+        snapshot = await self.handler.load_snapshot_async((PROPERTY_TEMPLATE,))
+        self.book.load(snapshot["contracts"])
+        async for event in self.handler.stream_events_async(offset=snapshot["offset"], templates=(PROPERTY_TEMPLATE,)):
+            self.book.apply(event)
+
+    # =============================
+    # BIDS
+    # =============================
+
+    async def place_bid(self, buyer: str, max_price: str, currency: str,
+                        property_type: Optional[str] = None,
+                        property_id: Optional[str] = None) -> str:
+        """
+        Выставляет заявку покупателя.
+
+        Args:
+            buyer: Подсказка или ID party покупателя.
+            max_price: Максимальная цена (сделка идет по цене объявления).
+            currency: Валюта.
+            property_type: Только объекты этого типа.
+            property_id: Только этот объект.
+
+        Returns:
+            str: ID заявки.
+        """
+        if buyer not in self._party_ids:
+            self._party_ids[buyer] = (await self.handler.resolve_parties_async([buyer]))[buyer]
+        seq = next(self._seq)
+        bid_id = f"bid-{seq}"
+        self.bids[bid_id] = {
+            "bidId": bid_id,
+            "seq": seq,
+            "buyer": self._party_ids[buyer],
+            "maxPrice": decimal.Decimal(str(max_price)),
+            "currency": currency,
+            "propertyType": property_type,
+            "propertyId": property_id,
+            "status": "open",
+            "attempts": 0,
+        }
+        return bid_id
+
+    def cancel_bid(self, bid_id: str) -> bool:
+        """
+        Отменяет открытую заявку.
+
+        Returns:
+            bool: True, если заявка была открыта.
+        """
+        bid = self.bids.get(bid_id)
+        if bid is None or bid["status"] != "open":
+            return False
+        bid["status"] = "cancelled"
+        return True
+
+    def open_bids(self) -> List[Dict[str, Any]]:
+        """
+        Возвращает открытые заявки в порядке приоритета (цена, затем время).
+        """
+        bids = [bid for bid in self.bids.values() if bid["status"] == "open"]
+        bids.sort(key=lambda bid: (-bid["maxPrice"], bid["seq"]))
+        return bids
+
+    # =============================
+    # MATCHING AND SETTLEMENT
+    # =============================
+
+    def match(self) -> List[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """
+        Сопоставляет открытые заявки с объектами индекса.
+
+        Каждый объект достается не более чем одной заявке за раунд.
+
+        Returns:
+            List[(bid, listing)]: Пары для расчета.
+        """
+        reserved = set()
+        matches = []
+        for bid in self.open_bids():
+            if bid["propertyId"] is not None:
+                listing = self.book.listings.get(bid["propertyId"])
+                if (listing is None or bid["propertyId"] in reserved
+                        or listing["payload"]["currency"] != bid["currency"]
+                        or listing["payload"]["owner"] == bid["buyer"]
+                        or decimal.Decimal(str(listing["payload"]["price"])) > bid["maxPrice"]):
+                    continue
+            else:
+                listing = self.book.best(
+                    bid["currency"], bid["maxPrice"], skip=reserved,
+                    exclude_owner=bid["buyer"], property_type=bid["propertyType"],
+                )
+                if listing is None:
+                    continue
+            reserved.add(listing["payload"]["propertyId"])
+            matches.append((bid, listing))
+        return matches
+
+    async def _buyer_handler(self, buyer: str):
+        if buyer not in self._buyers:
+            self._buyers[buyer] = await self.handler.with_party(buyer)
+            self._buyer_locks[buyer] = asyncio.Lock()
+        return self._buyers[buyer]
+
+    async def _settle(self, bid: Dict[str, Any], listing: Dict[str, Any], window: asyncio.Semaphore) -> Dict[str, Any]:
+        payload = listing["payload"]
+        property_id = payload["propertyId"]
+        outcome = {"bidId": bid["bidId"], "propertyId": property_id, "price": str(payload["price"])}
+        buyer_handler = await self._buyer_handler(bid["buyer"])
+        async with self._buyer_locks[bid["buyer"]], window:
+            try:
+                # the cid comes from the book, not the sequencer: the buyer cannot look up
+                # the seller's property, a stale cid is picked up by refresh() instead
+                res = await buyer_handler.buy_property_async(
+                    listing["contractId"],
+                    str(payload["price"]),
+                    payload["currency"],
+                    bid["buyer"],
+                    None,
+                    payload["owner"],
+                )
+            except ValueError as ex:
+                # no exact holding for the buyer: reload the wallet before the next attempt
+                buyer_handler.wallet.owners.discard(bid["buyer"])
+                bid["attempts"] += 1
+                bid["status"] = "rejected" if bid["attempts"] >= self.max_attempts else "open"
+                outcome.update(status="rejected", error=str(ex), requeued=bid["status"] == "open")
+                return outcome
+            except Exception as ex:
+                # listing is gone, repriced or delisted: drop it until the mirror refreshes
+                self.book.remove(property_id, listing["contractId"])
+                bid["attempts"] += 1
+                bid["status"] = "failed" if bid["attempts"] >= self.max_attempts else "open"
+                outcome.update(status="failed", error=str(ex), requeued=bid["status"] == "open")
+                return outcome
+        self.book.remove(property_id)
+        bid["status"] = "filled"
+        bid["propertyId"] = property_id
+        outcome.update(status="settled", contractId=res["result"]["contractId"])
+        return outcome
+
+    async def run_round(self) -> Dict[str, Any]:
+        """
+        Выполняет один раунд: сопоставление и расчет всех пар пачками.
+
+        Returns:
+            Dict с полями matched, settled, failed и results (итог по каждой паре).
+        """
+        matches = self.match()
+        window = asyncio.Semaphore(self.concurrency)
+        results = []
+        for start in range(0, len(matches), self.batch_size):
+            batch = matches[start:start + self.batch_size]
+            results.extend(await asyncio.gather(*(self._settle(bid, listing, window) for bid, listing in batch)))
+        settled = sum(1 for r in results if r["status"] == "settled")
+        return {
+            "matched": len(matches),
+            "settled": settled,
+            "failed": len(results) - settled,
+            "results": results,
+        }
+
+    async def run(self, max_rounds: int = 10) -> Dict[str, Any]:
+        """
+        Повторяет раунды, пока есть сопоставимые заявки (не более max_rounds).
+
+        Между раундами индекс перечитывается с леджера, чтобы объекты,
+        убранные после неудачных расчетов, вернулись с актуальными cid.
+
+        Returns:
+            Dict с полями rounds, settled, failed и results всех раундов.
+        """
+        report = {"rounds": 0, "settled": 0, "failed": 0, "results": []}
+        for _ in range(max_rounds):
+            round_report = await self.run_round()
+            if not round_report["matched"]:
+                break
+            report["rounds"] += 1
+            report["settled"] += round_report["settled"]
+            report["failed"] += round_report["failed"]
+            report["results"].extend(round_report["results"])
+            await self.refresh()
+        return report
@@ -0,0 +1,223 @@
+import asyncio
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, TypeVar
+
+from python_client.retry import is_retriable_error
+
+
+T = TypeVar("T")
+
+
+class IncompleteReadError(Exception):
+    """
+    Чтение fanout не получило ответа от части участников.
+
+    Объединенный результат без них может не содержать контрактов parties,
+    размещенных только на этих участниках, поэтому он не возвращается как полный.
+
+    Attributes:
+        missing: "host:port" участников без ответа.
+        errors: Ошибки этих участников (по порядку missing).
+        partial: Объединенный результат ответивших участников.
+    """
+
+    def __init__(self, missing: List[str], errors: List[BaseException], partial: List[Any]):
+        details = "; ".join(f"{name}: {error}" for name, error in zip(missing, errors))
+        super().__init__(f"Read endpoints did not answer: {details}")
+        self.missing = missing
+        self.errors = errors
+        self.partial = partial
+
+
+class Endpoint:
+    """
+    Соединение с одним участником леджера и его состояние здоровья.
+
+    Attributes:
+        name: "host:port" участника.
+        client: Открытое соединение (dazl или JsonApiConnection).
+        latency: Сглаженная (EWMA) задержка успешных чтений, секунды.
+        in_flight: Число выполняющихся запросов.
+        failures: Число ошибок подряд.
+        ejected_until: time.monotonic(), до которого участник исключен из выбора.
+    """
+
+    def __init__(self, name: str, client, owned_cm=None):
+        self.name = name
+        self.client = client
+        self.owned_cm = owned_cm  # context manager to close; None for the shared primary connection
+        self.latency: Optional[float] = None
+        self.in_flight = 0
+        self.failures = 0
+        self.ejected_until = 0.0
+        self.calls = 0
+        self.errors = 0
+
+    def healthy(self, now: float) -> bool:
+        return now >= self.ejected_until
+
+    def score(self) -> float:
+        # endpoints without samples are tried first so every participant gets measured
+        return (self.latency or 0.0) * (self.in_flight + 1)
+
+
+class ParticipantPool:
+    """
+    Балансировщик чтений между несколькими участниками леджера.
+
+    Чтение отправляется одному из здоровых участников по правилу «двух
+    случайных»: из двух случайно выбранных берется тот, у кого меньше
+    задержка с учетом запросов в работе. Участник, ответивший временной
+    ошибкой (UNAVAILABLE, таймаут и т.п.), исключается из выбора на время,
+    растущее экспоненциально с числом ошибок подряд, а запрос повторяется
+    на другом участнике. Ошибки самого запроса (валидация, права) не
+    повторяются и на здоровье не влияют.
+
+    В режиме fanout чтение выполняется на всех здоровых участниках, а
+    результаты объединяются с удалением дубликатов по ключу (ID контракта).
+    """
+
+    def __init__(self, ejection: float = 1.0, max_ejection: float = 30.0, smoothing: float = 0.2):
+        """
+        Args:
+            ejection: Время исключения после первой ошибки, секунды.
+            max_ejection: Максимальное время исключения, секунды.
+            smoothing: Вес нового замера в EWMA задержки.
+        """
+        self.endpoints: List[Endpoint] = []
+        self.ejection = ejection
+        self.max_ejection = max_ejection
+        self.smoothing = smoothing
+
+    def __len__(self) -> int:
+        return len(self.endpoints)
+
+    def add(self, name: str, client, owned_cm=None) -> None:
+        self.endpoints.append(Endpoint(name, client, owned_cm))
+
+    async def close(self) -> None:
+        for endpoint in self.endpoints:
+            if endpoint.owned_cm is not None:
+                await endpoint.owned_cm.__aexit__(None, None, None)
+        self.endpoints = []
+
+    def _candidates(self) -> List[Endpoint]:
+        now = time.monotonic()
+        healthy = [e for e in self.endpoints if e.healthy(now)]
+        # when every participant is ejected, probe the one that comes back first
+        return healthy or [min(self.endpoints, key=lambda e: e.ejected_until)]
+
+    def pick(self, exclude=()) -> Optional[Endpoint]:
+        """
+        Выбирает участника для следующего чтения (None, если выбирать не из кого).
+        """
+        candidates = [e for e in self._candidates() if e not in exclude]
+        if not candidates:
+            return None
+        if len(candidates) == 1:
+            return candidates[0]
+        a, b = random.sample(candidates, 2)
+        return a if a.score() <= b.score() else b
+
+    def _record(self, endpoint: Endpoint, started: float, error: Optional[BaseException]) -> None:
+        endpoint.calls += 1
+        if error is None:
+            elapsed = time.monotonic() - started
+            if endpoint.latency is None:
+                endpoint.latency = elapsed
+            else:
+                endpoint.latency += (elapsed - endpoint.latency) * self.smoothing
+            endpoint.failures = 0
+            return
+        endpoint.errors += 1
+        endpoint.failures += 1
+        delay = min(self.max_ejection, self.ejection * 2 ** (endpoint.failures - 1))
+        endpoint.ejected_until = time.monotonic() + delay
+
+    async def _on(self, endpoint: Endpoint, call: Callable[[Any], Awaitable[T]]) -> T:
+        started = time.monotonic()
+        endpoint.in_flight += 1
+        try:
+            result = await call(endpoint.client)
+        except Exception as ex:
+            if is_retriable_error(ex):
+                self._record(endpoint, started, ex)
+            raise
+        finally:
+            endpoint.in_flight -= 1
+        self._record(endpoint, started, None)
+        return result
+
+    async def call(self, call: Callable[[Any], Awaitable[T]]) -> T:
+        """
+        Выполняет чтение на одном участнике, переходя к следующему при временной ошибке.
+
+        Args:
+            call: Функция соединение -> корутина чтения.
+
+        Raises:
+            Exception: Ошибка запроса или последняя временная ошибка, если
+                       не ответил ни один участник.
+        """
+        tried: List[Endpoint] = []
+        error: Optional[BaseException] = None
+        while True:
+            endpoint = self.pick(exclude=tried)
+            if endpoint is None:
+                raise error
+            tried.append(endpoint)
+            try:
+                return await self._on(endpoint, call)
+            except Exception as ex:
+                if not is_retriable_error(ex):
+                    raise
+                error = ex
+
+    async def fanout(self, call: Callable[[Any], Awaitable[List[T]]],
+                     key: Callable[[T], Hashable]) -> List[T]:
+        """
+        Выполняет чтение на всех участниках и объединяет результаты.
+
+        Опрашиваются и исключенные из балансировки участники: без любого из
+        них результат может быть неполным.
+
+        Args:
+            call: Функция соединение -> корутина, возвращающая список.
+            key: Ключ удаления дубликатов (например, ID контракта).
+
+        Raises:
+            Exception: Первая ошибка, если не ответил ни один участник.
+            IncompleteReadError: Если не ответила часть участников.
+        """
+        results = await asyncio.gather(*(self._on(e, call) for e in self.endpoints), return_exceptions=True)
+        errors = [r for r in results if isinstance(r, BaseException)]
+        if len(errors) == len(results):
+            raise errors[0]
+        merged: Dict[Hashable, T] = {}
+        for result in results:
+            if isinstance(result, BaseException):
+                continue
+            for item in result:
+                merged.setdefault(key(item), item)
+        if errors:
+            missing = [e.name for e, r in zip(self.endpoints, results) if isinstance(r, BaseException)]
+            raise IncompleteReadError(missing, errors, list(merged.values()))
+        return list(merged.values())
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """
+        Возвращает состояние участников: задержку, ошибки и исключение из выбора.
+        """
+        now = time.monotonic()
+        return [
+            {
+                "endpoint": e.name,
+                "healthy": e.healthy(now),
+                "latencyMs": round(e.latency * 1000, 1) if e.latency is not None else None,
+                "inFlight": e.in_flight,
+                "calls": e.calls,
+                "errors": e.errors,
+            }
+            for e in self.endpoints
+        ]
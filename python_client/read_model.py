@@ -0,0 +1,569 @@
+import asyncio
+import json
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from python_client.attributes import AttributeIndex
+from python_client.client import STREAM_TEMPLATES, RealEstateHandler
+from python_client.geo import GeoIndex
+from python_client.reconcile import DEFAULT_BUCKETS, BucketHashes, compare_bucket, fetch_buckets, scan_ledger
+from python_client.search import TextIndex
+
+
+PROPERTY_TEMPLATE = "RealEstate:RealEstate"
+CASH_TEMPLATE = "RealEstate:Cash"
+
+
+class ReadModel:
+    """
+    Индексированное зеркало активных контрактов RealEstate и Cash.
+
+    Наполняется снимком ACS и затем поддерживается одной подпиской на поток
+    транзакций (см. follow). Все запросы обслуживаются из памяти, поэтому
+    нагрузка на участника леджера не зависит от числа читателей.
+
+    Attributes:
+        contracts: cid -> {"template", "contractId", "payload"}.
+        property_cids: propertyId -> текущий cid контракта RealEstate.
+        offset: Offset последнего примененного события.
+        seq: Монотонный номер версии модели (растет с каждым изменением).
+        changes: Ограниченный журнал изменений (seq, событие) для лент изменений.
+        hashes: Хеши контрактов по бакетам cid для сверки с леджером (см. reconcile).
+        attributes: Колоночный индекс полей и metaJson объектов (AttributeIndex).
+        search: Текстовый индекс по address, propertyId и propertyType (TextIndex).
+        geo: Пространственный индекс объектов с координатами (GeoIndex).
+        last_reconcile: Отчет последней сверки или None.
+    """
+
+    def __init__(self, change_log_size: int = 10000, buckets: int = DEFAULT_BUCKETS):
+        """
+        Инициализирует пустую модель.
+
+        Args:
+            change_log_size: Сколько последних изменений хранить для long-poll/SSE.
+            buckets: Число бакетов хешей для сверки.
+        """
+        self.contracts: Dict[str, Dict[str, Any]] = {}
+        self.property_cids: Dict[str, str] = {}
+        self.template_cids: Dict[str, Set[str]] = {PROPERTY_TEMPLATE: set(), CASH_TEMPLATE: set()}
+        self.owner_cids: Dict[Tuple[str, str], Set[str]] = {}
+        self.listed_cids: Set[str] = set()
+        self.offset: Optional[str] = None
+        self.seq = 0
+        self.changes: deque = deque(maxlen=change_log_size)
+        self.hashes = BucketHashes(buckets)
+        self.attributes = AttributeIndex()
+        self.search = TextIndex()
+        self.geo = GeoIndex(self.attributes.meta_cache)
+        self.last_reconcile: Optional[Dict[str, Any]] = None
+        self._changed = asyncio.Event()
+
+    # =============================
+    # MAINTENANCE
+    # =============================
+
+    def _add(self, record: Dict[str, Any]) -> None:
+        cid = record["contractId"]
+        template = record["template"]
+        payload = record["payload"]
+        if cid in self.contracts:
+            self._remove(cid)
+        self.contracts[cid] = record
+        self.hashes.add(record)
+        self.template_cids.setdefault(template, set()).add(cid)
+        self.owner_cids.setdefault((template, payload.get("owner")), set()).add(cid)
+        if template == PROPERTY_TEMPLATE:
+            self.property_cids[payload["propertyId"]] = cid
+            self.attributes.add(record)
+            self.search.add(record)
+            self.geo.add(record)
+            if payload.get("listed"):
+                self.listed_cids.add(cid)
+
+    def _remove(self, cid: str) -> None:
+        record = self.contracts.pop(cid, None)
+        if record is None:
+            return
+        template = record["template"]
+        payload = record["payload"]
+        self.hashes.discard(record)
+        self.template_cids[template].discard(cid)
+        self.owner_cids.get((template, payload.get("owner")), set()).discard(cid)
+        self.listed_cids.discard(cid)
+        self.attributes.remove(cid)
+        self.search.remove(cid)
+        self.geo.remove(cid)
+        if template == PROPERTY_TEMPLATE and self.property_cids.get(payload["propertyId"]) == cid:
+            del self.property_cids[payload["propertyId"]]
+
+    def _notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def load(self, snapshot: Dict[str, Any]) -> None:
+        """
+        Заменяет содержимое модели снимком ACS (результат load_snapshot_async).
+
+        Args:
+            snapshot: Dict с полями offset и contracts.
+        """
+        for cid in list(self.contracts):
+            self._remove(cid)
+        for record in snapshot["contracts"]:
+            self._add(record)
+        self.offset = snapshot["offset"]
+        self.seq += 1
+        self.changes.clear()
+        self._notify()
+
+    def apply(self, event: Dict[str, Any]) -> None:
+        """
+        Применяет событие из stream_events_async.
+
+        Args:
+            event: Событие "created", "archived" или "exercised".
+        """
+        if event["event"] == "created":
+            self._add(event)
+        elif event["event"] == "archived":
+            self._remove(event["contractId"])
+        self.offset = event["offset"]
+        self.seq += 1
+        self.changes.append((self.seq, event))
+        self._notify()
+
+    async def follow(self, handler: RealEstateHandler) -> None:
+        """
+        Загружает снимок ACS и бесконечно применяет события из потока транзакций.
+
+        Args:
+            handler: Подключенный RealEstateHandler, от имени которого читается леджер.
+        """
+        snapshot = await handler.load_snapshot_async(STREAM_TEMPLATES)
+        self.load(snapshot)
+        async for event in handler.stream_events_async(offset=snapshot["offset"]):
+            self.apply(event)
+
+    def bucket_records(self, n: int) -> List[Dict[str, Any]]:
+        """
+        Возвращает записи {"template", "contractId", "payload"} бакета n.
+        """
+        return [
+            {"template": r["template"], "contractId": cid, "payload": r["payload"]}
+            for cid, r in self.contracts.items()
+            if self.hashes.bucket(cid) == n
+        ]
+
+    def _touched_since(self, seq: int) -> Optional[Set[int]]:
+        if self.changes and self.changes[0][0] > seq + 1:
+            return None  # the change log no longer covers seq
+        return {self.hashes.bucket(e["contractId"]) for s, e in self.changes if s > seq}
+
+    async def reconcile(self, handler: RealEstateHandler, repair: bool = True) -> Dict[str, Any]:
+        """
+        Сверяет модель с ACS леджера и исправляет отличающиеся бакеты.
+
+        Хеши бакетов считаются потоковым проходом ACS без его хранения в
+        памяти; контракты перечитываются вторым проходом только для бакетов,
+        хеш которых не совпал. Бакеты, затронутые событиями потока во время
+        сверки, пропускаются (проверяются при следующей сверке). Исправление
+        сбрасывает журнал изменений, и клиенты SSE получают reset.
+
+        Args:
+            handler: Подключенный RealEstateHandler того же party.
+            repair: Исправлять модель (False — только отчет).
+
+        Returns:
+            Dict с полями offset, root, ledgerRoot, skippedBuckets, repaired
+            и buckets (номер бакета -> compare_bucket).
+        """
+        seq = self.seq
+        ledger, offset = await scan_ledger(handler, self.hashes.buckets)
+        differing = self.hashes.diff(ledger)
+        fetched = await fetch_buckets(handler, set(differing), self.hashes.buckets) if differing else {}
+        touched = self._touched_since(seq)
+        skipped = differing if touched is None else [n for n in differing if n in touched]
+        buckets: Dict[str, Dict[str, List[str]]] = {}
+        for n in differing:
+            if n in skipped:
+                continue
+            local = {r["contractId"]: r for r in self.bucket_records(n)}
+            delta = compare_bucket(local, fetched[n])
+            if not any(delta.values()):
+                continue
+            buckets[str(n)] = delta
+            if repair:
+                for cid in delta["stale"] + delta["changed"]:
+                    self._remove(cid)
+                for cid in delta["missing"] + delta["changed"]:
+                    self._add(fetched[n][cid])
+        if repair and buckets:
+            self.seq += 1
+            self.changes.clear()
+            self._notify()
+        self.last_reconcile = {
+            "offset": offset,
+            "root": self.hashes.root(),
+            "ledgerRoot": ledger.root(),
+            "skippedBuckets": skipped,
+            "repaired": repair and bool(buckets),
+            "buckets": buckets,
+        }
+        return self.last_reconcile
+
+    async def wait_for_change(self, seq: int, timeout: float) -> bool:
+        """
+        Ждет, пока версия модели станет больше seq.
+
+        Args:
+            seq: Версия, известная клиенту.
+            timeout: Максимальное время ожидания в секундах.
+
+        Returns:
+            bool: True, если модель изменилась, False по таймауту.
+        """
+        while self.seq <= seq:
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout)
+            except asyncio.TimeoutError:
+                return False
+        return True
+
+    def changes_since(self, seq: int) -> Optional[List[Tuple[int, Dict[str, Any]]]]:
+        """
+        Возвращает изменения с версией больше seq.
+
+        Returns:
+            Список (seq, событие) или None, если журнал уже не содержит нужных
+            изменений и клиенту нужно перечитать состояние целиком.
+        """
+        if seq >= self.seq:
+            return []
+        if not self.changes or self.changes[0][0] > seq + 1:
+            return None
+        return [(s, e) for s, e in self.changes if s > seq]
+
+    # =============================
+    # QUERIES
+    # =============================
+
+    def _records(self, cids) -> List[Dict[str, Any]]:
+        return [
+            {"contractId": cid, "payload": self.contracts[cid]["payload"]}
+            for cid in cids
+        ]
+
+    def properties(self, owner: Optional[str] = None, listed: Optional[bool] = None,
+                   currency: Optional[str] = None, property_type: Optional[str] = None,
+                   where: Optional[List[Any]] = None):
+        """
+        Возвращает контракты RealEstate, отфильтрованные по индексам.
+
+        Args:
+            owner: Канонический ID владельца.
+            listed: Только выставленные (True) или снятые (False) с продажи.
+            currency: Код валюты.
+            property_type: Тип объекта.
+            where: Условия на поля и атрибуты metaJson (см. AttributeIndex.select).
+
+        Returns:
+            List[Dict]: Записи {"contractId", "payload"} в формате list_properties_async.
+
+        Raises:
+            ValueError: При неверном условии where.
+        """
+        if where:
+            cids = self.attributes.select(where)
+        elif owner is not None:
+            cids = self.owner_cids.get((PROPERTY_TEMPLATE, owner), set())
+        elif listed:
+            cids = self.listed_cids
+        else:
+            cids = self.template_cids[PROPERTY_TEMPLATE]
+        result = []
+        for record in self._records(cids):
+            payload = record["payload"]
+            if owner is not None and payload.get("owner") != owner:
+                continue
+            if listed is not None and bool(payload.get("listed")) != listed:
+                continue
+            if currency is not None and payload.get("currency") != currency:
+                continue
+            if property_type is not None and payload.get("propertyType") != property_type:
+                continue
+            result.append(record)
+        return result
+
+    def search_properties(self, query: str, limit: int = 20, mode: str = "auto") -> List[Dict[str, Any]]:
+        """
+        Ищет объекты по address, propertyId и propertyType (см. TextIndex.search).
+
+        Raises:
+            ValueError: Если mode неизвестен.
+        """
+        return self.search.search(query, limit=limit, mode=mode)
+
+    def property(self, property_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Возвращает текущий контракт RealEstate по propertyId или None.
+        """
+        cid = self.property_cids.get(property_id)
+        return self._records([cid])[0] if cid is not None else None
+
+    def cash(self, owner: Optional[str] = None, currency: Optional[str] = None):
+        """
+        Возвращает контракты Cash, отфильтрованные по владельцу и валюте.
+
+        Returns:
+            List[Dict]: Записи {"contractId", "payload"} в формате list_cash_async.
+        """
+        if owner is not None:
+            cids = self.owner_cids.get((CASH_TEMPLATE, owner), set())
+        else:
+            cids = self.template_cids[CASH_TEMPLATE]
+        return [
+            r for r in self._records(cids)
+            if currency is None or r["payload"].get("currency") == currency
+        ]
+
+    def party_view(self, party: str) -> Dict[str, Any]:
+        """
+        Возвращает контракты, в которых party — владелец, регистратор или эмитент.
+
+        Returns:
+            Dict с полями properties и cash.
+        """
+        def involved(record):
+            payload = record["payload"]
+            return party in (payload.get("owner"), payload.get("registrar"), payload.get("issuer"))
+
+        return {
+            "properties": [r for r in self._records(self.template_cids[PROPERTY_TEMPLATE]) if involved(r)],
+            "cash": [r for r in self._records(self.template_cids[CASH_TEMPLATE]) if involved(r)],
+        }
+
+
+# request bodies up to this size are read and dropped to keep the connection; larger ones close it
+MAX_DISCARDED_BODY = 64 * 1024
+_REASONS = {200: "OK", 304: "Not Modified", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed"}
+
+
+class ReadModelServer:
+    """
+    Локальный HTTP-сервер поверх ReadModel.
+
+    Эндпоинты (только GET, ответы в JSON):
+        /health, /properties, /properties/<propertyId>, /search?q=<текст>, /cash,
+        /geo?near=<lat>,<lon>&km=<радиус> или /geo?bbox=<s>,<w>,<n>,<e>,
+        /geo/clusters?zoom=<уровень>[&bbox=...] (кластеры для карты),
+        /parties, /parties/<party>, /events (Server-Sent Events),
+        /buckets, /buckets/<n>, /reconcile (сверка с леджером, см. ReadModel.reconcile).
+
+    Каждый ответ содержит ETag с версией модели и заголовок X-Ledger-Offset.
+    Запрос с If-None-Match равным текущему ETag получает 304; с параметром
+    wait=<секунды> он становится long-poll и ждет следующего изменения.
+    """
+
+    def __init__(self, handler: RealEstateHandler, model: ReadModel, parties_ttl: float = 30.0):
+        """
+        Args:
+            handler: Подключенный RealEstateHandler (для списка parties).
+            model: Наполняемая ReadModel.
+            parties_ttl: Время жизни кэша списка parties в секундах.
+        """
+        self.handler = handler
+        self.model = model
+        self.parties_ttl = parties_ttl
+        self._parties: List[Dict[str, str]] = []
+        self._parties_loaded_at = 0.0
+
+    async def _known_parties(self) -> List[Dict[str, str]]:
+        if time.monotonic() - self._parties_loaded_at > self.parties_ttl:
+            self._parties = await self.handler.list_parties_async()
+            self._parties_loaded_at = time.monotonic()
+        return self._parties
+
+    async def _route(self, path: str, query: Dict[str, str]) -> Tuple[int, Any]:
+        parts = [unquote(p) for p in path.strip("/").split("/") if p]
+        model = self.model
+        if parts == ["health"]:
+            return 200, {"offset": model.offset, "seq": model.seq, "contracts": len(model.contracts)}
+        if parts == ["properties"]:
+            listed = query.get("listed")
+            try:
+                return 200, model.properties(
+                    owner=query.get("owner"),
+                    listed=None if listed is None else listed.lower() in ("1", "true", "yes"),
+                    currency=query.get("currency"),
+                    property_type=query.get("type"),
+                    where=[p for p in query.get("where", "").split(";") if p.strip()],
+                )
+            except ValueError as ex:
+                return 400, {"error": str(ex)}
+        if len(parts) == 2 and parts[0] == "properties":
+            record = model.property(parts[1])
+            return (200, record) if record is not None else (404, {"error": "unknown propertyId"})
+        if parts == ["search"]:
+            try:
+                return 200, model.search_properties(
+                    query.get("q", ""),
+                    limit=int(query.get("limit", 20)),
+                    mode=query.get("mode", "auto"),
+                )
+            except ValueError as ex:
+                return 400, {"error": str(ex)}
+        if parts and parts[0] == "geo" and len(parts) <= 2:
+            try:
+                return self._geo(parts[1:], query)
+            except ValueError as ex:
+                return 400, {"error": str(ex)}
+        if parts == ["cash"]:
+            return 200, model.cash(owner=query.get("owner"), currency=query.get("currency"))
+        if parts == ["parties"]:
+            return 200, await self._known_parties()
+        if len(parts) == 2 and parts[0] == "parties":
+            return 200, model.party_view(parts[1])
+        if parts == ["buckets"]:
+            return 200, {**model.hashes.to_dict(), "offset": model.offset, "seq": model.seq}
+        if len(parts) == 2 and parts[0] == "buckets" and parts[1].isdigit():
+            return 200, model.bucket_records(int(parts[1]))
+        if parts == ["reconcile"]:
+            return 200, model.last_reconcile or {}
+        return 404, {"error": f"unknown path {path}"}
+
+    def _geo(self, parts: List[str], query: Dict[str, str]) -> Tuple[int, Any]:
+        geo = self.model.geo
+        bbox = [float(v) for v in query["bbox"].split(",")] if "bbox" in query else None
+        if bbox is not None and len(bbox) != 4:
+            raise ValueError("bbox must be <south>,<west>,<north>,<east>")
+        if parts == ["clusters"]:
+            return 200, geo.clusters(int(query.get("zoom", 0)), bbox)
+        if parts:
+            return 404, {"error": f"unknown path /geo/{parts[0]}"}
+        if "near" in query:
+            lat, lon = (float(v) for v in query["near"].split(","))
+            limit = int(query["limit"]) if "limit" in query else None
+            return 200, geo.within(lat, lon, float(query.get("km", 1)), limit=limit)
+        if bbox is not None:
+            return 200, geo.bbox(*bbox)
+        raise ValueError("expected near=<lat>,<lon> or bbox=<south>,<west>,<north>,<east>")
+
+    def _headers(self, status: int, content_type: str, length: Optional[int] = None,
+                 close: bool = False) -> bytes:
+        lines = [
+            f"HTTP/1.1 {status} {_REASONS.get(status, '')}",
+            f"Content-Type: {content_type}",
+            f'ETag: "{self.model.seq}"',
+            f"X-Ledger-Offset: {self.model.offset or ''}",
+            "Cache-Control: no-cache",
+        ]
+        if length is not None:
+            lines.append(f"Content-Length: {length}")
+        if close:
+            lines.append("Connection: close")
+        return ("\r\n".join(lines) + "\r\n\r\n").encode()
+
+    async def _serve_events(self, writer: asyncio.StreamWriter, since: int) -> None:
+        writer.write(self._headers(200, "text/event-stream"))
+        await writer.drain()
+        while True:
+            changes = self.model.changes_since(since)
+            if changes is None:
+                # the client fell behind the change log: it must reload the full state
+                writer.write(f"id: {self.model.seq}\nevent: reset\ndata: {{}}\n\n".encode())
+                since = self.model.seq
+            else:
+                for seq, event in changes:
+                    writer.write(f"id: {seq}\nevent: {event['event']}\ndata: {json.dumps(event)}\n\n".encode())
+                    since = seq
+                if not changes and not await self.model.wait_for_change(since, 15.0):
+                    writer.write(b": keep-alive\n\n")
+            await writer.drain()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """
+        Обслуживает одно HTTP/1.1 соединение (с поддержкой keep-alive).
+        """
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = (await reader.readline()).decode("latin-1").strip()
+                    if not line:
+                        break
+                    name, _, value = line.partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                url = urlsplit(target)
+                query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+                close = headers.get("connection", "").lower() == "close"
+                if method != "GET":
+                    status, body = 405, {"error": "only GET is supported"}
+                    # the unread request body would be parsed as the next request line
+                    length = int(headers.get("content-length") or 0)
+                    if "transfer-encoding" in headers or length > MAX_DISCARDED_BODY:
+                        close = True
+                    elif length:
+                        await reader.readexactly(length)
+                elif url.path.rstrip("/") == "/events":
+                    since = int(headers.get("last-event-id") or query.get("since") or self.model.seq)
+                    await self._serve_events(writer, since)
+                    break
+                else:
+                    etag = f'"{self.model.seq}"'
+                    if headers.get("if-none-match") == etag and "wait" in query:
+                        await self.model.wait_for_change(self.model.seq, float(query["wait"]))
+                    if headers.get("if-none-match") == f'"{self.model.seq}"':
+                        status, body = 304, None
+                    else:
+                        status, body = await self._route(url.path, query)
+
+                data = b"" if body is None else json.dumps(body).encode()
+                writer.write(self._headers(status, "application/json", len(data), close) + data)
+                await writer.drain()
+                if close:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+async def _reconcile_periodically(handler: RealEstateHandler, model: ReadModel, interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await model.reconcile(handler)
+        except Exception as ex:
+            model.last_reconcile = {"error": f"{type(ex).__name__}: {ex}"}
+
+
+async def serve_read_model(handler: RealEstateHandler, host: str = "127.0.0.1", port: int = 8780,
+                           reconcile_interval: Optional[float] = None) -> None:
+    """
+    Запускает ReadModel с подпиской на леджер и HTTP-сервер; работает до отмены.
+
+    Args:
+        handler: Подключенный RealEstateHandler, от имени которого читается леджер.
+        host: Адрес для HTTP-сервера.
+        port: Порт HTTP-сервера.
+        reconcile_interval: Период сверки с леджером в секундах (None — без сверки).
+    """
+    model = ReadModel()
+    server = ReadModelServer(handler, model)
+    tasks = [asyncio.create_task(model.follow(handler))]
+    if reconcile_interval:
+        tasks.append(asyncio.create_task(_reconcile_periodically(handler, model, reconcile_interval)))
+    http = await asyncio.start_server(server.handle, host, port)
+    try:
+        async with http:
+            await asyncio.gather(http.serve_forever(), *tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
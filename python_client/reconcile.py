@@ -0,0 +1,216 @@
+import asyncio
+import hashlib
+import json
+import urllib.request
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from python_client.client import STREAM_TEMPLATES
+
+
+DEFAULT_BUCKETS = 256
+
+
+def bucket_of(contract_id: str, buckets: int = DEFAULT_BUCKETS) -> int:
+    """
+    Номер бакета контракта: равномерное хеширование cid.
+    """
+    return int.from_bytes(hashlib.blake2b(contract_id.encode(), digest_size=8).digest(), "big") % buckets
+
+
+def record_digest(record: Dict[str, Any]) -> int:
+    """
+    Хеш записи {"template", "contractId", "payload"} как 256-битное число.
+
+    Payload сериализуется канонически (с сортировкой ключей), поэтому хеш не
+    зависит от порядка полей.
+    """
+    payload = json.dumps(record["payload"], sort_keys=True, separators=(",", ":"))
+    data = "\x1f".join((record["template"], record["contractId"], payload)).encode()
+    return int.from_bytes(hashlib.blake2b(data, digest_size=32).digest(), "big")
+
+
+class BucketHashes:
+    """
+    Хеши набора контрактов по бакетам cid (двухуровневое дерево Меркла).
+
+    Хеш бакета — XOR хешей его записей, поэтому добавление и удаление
+    контракта стоят O(1) и не зависят от порядка событий. Корневой хеш
+    вычисляется из хешей бакетов; при несовпадении корней сравниваются
+    бакеты, и перечитывать нужно только отличающиеся.
+
+    Attributes:
+        buckets: Число бакетов.
+        sums: XOR хешей записей по бакетам.
+        counts: Число записей по бакетам.
+    """
+
+    def __init__(self, buckets: int = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.sums: List[int] = [0] * buckets
+        self.counts: List[int] = [0] * buckets
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict[str, Any]], buckets: int = DEFAULT_BUCKETS) -> "BucketHashes":
+        hashes = cls(buckets)
+        for record in records:
+            hashes.add(record)
+        return hashes
+
+    def bucket(self, contract_id: str) -> int:
+        return bucket_of(contract_id, self.buckets)
+
+    def add(self, record: Dict[str, Any]) -> None:
+        n = self.bucket(record["contractId"])
+        self.sums[n] ^= record_digest(record)
+        self.counts[n] += 1
+
+    def discard(self, record: Dict[str, Any]) -> None:
+        """
+        Убирает запись, ранее добавленную через add (с тем же payload).
+        """
+        n = self.bucket(record["contractId"])
+        self.sums[n] ^= record_digest(record)
+        self.counts[n] -= 1
+
+    def digest(self, n: int) -> str:
+        return f"{self.counts[n]:x}:{self.sums[n]:064x}"
+
+    def root(self) -> str:
+        h = hashlib.sha256()
+        for n in range(self.buckets):
+            h.update(self.digest(n).encode())
+        return h.hexdigest()
+
+    def diff(self, other: "BucketHashes") -> List[int]:
+        """
+        Возвращает номера бакетов, в которых наборы различаются.
+
+        Raises:
+            ValueError: Если число бакетов различается.
+        """
+        if other.buckets != self.buckets:
+            raise ValueError(f"bucket count mismatch: {self.buckets} != {other.buckets}")
+        return [
+            n for n in range(self.buckets)
+            if self.sums[n] != other.sums[n] or self.counts[n] != other.counts[n]
+        ]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"buckets": self.buckets, "root": self.root(), "digests": [self.digest(n) for n in range(self.buckets)]}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "BucketHashes":
+        hashes = cls(data["buckets"])
+        for n, digest in enumerate(data["digests"]):
+            count, _, total = digest.partition(":")
+            hashes.counts[n] = int(count, 16)
+            hashes.sums[n] = int(total, 16)
+        return hashes
+
+
+async def scan_ledger(handler, buckets: int = DEFAULT_BUCKETS,
+                      templates=STREAM_TEMPLATES) -> Tuple[BucketHashes, Optional[str]]:
+    """
+    Считает хеши бакетов по свежему проходу ACS, не храня контракты в памяти.
+
+    Returns:
+        (хеши бакетов, offset снимка ACS).
+    """
+    hashes = BucketHashes(buckets)
+    offset = None
+    async for record in handler.iter_snapshot_async(templates):
+        if "contractId" in record:
+            hashes.add(record)
+        else:
+            offset = record["offset"]
+    return hashes, offset
+
+
+async def fetch_buckets(handler, wanted: Set[int], buckets: int = DEFAULT_BUCKETS,
+                        templates=STREAM_TEMPLATES) -> Dict[int, Dict[str, Dict[str, Any]]]:
+    """
+    Перечитывает из ACS только контракты указанных бакетов.
+
+    Returns:
+        Dict: бакет -> {cid -> запись}.
+    """
+    result: Dict[int, Dict[str, Dict[str, Any]]] = {n: {} for n in wanted}
+    async for record in handler.iter_snapshot_async(templates):
+        if "contractId" not in record:
+            continue
+        n = bucket_of(record["contractId"], buckets)
+        if n in wanted:
+            result[n][record["contractId"]] = record
+    return result
+
+
+def compare_bucket(local: Dict[str, Dict[str, Any]], ledger: Dict[str, Dict[str, Any]]) -> Dict[str, List[str]]:
+    """
+    Сравнивает содержимое одного бакета.
+
+    Args:
+        local: cid -> запись локального состояния.
+        ledger: cid -> запись из ACS.
+
+    Returns:
+        Dict с полями missing (нет локально), stale (архивированы в леджере)
+        и changed (payload отличается).
+    """
+    return {
+        "missing": sorted(cid for cid in ledger if cid not in local),
+        "stale": sorted(cid for cid in local if cid not in ledger),
+        "changed": sorted(
+            cid for cid in ledger
+            if cid in local and record_digest(local[cid]) != record_digest(ledger[cid])
+        ),
+    }
+
+
+def _get_json(url: str) -> Any:
+    with urllib.request.urlopen(url, timeout=30) as response:
+        return json.loads(response.read())
+
+
+async def reconcile_mirror(handler, url: str, templates=STREAM_TEMPLATES) -> Dict[str, Any]:
+    """
+    Сверяет запущенный read-model (main.py read-model) с ACS леджера.
+
+    Хеши бакетов зеркала (/buckets) сравниваются с хешами потокового прохода
+    ACS; содержимое (/buckets/<n> и ACS) перечитывается только для
+    отличающихся бакетов. Бакеты, изменившиеся в зеркале во время прохода,
+    пропускаются: их расхождение может быть событием, которое зеркало уже
+    применило, а снимок ACS еще не видел (или наоборот).
+
+    Args:
+        handler: RealEstateHandler того же party, от имени которого работает зеркало.
+        url: Базовый URL read-model (например, http://127.0.0.1:8780).
+        templates: Шаблоны "Module:Entity" зеркала.
+
+    Returns:
+        Dict с полями offset, mirrorOffset, root, ledgerRoot, skippedBuckets
+        и buckets (номер бакета -> compare_bucket) для реально отличающихся бакетов.
+    """
+    url = url.rstrip("/")
+    before = await asyncio.to_thread(_get_json, f"{url}/buckets")
+    ledger, offset = await scan_ledger(handler, before["buckets"], templates)
+    after = await asyncio.to_thread(_get_json, f"{url}/buckets")
+    mirror = BucketHashes.from_dict(after)
+    moving = set(BucketHashes.from_dict(before).diff(mirror))
+    differing = [n for n in mirror.diff(ledger) if n not in moving]
+
+    buckets: Dict[str, Dict[str, List[str]]] = {}
+    if differing:
+        fetched = await fetch_buckets(handler, set(differing), mirror.buckets, templates)
+        for n in differing:
+            local = {r["contractId"]: r for r in await asyncio.to_thread(_get_json, f"{url}/buckets/{n}")}
+            delta = compare_bucket(local, fetched[n])
+            if any(delta.values()):
+                buckets[str(n)] = delta
+    return {
+        "offset": offset,
+        "mirrorOffset": after.get("offset"),
+        "root": mirror.root(),
+        "ledgerRoot": ledger.root(),
+        "skippedBuckets": sorted(moving),
+        "buckets": buckets,
+    }
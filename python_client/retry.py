@@ -0,0 +1,96 @@
+import asyncio
+import hashlib
+import random
+import uuid
+from typing import Optional
+
+import grpc
+
+
+# gRPC status codes after which resubmitting the same command id is safe and may succeed
+RETRIABLE_CODES = ("UNAVAILABLE", "DEADLINE_EXCEEDED", "RESOURCE_EXHAUSTED", "ABORTED")
+# codes a command is resubmitted on: ABORTED (contention) needs a fresh cid, see PropertySequencer
+RESUBMIT_CODES = ("UNAVAILABLE", "DEADLINE_EXCEEDED", "RESOURCE_EXHAUSTED")
+DUPLICATE_MARKERS = ("ALREADY_EXISTS", "DUPLICATE_COMMAND")
+
+
+class DuplicateCommandError(Exception):
+    """
+    Команда с этим command id уже принята леджером в пределах периода дедупликации.
+
+    Означает, что предыдущая отправка (в том числе прерванная таймаутом)
+    была применена; повторно команда не выполняется.
+    """
+
+    def __init__(self, command_id: str, message: str = ""):
+        super().__init__(f"Command {command_id} was already submitted{': ' + message if message else ''}")
+        self.command_id = command_id
+
+
+def status_name(ex: BaseException) -> str:
+    """
+    Возвращает имя gRPC-статуса ошибки или ее текст, если статуса нет.
+    """
+    code = getattr(ex, "code", None)
+    if callable(code):
+        try:
+            return code().name
+        except Exception:
+            pass
+    return str(ex)
+
+
+def is_retriable_error(ex: BaseException) -> bool:
+    """
+    Проверяет, можно ли повторить команду с тем же command id.
+    """
+    if isinstance(ex, asyncio.TimeoutError):
+        return True
+    status = status_name(ex)
+    return any(code in status for code in RETRIABLE_CODES)
+
+
+def is_resubmittable_error(ex: BaseException) -> bool:
+    """
+    Проверяет, нужно ли повторно отправить команду с тем же command id.
+
+    UNAVAILABLE от gRPC dazl уже повторяет сам в пределах срока вызова,
+    поэтому повтор нужен только для ошибок, которые dazl не повторяет:
+    таймаутов, DEADLINE_EXCEEDED, RESOURCE_EXHAUSTED и UNAVAILABLE от JSON API.
+    """
+    if isinstance(ex, asyncio.TimeoutError):
+        return True
+    status = status_name(ex)
+    if isinstance(ex, grpc.RpcError) and "UNAVAILABLE" in status:
+        return False
+    return any(code in status for code in RESUBMIT_CODES)
+
+
+def is_duplicate_error(ex: BaseException) -> bool:
+    """
+    Проверяет, отклонил ли леджер команду как дубликат.
+    """
+    text = f"{status_name(ex)} {ex}"
+    return any(marker in text for marker in DUPLICATE_MARKERS)
+
+
+def command_id(idempotency_key: Optional[str], *scope: str) -> str:
+    """
+    Возвращает command id для отправки.
+
+    Для одинаковых idempotency_key и scope (приложение, party, действие)
+    id всегда один и тот же, поэтому повторная отправка в пределах периода
+    дедупликации леджера не выполнит команду второй раз. Без ключа
+    возвращается случайный id (его повторы безопасны только внутри одного вызова).
+    """
+    if idempotency_key is None:
+        return str(uuid.uuid4())
+    digest = hashlib.sha256("\x1f".join((*scope, idempotency_key)).encode()).hexdigest()
+    return f"idem-{digest[:40]}"
+
+
+def backoff_delay(attempt: int, base: float = 0.1, cap: float = 5.0) -> float:
+    """
+    Пауза перед повтором с экспоненциальным ростом и полным джиттером.
+    """
+    return random.uniform(0, min(cap, base * 2 ** attempt))
@@ -0,0 +1,274 @@
+import bisect
+import heapq
+import itertools
+import re
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Set, Tuple
+
+
+PROPERTY_TEMPLATE = "RealEstate:RealEstate"
+SEARCH_FIELDS = ("address", "propertyId", "propertyType")
+MODES = ("auto", "prefix", "substring", "fuzzy")
+
+_SPACES = re.compile(r"\s+")
+_TOKEN = re.compile(r"\w+")
+
+
+def normalize(text: Any) -> str:
+    """
+    Приводит текст к виду для поиска: регистр и повторяющиеся пробелы не важны.
+    """
+    return _SPACES.sub(" ", str(text or "")).strip().casefold()
+
+
+def trigrams(text: str) -> Set[str]:
+    """
+    Триграммы строки (для строк короче трех символов — сама строка).
+    """
+    if len(text) < 3:
+        return {text} if text else set()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TextIndex:
+    """
+    Инвертированный индекс по address, propertyId и propertyType объектов RealEstate.
+
+    Поддерживает три вида поиска:
+        prefix    — каждое слово запроса — начало слова в одном из полей
+                    (отсортированный словарь слов, бинарный поиск);
+        substring — запрос — подстрока поля (пересечение списков триграмм
+                    и проверка кандидатов);
+        fuzzy     — похожесть по триграммам (коэффициент Дайса), устойчиво
+                    к опечаткам; слишком частые триграммы не учитываются.
+
+    Индекс обновляется по одному контракту (add/remove, события потока),
+    поэтому его не нужно перестраивать при каждом изменении.
+
+    Пример:
+        index.load(await handler.list_properties_async())
+        index.search("baker st", limit=10)
+    """
+
+    def __init__(self, fields: Tuple[str, ...] = SEARCH_FIELDS, max_df: float = 0.2):
+        """
+        Args:
+            fields: Поля payload для индексации.
+            max_df: Доля документов, выше которой триграмма не участвует
+                    в нечетком поиске (как стоп-слово).
+        """
+        self.fields = fields
+        self.max_df = max_df
+        self._docs: Dict[int, Dict[str, Any]] = {}  # doc id -> record
+        self._ids: Dict[str, int] = {}  # contract id -> doc id
+        self._postings: Dict[str, Set[int]] = {}  # trigram -> doc ids
+        self._words: List[Tuple[str, int]] = []  # (word, doc id), sorted lazily
+        self._dirty = False
+        self._next = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def __contains__(self, contract_id: str) -> bool:
+        return contract_id in self._ids
+
+    def _texts(self, record: Dict[str, Any]) -> List[str]:
+        payload = record["payload"]
+        return [normalize(payload.get(field)) for field in self.fields]
+
+    def _grams(self, texts: List[str]) -> Set[str]:
+        return set().union(*(trigrams(t) for t in texts))
+
+    def _doc_words(self, texts: List[str]) -> Set[str]:
+        return {w for t in texts for w in _TOKEN.findall(t)}
+
+    def _sorted_words(self) -> List[Tuple[str, int]]:
+        if self._dirty:
+            self._words.sort()
+            self._dirty = False
+        return self._words
+
+    # =============================
+    # MAINTENANCE
+    # =============================
+
+    def add(self, record: Dict[str, Any]) -> None:
+        """
+        Индексирует запись RealEstate ({"contractId", "payload"}); повтор cid игнорируется.
+        """
+        cid = record["contractId"]
+        if cid in self._ids:
+            return
+        doc = next(self._next)
+        self._ids[cid] = doc
+        self._docs[doc] = record
+        texts = self._texts(record)
+        for gram in self._grams(texts):
+            self._postings.setdefault(gram, set()).add(doc)
+        for word in self._doc_words(texts):
+            self._dirty = self._dirty or bool(self._words and self._words[-1] > (word, doc))
+            self._words.append((word, doc))
+
+    def remove(self, contract_id: str) -> None:
+        """
+        Удаляет контракт из индекса (неизвестные cid игнорируются).
+        """
+        doc = self._ids.pop(contract_id, None)
+        if doc is None:
+            return
+        texts = self._texts(self._docs.pop(doc))
+        for gram in self._grams(texts):
+            docs = self._postings[gram]
+            docs.discard(doc)
+            if not docs:
+                del self._postings[gram]
+        words = self._sorted_words()
+        for word in self._doc_words(texts):
+            del words[bisect.bisect_left(words, (word, doc))]
+
+    def load(self, records: Iterable[Dict[str, Any]]) -> None:
+        """
+        Приводит индекс к полному списку объектов: добавляет новые cid и
+        удаляет исчезнувшие, не переиндексируя остальные.
+        """
+        records = list(records)
+        current = {r["contractId"] for r in records}
+        for cid in [c for c in self._ids if c not in current]:
+            self.remove(cid)
+        for record in records:
+            self.add(record)
+
+    def apply(self, event: Dict[str, Any]) -> None:
+        """
+        Применяет событие stream_events_async.
+        """
+        if event.get("template") != PROPERTY_TEMPLATE:
+            return
+        if event["event"] == "created":
+            self.add(event)
+        elif event["event"] == "archived":
+            self.remove(event["contractId"])
+
+    # =============================
+    # LOOKUP
+    # =============================
+
+    def _record(self, doc: int, score: float) -> Dict[str, Any]:
+        record = self._docs[doc]
+        return {"contractId": record["contractId"], "payload": record["payload"], "score": round(score, 3)}
+
+    def _prefix_range(self, prefix: str) -> Tuple[int, int]:
+        words = self._sorted_words()
+        return bisect.bisect_left(words, (prefix,)), bisect.bisect_left(words, (prefix + "\U0010ffff",))
+
+    def prefix(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        Объекты, в полях которых для каждого слова запроса есть слово с таким началом.
+
+        Кандидаты берутся из самого узкого диапазона словаря, остальные слова
+        проверяются по каждому кандидату; точные совпадения слов идут первыми.
+        """
+        parts = _TOKEN.findall(normalize(query))
+        if not parts:
+            return []
+        ranges = sorted((self._prefix_range(part), part) for part in set(parts))
+        (lo, hi), driver = min(ranges, key=lambda r: r[0][1] - r[0][0])
+        rest = [part for _, part in ranges if part != driver]
+        words = self._words
+        docs: Dict[int, None] = {}
+        for i in range(lo, hi):
+            doc = words[i][1]
+            if doc in docs:
+                continue
+            if rest:
+                doc_words = self._doc_words(self._texts(self._docs[doc]))
+                if not all(any(w.startswith(part) for w in doc_words) for part in rest):
+                    continue
+            docs[doc] = None
+            if len(docs) >= limit:
+                break
+        return [self._record(doc, 1.0) for doc in docs]
+
+    def substring(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        Объекты, одно из полей которых содержит запрос как подстроку.
+        """
+        needle = normalize(query)
+        grams = trigrams(needle)
+        if not grams:
+            return []
+        if len(needle) < 3:
+            # shorter than a trigram: candidates are documents with a trigram containing it
+            candidates = set().union(*(docs for g, docs in self._postings.items() if needle in g))
+        else:
+            postings = sorted((self._postings.get(g, set()) for g in grams), key=len)
+            candidates = set(postings[0])
+            for docs in postings[1:]:
+                candidates &= docs
+                if not candidates:
+                    return []
+        result = []
+        for doc in sorted(candidates):
+            if any(needle in text for text in self._texts(self._docs[doc])):
+                result.append(self._record(doc, 1.0))
+                if len(result) >= limit:
+                    break
+        return result
+
+    def fuzzy(self, query: str, limit: int = 20, threshold: float = 0.3) -> List[Dict[str, Any]]:
+        """
+        Объекты, наиболее похожие на запрос по триграммам (с учетом опечаток).
+
+        Args:
+            query: Текст запроса.
+            limit: Максимальное число результатов.
+            threshold: Минимальный коэффициент Дайса (0..1) с лучшим полем.
+        """
+        needle = normalize(query)
+        grams = trigrams(needle)
+        if not grams:
+            return []
+        cutoff = max(1, int(self.max_df * len(self._docs)))
+        selective = [g for g in grams if 0 < len(self._postings.get(g, ())) <= cutoff]
+        shared: Counter = Counter()
+        for gram in selective or grams:
+            shared.update(self._postings.get(gram, ()))
+        scored = []
+        for doc, _ in shared.most_common(limit * 20):
+            best = max(
+                2 * len(grams & trigrams(text)) / (len(grams) + len(trigrams(text)))
+                for text in self._texts(self._docs[doc]) if text
+            )
+            if best >= threshold:
+                scored.append((best, doc))
+        return [self._record(doc, score) for score, doc in heapq.nlargest(limit, scored)]
+
+    def search(self, query: str, limit: int = 20, mode: str = "auto") -> List[Dict[str, Any]]:
+        """
+        Поиск объектов по address, propertyId и propertyType.
+
+        Args:
+            query: Текст запроса.
+            limit: Максимальное число результатов.
+            mode: "prefix", "substring", "fuzzy" или "auto" — префиксы,
+                  затем подстроки, а при отсутствии совпадений — нечеткий поиск.
+
+        Returns:
+            List[Dict]: Записи {"contractId", "payload", "score"}.
+
+        Raises:
+            ValueError: Если mode неизвестен.
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown search mode {mode!r}, expected one of {MODES}")
+        if mode == "prefix":
+            return self.prefix(query, limit)
+        if mode == "substring":
+            return self.substring(query, limit)
+        if mode == "fuzzy":
+            return self.fuzzy(query, limit)
+        result = self.prefix(query, limit)
+        if len(result) < limit:
+            seen = {r["contractId"] for r in result}
+            result += [r for r in self.substring(query, limit) if r["contractId"] not in seen][:limit - len(result)]
+        return result or self.fuzzy(query, limit)
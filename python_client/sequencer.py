@@ -0,0 +1,153 @@
+import asyncio
+import re
+from typing import Any, Dict, List, Optional
+
+from dazl import Party
+
+
+# fragments of ledger errors meaning "the contract id we used is no longer current"
+CONTENTION_MARKERS = (
+    "CONTRACT_NOT_FOUND",
+    "could not be found",
+    "LOCKED_CONTRACTS",
+    "inactive contract",
+    "INCONSISTENT",
+)
+
+
+_CID_RE = re.compile(r"\b00[0-9a-f]{64,}\b")
+
+
+def is_contention_error(ex: Exception, contract_id: Optional[str] = None) -> bool:
+    """
+    Проверяет, означает ли ошибка устаревший или заблокированный contract id.
+
+    Args:
+        ex: Ошибка леджера.
+        contract_id: cid объекта; если ошибка называет другие cid, но не его
+                     (например, уже потраченный paymentCid), это не конфликт
+                     по объекту и повтор с новым cid объекта не поможет.
+    """
+    text = str(ex)
+    if not any(marker in text for marker in CONTENTION_MARKERS):
+        return False
+    named = set(_CID_RE.findall(text))
+    return contract_id is None or not named or contract_id in named
+
+
+class PropertySequencer:
+    """
+    Последовательное выполнение choice над одним объектом недвижимости.
+
+    Каждый choice RealEstate архивирует контракт и возвращает новый cid,
+    поэтому две параллельные команды над одним объектом конфликтуют.
+    Sequencer ставит команды в очередь по propertyId (FIFO asyncio.Lock),
+    подставляет в каждую команду cid, возвращенный предыдущей, и при
+    конфликте перечитывает текущий cid из леджера и повторяет команду.
+    Команды над разными объектами выполняются параллельно.
+
+    Состояние (очереди и известные cid) общее для всех копий handler,
+    созданных через with_party, поэтому handler передается в каждый вызов.
+    """
+
+    def __init__(self, retries: int = 3, backoff: float = 0.05):
+        """
+        Args:
+            retries: Число повторов при конфликте.
+            backoff: Базовая пауза между повторами в секундах (удваивается).
+        """
+        self.retries = retries
+        self.backoff = backoff
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._queued: Dict[str, int] = {}  # commands holding or waiting for each lock
+        self._cids: Dict[str, str] = {}
+
+    def current_cid(self, property_id: str) -> Optional[str]:
+        """
+        Возвращает последний известный sequencer cid объекта или None.
+        """
+        return self._cids.get(property_id)
+
+    def observe(self, property_id: str, contract_id: Optional[str]) -> None:
+        """
+        Запоминает текущий cid объекта (None — объект архивирован или неизвестен).
+        """
+        if contract_id is None:
+            self._cids.pop(property_id, None)
+        else:
+            self._cids[property_id] = contract_id
+
+    async def lookup_cid(self, handler, property_id: str, read_as: Optional[List[Party]] = None) -> Optional[str]:
+        """
+        Читает текущий cid объекта из леджера по propertyId.
+
+        Args:
+            handler: RealEstateHandler, через который выполняется чтение.
+            property_id: ID объекта.
+            read_as: Parties, от имени которых читать (по умолчанию party
+                     handler). Для Buy нужен продавец: покупатель не видит
+                     чужой объект.
+        """
+        for event in await handler._query_events(
+            "RealEstate:RealEstate", query={"propertyId": property_id}, read_as=read_as, primary=True,
+        ):
+            self.observe(property_id, str(event.contract_id))
+            return str(event.contract_id)
+        self.observe(property_id, None)
+        return None
+
+    async def submit(self, handler, property_id: str, choice: str, argument: Dict[str, Any],
+                     extra_act_as: Optional[List[Party]] = None,
+                     contract_id: Optional[str] = None):
+        """
+        Выполняет choice над объектом в порядке очереди его propertyId.
+
+        Args:
+            handler: RealEstateHandler, от имени party которого выполняется choice.
+            property_id: ID объекта недвижимости.
+            choice: Имя choice RealEstate.
+            argument: Аргументы choice.
+            extra_act_as: Дополнительные parties (как в _exercise).
+            contract_id: Известный вызывающему cid; используется, если
+                         sequencer еще не видел этот объект.
+
+        Returns:
+            JSON-совместимый результат выполнения choice.
+
+        Raises:
+            LookupError: Если активный контракт объекта не найден.
+            Exception: Ошибки леджера, не связанные с конфликтом, или
+                       конфликт после исчерпания повторов.
+        """
+        lock = self._locks.setdefault(property_id, asyncio.Lock())
+        self._queued[property_id] = self._queued.get(property_id, 0) + 1
+        try:
+            async with lock:
+                return await self._submit(handler, property_id, choice, argument, extra_act_as, contract_id)
+        finally:
+            # drop the lock of an idle property so the table does not grow with every propertyId
+            self._queued[property_id] -= 1
+            if not self._queued[property_id]:
+                del self._queued[property_id]
+                del self._locks[property_id]
+
+    async def _submit(self, handler, property_id: str, choice: str, argument: Dict[str, Any],
+                      extra_act_as: Optional[List[Party]], contract_id: Optional[str]):
+        # the acting party and co-actors (the seller for Buy) between them see the property
+        read_as = list(dict.fromkeys([Party(handler.party), *(extra_act_as or [])]))
+        cid = self._cids.get(property_id) or contract_id or await self.lookup_cid(handler, property_id, read_as)
+        for attempt in range(self.retries + 1):
+            if cid is None:
+                raise LookupError(f"No active RealEstate contract for propertyId {property_id}")
+            try:
+                res = await handler._exercise(cid, choice, argument, extra_act_as=extra_act_as)
+            except Exception as ex:
+                if attempt == self.retries or not is_contention_error(ex, cid):
+                    raise
+                await asyncio.sleep(self.backoff * 2 ** attempt)
+                cid = await self.lookup_cid(handler, property_id, read_as)
+                continue
+            result = res.get("result")
+            # consuming choices return the rotated cid; ArchiveProperty returns unit
+            self.observe(property_id, result.get("contractId") if isinstance(result, dict) else None)
+            return res
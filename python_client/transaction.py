@@ -0,0 +1,162 @@
+from typing import Any, Dict, List, Optional
+
+from dazl.ledger.api_types import CreateAndExerciseCommand, CreateCommand, ExerciseCommand
+
+
+class TransactionBuilder:
+    """
+    Сборщик нескольких команд в одну атомарную транзакцию.
+
+    Собирает create, exercise и createAndExercise над шаблонами модуля
+    RealEstate (RealEstate, Cash, Registry) и отправляет их одним вызовом
+    SubmitAndWaitForTransactionTree: либо применяются все команды, либо ни одна.
+
+    Все команды интерпретируются относительно состояния леджера до транзакции,
+    поэтому команда не может использовать cid, созданный другой командой того же
+    пакета (например, Transfer по результату ListForSale). Частые цепочки над
+    одним объектом выполняются одним choice: update_listing (цена и метаданные,
+    UpdateListing) и mint_and_buy (выпуск оплаты и покупка, MintAndBuy).
+    Остальные цепочки — через sequencer или отдельными транзакциями.
+
+    Пример использования:
+        async with handler.transaction() as tx:
+            tx.update_listing(cid_a, "100", "USD", '{"rooms": 3}')
+            tx.mint_and_buy(cid_b, "250", "USD", buyer=buyer_id, seller=seller_id, issuer=seller_id)
+            tx.exercise(cid_c, "Delist", {})
+        tx.results  # результаты по порядку команд
+    """
+
+    def __init__(self, handler, idempotency_key: Optional[str] = None):
+        """
+        Args:
+            handler: RealEstateHandler, от имени party которого отправляется транзакция.
+            idempotency_key: Ключ идемпотентности: повторная отправка с тем же
+                             ключом не применит транзакцию второй раз.
+        """
+        self.handler = handler
+        self.idempotency_key = idempotency_key
+        self.commands: List[Any] = []
+        self.act_as: List[str] = []
+        self.results: Optional[List[Dict[str, Any]]] = None
+
+    def __len__(self) -> int:
+        return len(self.commands)
+
+    def _add(self, command, act_as: Optional[List[str]]) -> int:
+        self.commands.append(command)
+        for party in act_as or []:
+            if party not in self.act_as:
+                self.act_as.append(party)
+        return len(self.commands) - 1
+
+    def create(self, template: str, payload: Dict[str, Any],
+               act_as: Optional[List[str]] = None) -> int:
+        """
+        Добавляет создание контракта.
+
+        Args:
+            template: Имя шаблона в модуле RealEstate ("RealEstate", "Cash", "Registry").
+            payload: Данные контракта (parties — канонические ID).
+            act_as: Дополнительные parties-подписанты (подсказки или ID).
+
+        Returns:
+            int: Индекс команды в results.
+        """
+        return self._add(CreateCommand(f"RealEstate:{template}", payload), act_as)
+
+    def exercise(self, contract_id: str, choice: str, argument: Dict[str, Any],
+                 template: str = "RealEstate", act_as: Optional[List[str]] = None) -> int:
+        """
+        Добавляет выполнение choice на существующем контракте.
+
+        Args:
+            contract_id: ID контракта.
+            choice: Имя choice.
+            argument: Аргументы choice.
+            template: Имя шаблона в модуле RealEstate.
+            act_as: Дополнительные parties (например, buyer и seller для Buy).
+
+        Returns:
+            int: Индекс команды в results.
+        """
+        cid = self.handler._contract_id(contract_id, template)
+        return self._add(ExerciseCommand(cid, choice, argument), act_as)
+
+    def create_and_exercise(self, template: str, payload: Dict[str, Any], choice: str,
+                            argument: Dict[str, Any], act_as: Optional[List[str]] = None) -> int:
+        """
+        Добавляет создание контракта с немедленным выполнением choice на нем.
+
+        Returns:
+            int: Индекс команды в results.
+        """
+        return self._add(
+            CreateAndExerciseCommand(f"RealEstate:{template}", payload, choice, argument),
+            act_as,
+        )
+
+    def update_listing(self, contract_id: str, price: str, currency: str, meta_json: str) -> int:
+        """
+        Добавляет выставление на продажу с новой ценой и метаданными (choice UpdateListing).
+
+        Заменяет пару ListForSale + UpdateMeta, которую нельзя отправить одной
+        транзакцией: второй choice нужен cid, созданный первым.
+
+        Returns:
+            int: Индекс команды в results.
+        """
+        return self.exercise(contract_id, "UpdateListing", {
+            "newPrice": price,
+            "newCurrency": currency,
+            "newMetaJson": meta_json,
+        })
+
+    def mint_and_buy(self, contract_id: str, price: str, currency: str,
+                     buyer: str, seller: str, issuer: str) -> int:
+        """
+        Добавляет покупку с выпуском оплаты покупателя в той же транзакции (choice MintAndBuy).
+
+        Заменяет mint_cash_async + Buy: Cash на точную сумму создается
+        внутри choice и сразу тратится.
+
+        Args:
+            contract_id: ID выставленного контракта RealEstate.
+            price: Цена (должна совпадать с ценой в контракте).
+            currency: Валюта.
+            buyer: Канонический ID покупателя.
+            seller: Канонический ID продавца (текущий owner).
+            issuer: Канонический ID эмитента Cash.
+
+        Returns:
+            int: Индекс команды в results.
+        """
+        return self.exercise(contract_id, "MintAndBuy", {
+            "offeredPrice": price,
+            "offeredCurrency": currency,
+            "buyer": buyer,
+            "issuer": issuer,
+        }, act_as=[buyer, seller])
+
+    async def submit(self) -> List[Dict[str, Any]]:
+        """
+        Отправляет собранные команды одной транзакцией.
+
+        Returns:
+            List[Dict]: Результаты по порядку команд: для create —
+            {"contractId", "payload"}, для exercise и createAndExercise —
+            {"result", "events"}, как у одиночных методов handler.
+
+        Raises:
+            Exception: При отклонении транзакции (ни одна команда не применяется).
+        """
+        self.results = await self.handler.submit_commands_async(
+            self.commands, extra_act_as=self.act_as, idempotency_key=self.idempotency_key,
+        )
+        return self.results
+
+    async def __aenter__(self) -> "TransactionBuilder":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            await self.submit()
@@ -0,0 +1,127 @@
+import bisect
+import decimal
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class WalletIndex:
+    """
+    Индекс контрактов Cash по владельцу и валюте.
+
+    Для каждой пары (owner, currency) хранит отсортированный по сумме список
+    контрактов и текущий баланс, который обновляется инкрементально при
+    добавлении и удалении контрактов. Поиск контракта на точную сумму — бинарный,
+    поэтому время подбора оплаты не растет линейно с размером кошелька.
+    """
+
+    def __init__(self):
+        self.owners = set()  # owners whose holdings were loaded from the ledger
+        self._records: Dict[str, Dict[str, Any]] = {}
+        self._sorted: Dict[Tuple[str, str], List[Tuple[decimal.Decimal, str]]] = {}
+        self._balances: Dict[Tuple[str, str], decimal.Decimal] = {}
+
+    @staticmethod
+    def _key_amount(record: Dict[str, Any]) -> Tuple[Tuple[str, str], decimal.Decimal]:
+        payload = record["payload"]
+        return (payload.get("owner"), payload.get("currency")), decimal.Decimal(str(payload["amount"]))
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def add(self, record: Dict[str, Any]) -> None:
+        """
+        Добавляет контракт Cash в формате list_cash_async ({"contractId", "payload"}).
+        """
+        cid = record["contractId"]
+        if cid in self._records:
+            return
+        key, amount = self._key_amount(record)
+        self._records[cid] = record
+        bisect.insort(self._sorted.setdefault(key, []), (amount, cid))
+        self._balances[key] = self._balances.get(key, decimal.Decimal(0)) + amount
+
+    def remove(self, cid: str) -> None:
+        """
+        Удаляет контракт Cash по ID (неизвестные ID игнорируются).
+        """
+        record = self._records.pop(cid, None)
+        if record is None:
+            return
+        key, amount = self._key_amount(record)
+        entries = self._sorted[key]
+        del entries[bisect.bisect_left(entries, (amount, cid))]
+        self._balances[key] -= amount
+
+    def load(self, records: List[Dict[str, Any]], owner: Optional[str] = None) -> None:
+        """
+        Заменяет содержимое индекса полным списком контрактов Cash.
+
+        Args:
+            records: Контракты в формате list_cash_async.
+            owner: Если задан — заменяются только контракты этого владельца
+                   (из records берутся только его контракты), остальные
+                   владельцы не затрагиваются; owner отмечается загруженным.
+        """
+        if owner is None:
+            self._records.clear()
+            self._sorted.clear()
+            self._balances.clear()
+            self.owners.clear()
+        else:
+            for cid in [cid for cid, r in self._records.items() if r["payload"].get("owner") == owner]:
+                self.remove(cid)
+            records = [r for r in records if r["payload"].get("owner") == owner]
+            self.owners.add(owner)
+        for record in records:
+            self.add(record)
+
+    def apply_events(self, events: List[Dict[str, Any]]) -> None:
+        """
+        Применяет события из JSON-результата exercise/create (to_jsonable).
+
+        Созданные контракты Cash добавляются, архивированные — удаляются;
+        события других шаблонов игнорируются.
+        """
+        for event in events:
+            contract_id = event.get("contractId") or {}
+            if not str(contract_id.get("contractType", "")).endswith(":Cash"):
+                continue
+            if "payload" in event:
+                self.add({"contractId": contract_id["contractId"], "payload": event["payload"]})
+            else:
+                self.remove(contract_id["contractId"])
+
+    def balance(self, owner: str, currency: str) -> decimal.Decimal:
+        """
+        Возвращает баланс владельца в валюте.
+        """
+        return self._balances.get((owner, currency), decimal.Decimal(0))
+
+    def balances(self, owner: str) -> Dict[str, str]:
+        """
+        Возвращает балансы владельца по всем валютам: {currency: сумма строкой}.
+        """
+        return {
+            currency: str(total)
+            for (o, currency), total in self._balances.items()
+            if o == owner and self._sorted[(o, currency)]
+        }
+
+    def holdings(self, owner: str, currency: str) -> List[Dict[str, Any]]:
+        """
+        Возвращает контракты владельца в валюте, отсортированные по возрастанию суммы.
+        """
+        return [self._records[cid] for _, cid in self._sorted.get((owner, currency), [])]
+
+    def find_exact(self, owner: str, currency: str, amount: str) -> Optional[str]:
+        """
+        Ищет контракт ровно на amount.
+
+        Returns:
+            ID контракта или None.
+        """
+        entries = self._sorted.get((owner, currency), [])
+        target = decimal.Decimal(str(amount))
+        i = bisect.bisect_left(entries, (target, ""))
+        if i < len(entries) and entries[i][0] == target:
+            return entries[i][1]
+        return None
@@ -0,0 +1,380 @@
+import asyncio
+import contextlib
+import contextvars
+import datetime
+import functools
+import hashlib
+import inspect
+import json
+import os
+import re
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from python_client.benchmark import summarize
+
+
+TRACE_VERSION = 1
+
+# handler calls worth replaying; internal helpers and setup calls are not recorded
+COMMAND_METHODS = (
+    "create_property_async", "bulk_create_properties_async", "ensure_registry_async",
+    "transfer_property_async", "update_meta_async", "archive_property_async",
+    "mint_cash_async", "split_cash_async", "merge_cash_async", "fund_payment_async",
+    "list_for_sale_async", "delist_property_async", "buy_property_async",
+)
+READ_METHODS = (
+    "list_properties_async", "search_properties_async", "properties_near_async",
+    "properties_in_bbox_async", "list_cash_async", "list_parties_async",
+)
+RECORDED_METHODS = COMMAND_METHODS + READ_METHODS
+
+# argument names and payload keys holding parties (hints or ids)
+PARTY_KEYS = frozenset({"registrar", "owner", "new_owner", "issuer", "buyer", "seller", "read_as"})
+
+_CID_RE = re.compile(r"^00[0-9a-f]{64,}$")
+_PARTY_RE = re.compile(r"^[^:\s]+::[0-9a-f]{8,}$")
+_TOKEN_RE = re.compile(r"^[@#][0-9a-f]{12}$")
+
+_recording = contextvars.ContextVar("recording", default=False)
+
+
+class TraceRecorder:
+    """
+    Записывает вызовы RealEstateHandler в компактный файл трассы (NDJSON).
+
+    Первая строка файла — заголовок с солью, далее по строке на вызов:
+    t — время начала (unix, с), p — party handler, m — метод, a — переданные
+    аргументы, ms — длительность, ok/e — исход и тип исключения, rc — cid,
+    созданные командой, pid — propertyId известных cid из аргументов.
+
+    Parties и cid заменяются токенами "@<hex>" и "#<hex>" (хэш с солью
+    файла), поэтому трасса не раскрывает идентификаторы, а один и тот же
+    party или cid получает один токен и при дозаписи из других процессов.
+    Вложенные вызовы (search_properties_async -> list_properties_async) не
+    записываются: в трассе только вызовы, сделанные приложением.
+
+    Пример:
+        recorder = TraceRecorder("traffic.trace")
+        recorder.attach(handler)
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Файл трассы; существующий файл дописывается с его солью.
+        """
+        self.path = path
+        self.salt = None
+        try:
+            with open(path, encoding="utf-8") as f:
+                self.salt = json.loads(f.readline()).get("salt")
+        except (OSError, ValueError):
+            pass
+        self._file = open(path, "a", encoding="utf-8")
+        if self.salt is None:
+            self.salt = os.urandom(8).hex()
+            self._write({"trace": TRACE_VERSION, "salt": self.salt,
+                         "created": datetime.datetime.now(datetime.timezone.utc).isoformat()})
+        self._key = bytes.fromhex(self.salt)
+        self._property_ids: Dict[str, str] = {}  # cid -> propertyId seen in results
+
+    def _write(self, entry: Dict[str, Any]) -> None:
+        self._file.write(json.dumps(entry, separators=(",", ":"), default=str) + "\n")
+
+    def flush(self) -> None:
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+    # =============================
+    # ANONYMIZATION
+    # =============================
+
+    def _token(self, prefix: str, value: str) -> str:
+        return prefix + hashlib.blake2b(value.encode(), key=self._key, digest_size=6).hexdigest()
+
+    def party(self, value: str) -> str:
+        # a hint and its resolved id ("Alice" / "Alice::1220...") get the same token
+        return self._token("@", value.split("::", 1)[0])
+
+    def anonymize(self, value: Any, party: bool = False) -> Any:
+        """
+        Заменяет parties (по имени аргумента/ключа или формату ID) и cid токенами.
+        """
+        if isinstance(value, str):
+            if party or _PARTY_RE.match(value):
+                return self.party(value)
+            return self._token("#", value) if _CID_RE.match(value) else value
+        if isinstance(value, dict):
+            return {k: self.anonymize(v, party=k in PARTY_KEYS) for k, v in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [self.anonymize(v, party=party) for v in value]
+        return value
+
+    def _learn(self, result: Any) -> None:
+        for record in result if isinstance(result, list) else [result]:
+            if isinstance(record, dict) and isinstance(record.get("payload"), dict):
+                property_id = record["payload"].get("propertyId")
+                if property_id is not None and "contractId" in record:
+                    self._property_ids[record["contractId"]] = property_id
+
+    # =============================
+    # RECORDING
+    # =============================
+
+    def record(self, handler, method: str, arguments: Dict[str, Any], started: float,
+               seconds: float, result: Any = None, error: Optional[BaseException] = None) -> None:
+        """
+        Записывает один вызов.
+        """
+        entry = {
+            "t": round(started, 3),
+            "p": self.party(handler.party or handler.party_hint),
+            "m": method,
+            "a": self.anonymize(arguments),
+            "ms": round(seconds * 1000, 2),
+            "ok": error is None,
+        }
+        cids = [v for v in _strings(arguments) if _CID_RE.match(v)]
+        known = {self._token("#", cid): self._property_ids[cid] for cid in cids if cid in self._property_ids}
+        if known:
+            entry["pid"] = known
+        if error is not None:
+            entry["e"] = type(error).__name__
+        elif method in COMMAND_METHODS:
+            entry["rc"] = [self._token("#", v) for v in _strings(result) if _CID_RE.match(v)]
+        if error is None:
+            self._learn(result)
+        self._write(entry)
+
+    def attach(self, handler) -> None:
+        """
+        Оборачивает методы RECORDED_METHODS экземпляра handler записью в трассу.
+
+        Повторный вызов для копии handler (with_party) заменяет обертки,
+        унаследованные от оригинала, своими.
+        """
+        for name in RECORDED_METHODS:
+            vars(handler).pop(name, None)
+            setattr(handler, name, self._wrap(handler, name, getattr(handler, name)))
+
+    def _wrap(self, handler, name: str, method: Callable):
+        signature = inspect.signature(method)
+
+        @functools.wraps(method)
+        async def recorded(*args, **kwargs):
+            if _recording.get():
+                return await method(*args, **kwargs)
+            try:
+                arguments = signature.bind(*args, **kwargs).arguments
+            except TypeError:
+                return await method(*args, **kwargs)
+            token = _recording.set(True)
+            started, clock = time.time(), time.perf_counter()
+            try:
+                result = await method(*args, **kwargs)
+            except Exception as ex:
+                self.record(handler, name, arguments, started, time.perf_counter() - clock, error=ex)
+                raise
+            finally:
+                _recording.reset(token)
+            self.record(handler, name, arguments, started, time.perf_counter() - clock, result=result)
+            return result
+
+        return recorded
+
+
+def _strings(value: Any):
+    # string leaves in a deterministic order (dict insertion order, list order)
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for v in value.values():
+            yield from _strings(v)
+    elif isinstance(value, (list, tuple)):
+        for v in value:
+            yield from _strings(v)
+
+
+def load_trace(path: str) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """
+    Читает трассу.
+
+    Returns:
+        (заголовок, вызовы по времени начала).
+
+    Raises:
+        ValueError: Если файл не является трассой.
+    """
+    with open(path, encoding="utf-8") as f:
+        header = json.loads(f.readline() or "{}")
+        if header.get("trace") != TRACE_VERSION:
+            raise ValueError(f"{path} is not a version {TRACE_VERSION} trace")
+        entries = [json.loads(line) for line in f if line.strip()]
+    entries.sort(key=lambda e: e["t"])
+    return header, entries
+
+
+def _tokens(value: Any, prefix: str) -> List[str]:
+    return [v for v in _strings(value) if _TOKEN_RE.match(v) and v[0] == prefix]
+
+
+def _substitute(value: Any, mapping: Dict[str, str]) -> Any:
+    if isinstance(value, str):
+        return mapping.get(value, value)
+    if isinstance(value, dict):
+        return {k: _substitute(v, mapping) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_substitute(v, mapping) for v in value]
+    return value
+
+
+class _Unmapped(Exception):
+    pass
+
+
+async def replay_trace(path: str, make_handler: Callable[[str], Any], speed: Optional[float] = 1.0,
+                       concurrency: int = 64, party_prefix: str = "Replay") -> Dict[str, Any]:
+    """
+    Повторяет трассу на леджере (обычно локальном sandbox) и сравнивает задержки.
+
+    Токены parties становятся parties "<party_prefix>-<hex>", которые
+    создаются при необходимости; на каждый party открывается свой handler.
+    Вызовы стартуют в исходном ритме, ускоренном в speed раз (None — без
+    пауз, не более concurrency вызовов одновременно). Cid меняются при
+    каждом choice, поэтому токены cid из rc сопоставляются с cid,
+    созданными повтором той же команды, а вызов, использующий такой cid,
+    ждет завершения команды-источника. Cid, полученные не командой трассы
+    (например, из чтения), заменяются на property_id, если он известен;
+    иначе вызов пропускается.
+
+    Args:
+        path: Файл трассы (TraceRecorder).
+        make_handler: Функция party hint -> неоткрытый RealEstateHandler.
+        speed: Множитель скорости (1 — как в оригинале) или None — максимум.
+        concurrency: Ограничение одновременных вызовов при speed=None.
+        party_prefix: Префикс parties в sandbox.
+
+    Returns:
+        Dict: общие показатели (ops, replayed, skipped, originalSeconds,
+        replaySeconds, maxLagMs) и methods: метод -> {"original", "replay"
+        (сводки benchmark.summarize), "deltaP50Ms", "deltaP95Ms"}.
+
+    Raises:
+        ValueError: Если файл не является трассой или speed <= 0.
+    """
+    if speed is not None and speed <= 0:
+        raise ValueError("speed must be positive (or None for max speed)")
+    _, entries = load_trace(path)
+    if not entries:
+        return {"ops": 0, "replayed": 0, "skipped": 0, "methods": {}}
+
+    party_tokens = list(dict.fromkeys(
+        token for e in entries for token in [e["p"], *_tokens(e["a"], "@")]
+    ))
+    hints = {token: f"{party_prefix}-{token[1:]}" for token in party_tokens}
+    producers: Dict[str, int] = {}
+    for i, entry in enumerate(entries):
+        for token in entry.get("rc", ()):
+            producers.setdefault(token, i)
+    produced = {token: asyncio.Event() for token in producers}
+    cids: Dict[str, str] = {}
+    outcomes: List[Optional[Tuple[float, bool]]] = [None] * len(entries)
+    max_lag = 0.0
+    window = asyncio.Semaphore(max(1, concurrency)) if speed is None else None
+
+    async with contextlib.AsyncExitStack() as stack:
+        setup = await stack.enter_async_context(make_handler(hints[party_tokens[0]]))
+        await setup.allocate_parties_async(list(hints.values()))
+        resolved = await setup.resolve_parties_async(list(hints.values()))
+        parties = {token: resolved.get(hint, hint) for token, hint in hints.items()}
+        handlers = {}
+        for token in dict.fromkeys(e["p"] for e in entries):
+            handlers[token] = await stack.enter_async_context(make_handler(parties[token]))
+
+        async def prepare(i: int, entry: Dict[str, Any]) -> Dict[str, Any]:
+            mapping = dict(parties)
+            arguments = entry["a"]
+            for token in _tokens(arguments, "#"):
+                if token in cids:
+                    mapping[token] = cids[token]
+                    continue
+                if producers.get(token, len(entries)) < i:
+                    await produced[token].wait()
+                    if token in cids:
+                        mapping[token] = cids[token]
+                        continue
+                property_id = entry.get("pid", {}).get(token)
+                if arguments.get("contract_id") == token and property_id is not None:
+                    arguments = dict(arguments, contract_id=None, property_id=property_id)
+                    continue
+                raise _Unmapped(token)
+            return _substitute(arguments, mapping)
+
+        async def run(i: int, entry: Dict[str, Any]) -> None:
+            try:
+                arguments = await prepare(i, entry)
+                async with window or contextlib.nullcontext():
+                    clock = time.perf_counter()
+                    try:
+                        result = await getattr(handlers[entry["p"]], entry["m"])(**arguments)
+                    except Exception:
+                        outcomes[i] = (time.perf_counter() - clock, False)
+                        return
+                    outcomes[i] = (time.perf_counter() - clock, True)
+                for token, cid in zip(entry.get("rc", ()), (v for v in _strings(result) if _CID_RE.match(v))):
+                    cids[token] = cid
+            except _Unmapped:
+                pass
+            finally:
+                for token in entry.get("rc", ()):
+                    if producers[token] == i:
+                        produced[token].set()
+
+        loop = asyncio.get_running_loop()
+        origin, started = entries[0]["t"], loop.time()
+        tasks = []
+        for i, entry in enumerate(entries):
+            if speed is not None:
+                due = started + (entry["t"] - origin) / speed
+                await asyncio.sleep(max(0.0, due - loop.time()))
+                max_lag = max(max_lag, loop.time() - due)
+            tasks.append(asyncio.create_task(run(i, entry)))
+        await asyncio.gather(*tasks)
+        replay_seconds = loop.time() - started
+
+    original_seconds = max(e["t"] + e["ms"] / 1000 for e in entries) - origin
+    methods: Dict[str, Any] = {}
+    for method in dict.fromkeys(e["m"] for e in entries):
+        picked = [(e, outcomes[i]) for i, e in enumerate(entries) if e["m"] == method]
+        original = summarize([e["ms"] / 1000 for e, _ in picked if e["ok"]], original_seconds,
+                             sum(not e["ok"] for e, _ in picked))
+        replayed = [o for _, o in picked if o is not None]
+        replay = summarize([s for s, ok in replayed if ok], replay_seconds,
+                           sum(not ok for _, ok in replayed))
+        replay["skipped"] = len(picked) - len(replayed)
+        methods[method] = {
+            "original": original,
+            "replay": replay,
+            "deltaP50Ms": _delta(original["p50Ms"], replay["p50Ms"]),
+            "deltaP95Ms": _delta(original["p95Ms"], replay["p95Ms"]),
+        }
+    replayed_count = sum(o is not None for o in outcomes)
+    return {
+        "ops": len(entries),
+        "replayed": replayed_count,
+        "skipped": len(entries) - replayed_count,
+        "speed": speed or "max",
+        "originalSeconds": round(original_seconds, 3),
+        "replaySeconds": round(replay_seconds, 3),
+        "maxLagMs": round(max_lag * 1000, 2),
+        "methods": methods,
+    }
+
+
+def _delta(original: Optional[float], replay: Optional[float]) -> Optional[float]:
+    if original is None or replay is None:
+        return None
+    return round(replay - original, 2)
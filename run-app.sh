@@ -9,6 +9,7 @@ set -euo pipefail
 #   UI_PORT (default 8501)
 #   WAIT_FOR_SIGNAL (default yes) passed to daml start
 #   LEDGER_HOST (default localhost) LEDGER_PORT (default 26865) passed to UI
+#   JSON_API_SECRET (default: random per run) key signing JSON API tokens
 
 cd real-estate
 
@@ -62,6 +63,8 @@ fi
 
 export LEDGER_HOST LEDGER_PORT
 export JSON_API_URL="http://localhost:${JSON_API_PORT}"
+# the local sandbox runs without auth and does not verify the signature
+export JSON_API_SECRET="${JSON_API_SECRET:-$(head -c 16 /dev/urandom | od -An -tx1 | tr -d ' \n')}"
 echo "Starting Streamlit UI on port ${UI_PORT} (LEDGER_HOST=${LEDGER_HOST} LEDGER_PORT=${LEDGER_PORT})..."
 cd ..
 
@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+
+from python_client.admission import AdaptiveLimiter, is_overload_error
+
+
+def test_is_overload_error():
+    assert is_overload_error(asyncio.TimeoutError())
+    assert is_overload_error(RuntimeError("RESOURCE_EXHAUSTED: too many requests"))
+    assert not is_overload_error(RuntimeError("INVALID_ARGUMENT"))
+
+
+def test_limit_grows_on_fast_commands_and_shrinks_on_slow_ones():
+    limiter = AdaptiveLimiter(initial=4, tolerance=2.0, backoff=0.5)
+    limiter._record(0.010, False)
+    limiter._record(0.010, False)
+    assert limiter.limit > 4
+    grown = limiter.limit
+    limiter._record(0.050, False)
+    assert limiter.limit == grown * 0.5
+    assert limiter.overloads == 1
+
+
+def test_overload_error_shrinks_limit_and_respects_min():
+    limiter = AdaptiveLimiter(initial=2, min_limit=1, backoff=0.1)
+
+    async def fail():
+        async with limiter.slot():
+            raise RuntimeError("RESOURCE_EXHAUSTED")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(fail())
+    assert limiter.limit == 1
+    assert limiter.in_flight == 0
+
+
+def test_command_errors_do_not_change_limit():
+    limiter = AdaptiveLimiter(initial=4)
+
+    async def fail():
+        async with limiter.slot():
+            raise ValueError("INVALID_ARGUMENT")
+
+    with pytest.raises(ValueError):
+        asyncio.run(fail())
+    assert limiter.limit == 4 and limiter.baseline is None
+
+
+def test_slot_caps_concurrency():
+    limiter = AdaptiveLimiter(initial=3, max_limit=3)
+    active, peak = 0, 0
+
+    async def command():
+        nonlocal active, peak
+        async with limiter.slot():
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+
+    async def run():
+        await asyncio.gather(*(command() for _ in range(10)))
+
+    asyncio.run(run())
+    assert peak == 3
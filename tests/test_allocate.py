@@ -0,0 +1,35 @@
+import asyncio
+from types import SimpleNamespace
+
+from python_client.admission import AdaptiveLimiter
+from python_client.client import RealEstateHandler
+
+
+class FakeClient:
+    def __init__(self, known=()):
+        self.known = known
+        self.active = 0
+        self.peak = 0
+
+    async def list_known_parties(self, timeout=None):
+        return [SimpleNamespace(display_name=name, party=f"{name}-1") for name in self.known]
+
+    async def allocate_party(self, identifier_hint, display_name, timeout=None):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(0.01)
+        self.active -= 1
+        return SimpleNamespace(party=f"{identifier_hint}-1")
+
+
+def test_allocate_parties_respects_admission_limit():
+    handler = RealEstateHandler()
+    handler.client = FakeClient(known=["Alice"])
+    handler.limiter = AdaptiveLimiter(initial=2, max_limit=2)
+    hints = ["Alice"] + [f"P{i}" for i in range(8)]
+
+    created = asyncio.run(handler.allocate_parties_async(hints, concurrency=16))
+
+    assert created == [f"P{i}-1" for i in range(8)]
+    assert handler.client.peak == 2
+    assert handler.limiter.in_flight == 0
@@ -0,0 +1,72 @@
+import json
+
+import pytest
+
+from python_client.attributes import AttributeIndex, parse_predicate
+
+
+def record(cid, area=50, listed=True, **meta):
+    return {
+        "contractId": cid,
+        "payload": {
+            "propertyId": cid.upper(),
+            "propertyType": "apartment",
+            "area": str(area),
+            "listed": listed,
+            "metaJson": json.dumps(meta),
+        },
+    }
+
+
+def make_index():
+    index = AttributeIndex()
+    index.load([
+        record("c1", area=40, rooms=2, geo={"city": "Riga"}),
+        record("c2", area=60, rooms=3),
+        record("c3", area=80, rooms="3+"),
+    ])
+    return index
+
+
+def test_parse_predicate():
+    assert parse_predicate("propertyType=loft") == ("propertyType", "==", "loft")
+    assert parse_predicate(" area >= 50 ") == ("area", ">=", "50")
+    with pytest.raises(ValueError):
+        parse_predicate("area")
+
+
+def test_schema_infers_types_and_shadow_column():
+    schema = make_index().schema()
+    assert schema["meta.rooms"] == "number"
+    assert schema["meta.rooms:string"] == "string"
+    assert schema["meta.geo.city"] == "string"
+
+
+def test_select_ranges_and_equality():
+    index = make_index()
+    assert index.select(["area>=60"]) == {"c2", "c3"}
+    assert index.select(["area<60"]) == {"c1"}
+    assert index.select(["meta.rooms==3", "area>50"]) == {"c2"}
+    assert index.select(["meta.geo.city==Riga"]) == {"c1"}
+    assert index.select(["meta.missing==1"]) == set()
+    assert index.select([]) == {"c1", "c2", "c3"}
+
+
+def test_select_value_of_other_type_uses_shadow_column():
+    index = make_index()
+    assert index.select(["meta.rooms==3+"]) == {"c3"}
+    assert index.select(["meta.rooms!=3+"]) == {"c1", "c2"}
+    assert index.select(["area==big"]) == set()
+
+
+def test_select_rejects_range_on_boolean():
+    with pytest.raises(ValueError):
+        make_index().select(["listed>true"])
+
+
+def test_remove_and_apply():
+    index = make_index()
+    index.apply({"event": "archived", "template": "RealEstate:RealEstate", "contractId": "c2"})
+    index.apply({"event": "created", "template": "RealEstate:RealEstate", **record("c4", area=70, rooms=3)})
+    assert index.select(["meta.rooms==3"]) == {"c4"}
+    assert "c2" not in index and len(index) == 3
@@ -0,0 +1,68 @@
+import asyncio
+import json
+import types
+
+import pytest
+
+import main
+
+
+def test_command_argv_puts_global_options_before_the_subcommand():
+    argv = main.command_argv({"cmd": "list-parties", "party": "Alice"})
+    assert argv == ["--party", "Alice", "list-parties"]
+    assert main.parse_args(argv).party == "Alice"
+
+
+def test_command_argv_keeps_subcommand_options_after_it():
+    argv = main.command_argv({"cmd": "transfer", "property_id": "P-1", "new_owner": "Bob", "party": "Alice"})
+    assert argv == ["transfer", "--property-id", "P-1", "--new-owner", "Bob", "--party", "Alice"]
+    args = main.parse_args(argv)
+    assert (args.party, args.new_owner) == ("Alice", "Bob")
+
+
+def test_command_argv_renders_flags_lists_and_objects():
+    argv = main.command_argv({"cmd": "list", "where": ["a==1", "b>2"], "hedge_reads": True, "as_of": None})
+    assert argv == ["--hedge-reads", "list", "--where", "a==1", "b>2"]
+    argv = main.command_argv({"cmd": "update-meta", "cid": "00ab", "meta_json": {"rooms": 3}, "party": "A"})
+    assert json.loads(argv[argv.index("--meta-json") + 1]) == {"rooms": 3}
+
+
+def test_resolve_refs_unwraps_contract_ids():
+    results = {1: {"contractId": {"contractId": "00ab", "contractType": "RealEstate"}}, 2: [{"x": "y"}]}
+    assert main._resolve_refs({"cid": "$1", "v": ["$2.0.x"], "n": 3}, results) == {"cid": "00ab", "v": ["y"], "n": 3}
+    assert main._line_refs({"cid": "$1", "v": ["$2.0.x", "plain"]}) == {1, 2}
+
+
+class FakeHandler:
+    party = "Alice::1"
+
+    def __init__(self, **_):
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return None
+
+    async def with_party(self, party):
+        return self
+
+    async def list_parties_async(self):
+        return [{"id": self.party}]
+
+
+@pytest.mark.parametrize("cmd", sorted(main.BATCH_UNSUPPORTED))
+def test_streaming_commands_fail_only_their_batch_line(cmd, tmp_path, monkeypatch, capsys):
+    path = tmp_path / "ops.ndjson"
+    ops = [{"cmd": cmd}, {"cmd": "list-parties", "party": "Alice"}]
+    if cmd == "replay":
+        ops[0]["trace_file"] = "trace.ndjson"
+    path.write_text("\n".join(json.dumps(op) for op in ops))
+    monkeypatch.setattr(main, "RealEstateHandler", FakeHandler)
+    args = main.parse_args(["batch", "--file", str(path)])
+    asyncio.run(main.run_batch(args))
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    by_line = {line["line"]: line for line in lines}
+    assert by_line[1]["ok"] is False and "not supported in a batch" in by_line[1]["error"]
+    assert by_line[2] == {"line": 2, "ok": True, "result": [{"id": "Alice::1"}]}
@@ -0,0 +1,30 @@
+from python_client.cid_index import PropertyCidIndex
+
+
+def created(property_id, cid):
+    return {"event": "created", "template": "RealEstate:RealEstate", "contractId": cid,
+            "payload": {"propertyId": property_id}}
+
+
+def archived(cid):
+    return {"event": "archived", "template": "RealEstate:RealEstate", "contractId": cid}
+
+
+def test_apply_tracks_current_cid(tmp_path):
+    index = PropertyCidIndex(str(tmp_path / "cids.json"))
+    index.apply(created("P1", "c1"))
+    # a choice archives the old contract and creates its successor in one transaction
+    index.apply(archived("c1"))
+    index.apply(created("P1", "c2"))
+    assert index.cids == {"P1": "c2"}
+
+
+def test_apply_ignores_archive_of_superseded_cid_and_other_templates(tmp_path):
+    index = PropertyCidIndex(str(tmp_path / "cids.json"))
+    index.apply(created("P1", "c1"))
+    index.apply(created("P1", "c2"))
+    index.apply(archived("c1"))
+    index.apply({**created("P9", "x1"), "template": "Cash:Cash"})
+    assert index.cids == {"P1": "c2"}
+    index.apply(archived("c2"))
+    assert index.cids == {}
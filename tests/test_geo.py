@@ -0,0 +1,51 @@
+import json
+
+from python_client.geo import GeoIndex, coordinates, haversine_km
+
+
+def record(cid, meta):
+    return {"contractId": cid, "payload": {"propertyId": cid.upper(), "metaJson": json.dumps(meta)}}
+
+
+def make_index():
+    index = GeoIndex()
+    index.load([
+        record("berlin", {"geo": {"lat": 52.520, "lon": 13.405}}),
+        record("potsdam", {"latitude": "52.39", "longitude": "13.06"}),
+        record("paris", {"location": [48.857, 2.352]}),
+        record("nowhere", {"rooms": 2}),
+    ])
+    return index
+
+
+def test_coordinates_formats():
+    assert coordinates({"lat": 1, "lng": 2}) == (1.0, 2.0)
+    assert coordinates({"coords": ["3.5", "4.5"]}) == (3.5, 4.5)
+    assert coordinates({"lat": 91, "lon": 0}) is None
+    assert coordinates({"lat": True, "lon": 0}) is None
+
+
+def test_within_sorted_by_distance():
+    index = make_index()
+    assert len(index) == 3 and "nowhere" not in index
+    found = index.within(52.52, 13.40, 30)
+    assert [r["contractId"] for r in found] == ["berlin", "potsdam"]
+    assert found[1]["distanceKm"] == round(haversine_km(52.52, 13.40, 52.39, 13.06), 3)
+    assert [r["contractId"] for r in index.within(52.52, 13.40, 30, limit=1)] == ["berlin"]
+
+
+def test_bbox_across_antimeridian():
+    index = GeoIndex()
+    index.add(record("fiji", {"lat": -17.7, "lon": 179.5}))
+    index.add(record("samoa", {"lat": -13.8, "lon": -172.1}))
+    assert sorted(r["contractId"] for r in index.bbox(-20, 170, -10, -170)) == ["fiji", "samoa"]
+    assert index.bbox(-20, -170, -10, 170) == []
+
+
+def test_clusters_follow_removals():
+    index = make_index()
+    world = index.clusters(0)
+    assert sum(c["count"] for c in world) == 3
+    index.remove("paris")
+    assert sum(c["count"] for c in index.clusters(0)) == 2
+    assert sum(c["count"] for c in index.clusters(3, bbox=(50, 10, 55, 15))) == 2
@@ -0,0 +1,35 @@
+import base64
+import hashlib
+import hmac
+import json
+
+import pytest
+
+from python_client.client import RealEstateHandler
+from python_client.json_api import JsonApiConnection, make_token
+
+
+def decode(segment: str):
+    return json.loads(base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4)))
+
+
+def test_make_token_signs_with_given_secret():
+    token = make_token("app", ["Alice::1"], ["Bob::1"], "k3y")
+    header, claims, signature = token.split(".")
+    expected = hmac.new(b"k3y", f"{header}.{claims}".encode(), hashlib.sha256).digest()
+    assert base64.urlsafe_b64decode(signature + "=" * (-len(signature) % 4)) == expected
+    assert decode(claims)["https://daml.com/ledger-api"]["actAs"] == ["Alice::1"]
+
+
+def test_secret_is_required():
+    with pytest.raises(ValueError):
+        make_token("app", ["Alice::1"], [], "")
+    with pytest.raises(ValueError):
+        JsonApiConnection(party="Alice::1", secret=None)
+
+
+def test_handler_passes_secret_to_json_connection():
+    handler = RealEstateHandler(transport="json", json_api_url="http://ledger:7575", json_api_secret="k3y")
+    conn = handler._connect(party="Alice::1")
+    assert conn.secret == "k3y"
+    assert conn._token(["Alice::1"], ["Alice::1"]) == make_token("real-estate-client", ["Alice::1"], ["Alice::1"], "k3y")
@@ -0,0 +1,73 @@
+import asyncio
+
+from python_client.client import RealEstateHandler
+
+
+def created(offset, property_id, owner):
+    return {"offset": offset, "event": "created", "template": "RealEstate:RealEstate",
+            "contractId": f"{property_id}@{offset}", "payload": {"propertyId": property_id, "owner": owner}}
+
+
+class FakeLedger:
+    def __init__(self):
+        self.events = []
+        self.reads = []
+
+    def end(self):
+        return self.events[-1]["offset"] if self.events else ""
+
+    async def get_ledger_end_async(self):
+        return self.end()
+
+    async def stream_events_async(self, offset=None, templates=None, end_offset=None):
+        self.reads.append(offset)
+        for event in self.events:
+            if (offset is None or event["offset"] > offset) and event["offset"] <= end_offset:
+                yield event
+
+
+def make_handler(ledger):
+    handler = RealEstateHandler()
+    handler.get_ledger_end_async = ledger.get_ledger_end_async
+    handler.stream_events_async = ledger.stream_events_async
+    return handler
+
+
+def test_load_lineage_reads_only_new_transactions():
+    ledger = FakeLedger()
+    handler = make_handler(ledger)
+    ledger.events += [created("01", "P1", "Alice"), created("02", "P2", "Carol")]
+    lineage = asyncio.run(handler.load_lineage_async())
+    assert lineage.history("P1") == []
+
+    ledger.events += [created("03", "P1", "Bob")]
+    lineage = asyncio.run(handler.load_lineage_async(["P1"]))
+    assert [entry["owner"] for entry in lineage.lineage("P1")] == ["Alice", "Bob"]
+    assert lineage.to_dict().keys() == {"P1"}
+
+    asyncio.run(handler.load_lineage_async())
+    assert ledger.reads == [None, "02"]
+
+
+def test_sync_resumes_after_last_complete_transaction():
+    ledger = FakeLedger()
+    ledger.events += [created("01", "P1", "Alice"), created("02", "P1", "Bob"), created("02", "P2", "Carol")]
+    handler = make_handler(ledger)
+
+    async def interrupted(offset=None, templates=None, end_offset=None):
+        yield ledger.events[0]
+        yield ledger.events[1]
+        raise ConnectionError("stream dropped")
+
+    handler.stream_events_async = interrupted
+    try:
+        asyncio.run(handler.lineage.sync(handler))
+    except ConnectionError:
+        pass
+    assert handler.lineage.offset == "01"
+
+    handler.stream_events_async = ledger.stream_events_async
+    lineage = asyncio.run(handler.load_lineage_async())
+    assert ledger.reads == ["01"]
+    assert [entry["owner"] for entry in lineage.lineage("P1")] == ["Alice", "Bob"]
+    assert lineage.history("P2") == [] and lineage.lineage("P2")
@@ -0,0 +1,48 @@
+import asyncio
+
+import pytest
+
+from python_client.json_api import JsonApiError
+from python_client.participants import IncompleteReadError, ParticipantPool
+
+
+def make_pool(**answers):
+    pool = ParticipantPool()
+    for name, answer in answers.items():
+        pool.add(name, answer)
+    return pool
+
+
+async def read(client):
+    if isinstance(client, Exception):
+        raise client
+    return list(client)
+
+
+def test_fanout_merges_by_key():
+    pool = make_pool(a=["c1", "c2"], b=["c2", "c3"])
+    assert sorted(asyncio.run(pool.fanout(read, key=lambda cid: cid))) == ["c1", "c2", "c3"]
+
+
+def test_fanout_reports_missing_endpoints():
+    pool = make_pool(a=["c1"], b=JsonApiError(503, ["down"]))
+    with pytest.raises(IncompleteReadError) as info:
+        asyncio.run(pool.fanout(read, key=lambda cid: cid))
+    assert info.value.missing == ["b"]
+    assert info.value.partial == ["c1"]
+
+
+def test_fanout_still_asks_ejected_endpoints():
+    pool = make_pool(a=["c1"], b=JsonApiError(503, ["down"]))
+    with pytest.raises(IncompleteReadError):
+        asyncio.run(pool.fanout(read, key=lambda cid: cid))
+    # b is ejected from balancing now, but a fanout without it would be incomplete
+    pool.endpoints[1].client = ["c2"]
+    assert sorted(asyncio.run(pool.fanout(read, key=lambda cid: cid))) == ["c1", "c2"]
+
+
+def test_call_fails_over_to_another_endpoint():
+    pool = make_pool(a=JsonApiError(503, ["down"]), b=["c1"])
+    for _ in range(5):
+        assert asyncio.run(pool.call(read)) == ["c1"]
+    assert pool.stats()[0]["healthy"] is False
@@ -0,0 +1,42 @@
+import asyncio
+import re
+
+from python_client.read_model import ReadModel, ReadModelServer
+
+
+async def exchange(request: bytes) -> bytes:
+    server = await asyncio.start_server(ReadModelServer(None, ReadModel()).handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    try:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(request)
+        await writer.drain()
+        writer.write_eof()
+        response = await asyncio.wait_for(reader.read(), 5)
+        writer.close()
+        return response
+    finally:
+        server.close()
+        await server.wait_closed()
+
+
+def statuses(response: bytes):
+    return re.findall(rb"HTTP/1\.1 (\d{3}) ", response)
+
+
+def test_post_body_is_discarded_before_next_request():
+    body = b'{"GET /health HTTP/1.1": 1}'
+    response = asyncio.run(exchange(
+        b"POST /properties HTTP/1.1\r\nContent-Length: %d\r\n\r\n%s" % (len(body), body)
+        + b"GET /health HTTP/1.1\r\n\r\n"
+    ))
+    assert statuses(response) == [b"405", b"200"]
+
+
+def test_chunked_body_closes_connection():
+    response = asyncio.run(exchange(
+        b"PUT /properties HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n4\r\nGET \r\n0\r\n\r\n"
+        + b"GET /health HTTP/1.1\r\n\r\n"
+    ))
+    assert statuses(response) == [b"405"]
+    assert b"Connection: close" in response
@@ -0,0 +1,38 @@
+import pytest
+
+from python_client.reconcile import BucketHashes, bucket_of
+
+
+def record(cid, amount="1"):
+    return {"template": "Cash:Cash", "contractId": cid, "payload": {"amount": amount, "owner": "Alice"}}
+
+
+def test_digest_ignores_insertion_and_key_order():
+    a = BucketHashes.from_records([record("c1"), record("c2")], buckets=8)
+    b = BucketHashes(8)
+    b.add(record("c2"))
+    b.add({"template": "Cash:Cash", "contractId": "c1", "payload": {"owner": "Alice", "amount": "1"}})
+    assert a.root() == b.root()
+    assert a.diff(b) == []
+
+
+def test_diff_names_changed_buckets():
+    ours = BucketHashes.from_records([record("c1"), record("c2"), record("c3")], buckets=8)
+    theirs = BucketHashes.from_records([record("c1"), record("c2", amount="2"), record("c3")], buckets=8)
+    assert ours.root() != theirs.root()
+    assert ours.diff(theirs) == [bucket_of("c2", 8)]
+
+
+def test_discard_restores_previous_state():
+    hashes = BucketHashes.from_records([record("c1")], buckets=8)
+    before = hashes.to_dict()
+    hashes.add(record("c2"))
+    hashes.discard(record("c2"))
+    assert hashes.to_dict() == before
+
+
+def test_dict_round_trip_and_bucket_count_check():
+    hashes = BucketHashes.from_records([record("c1"), record("c2")], buckets=8)
+    assert BucketHashes.from_dict(hashes.to_dict()).diff(hashes) == []
+    with pytest.raises(ValueError):
+        hashes.diff(BucketHashes(16))
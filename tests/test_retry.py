@@ -0,0 +1,47 @@
+import asyncio
+
+import grpc
+
+from python_client.json_api import JsonApiError
+from python_client.retry import command_id, is_duplicate_error, is_resubmittable_error, is_retriable_error
+
+
+class RpcError(grpc.RpcError):
+    def __init__(self, code: grpc.StatusCode, details: str = ""):
+        self._code, self._details = code, details
+
+    def code(self):
+        return self._code
+
+    def __str__(self):
+        return self._details
+
+
+def test_command_id_is_stable_per_key_and_scope():
+    assert command_id("k1", "app", "Alice", "create") == command_id("k1", "app", "Alice", "create")
+    assert command_id("k1", "app", "Alice", "create") != command_id("k1", "app", "Bob", "create")
+    assert command_id("k1", "app", "Alice", "create") != command_id("k2", "app", "Alice", "create")
+    assert command_id("k1", "app").startswith("idem-")
+
+
+def test_command_id_without_key_is_random():
+    assert command_id(None, "app") != command_id(None, "app")
+
+
+def test_is_duplicate_error():
+    assert is_duplicate_error(RpcError(grpc.StatusCode.ALREADY_EXISTS))
+    assert is_duplicate_error(JsonApiError(409, ["DUPLICATE_COMMAND(10,abc): command was already submitted"]))
+    assert is_duplicate_error(RuntimeError("DUPLICATE_COMMAND"))
+    assert not is_duplicate_error(RpcError(grpc.StatusCode.ABORTED, "LOCKED_CONTRACTS"))
+    assert not is_duplicate_error(RuntimeError("boom"))
+
+
+def test_retriable_and_resubmittable_errors():
+    assert is_retriable_error(asyncio.TimeoutError())
+    assert is_retriable_error(RpcError(grpc.StatusCode.ABORTED))
+    assert not is_retriable_error(RpcError(grpc.StatusCode.INVALID_ARGUMENT))
+    # dazl already retries gRPC UNAVAILABLE; ABORTED needs a fresh contract id
+    assert not is_resubmittable_error(RpcError(grpc.StatusCode.UNAVAILABLE))
+    assert not is_resubmittable_error(RpcError(grpc.StatusCode.ABORTED))
+    assert is_resubmittable_error(RpcError(grpc.StatusCode.RESOURCE_EXHAUSTED))
+    assert is_resubmittable_error(JsonApiError(503, ["unavailable"]))
@@ -0,0 +1,48 @@
+import pytest
+
+from python_client.search import TextIndex
+
+
+def record(cid, address, property_type="apartment"):
+    return {"contractId": cid, "payload": {"propertyId": cid.upper(), "address": address,
+                                           "propertyType": property_type}}
+
+
+def make_index():
+    index = TextIndex()
+    index.load([
+        record("p1", "221B Baker Street, London"),
+        record("p2", "10 Downing Street, London", "house"),
+        record("p3", "1 Infinite Loop, Cupertino", "office"),
+    ])
+    return index
+
+
+def cids(results):
+    return [r["contractId"] for r in results]
+
+
+def test_prefix_matches_every_word():
+    index = make_index()
+    assert cids(index.prefix("baker str")) == ["p1"]
+    assert sorted(cids(index.prefix("lon"))) == ["p1", "p2"]
+
+
+def test_substring_and_fuzzy():
+    index = make_index()
+    assert cids(index.substring("ning str")) == ["p2"]
+    assert cids(index.fuzzy("Cupertin0", limit=1)) == ["p3"]
+
+
+def test_auto_falls_back_to_fuzzy():
+    assert cids(make_index().search("infinte loop", limit=1)) == ["p3"]
+    with pytest.raises(ValueError):
+        make_index().search("x", mode="regex")
+
+
+def test_events_update_the_index():
+    index = make_index()
+    index.apply({"event": "archived", "template": "RealEstate:RealEstate", "contractId": "p1"})
+    index.apply({"event": "created", "template": "RealEstate:RealEstate", **record("p4", "5 Baker Street")})
+    assert cids(index.prefix("baker")) == ["p4"]
+    assert "p1" not in index and len(index) == 3
@@ -0,0 +1,36 @@
+import pytest
+
+from python_client.client import select_coins
+
+
+def coin(cid, amount, currency="USD", issuer="Bank"):
+    return {"contractId": cid, "payload": {"amount": amount, "currency": currency, "issuer": issuer}}
+
+
+HOLDINGS = [coin("c10", "10.0"), coin("c25", "25.0"), coin("c40", "40.0"), coin("e50", "50.0", currency="EUR")]
+
+
+def test_exact_coin_needs_no_transaction():
+    assert select_coins(HOLDINGS, "25", "USD") == {"action": "exact", "cids": ["c25"], "total": "25.0"}
+
+
+def test_smallest_larger_coin_is_split():
+    assert select_coins(HOLDINGS, "30", "USD") == {"action": "split", "cids": ["c40"], "total": "40.0"}
+
+
+def test_largest_coins_are_merged():
+    assert select_coins(HOLDINGS, "65", "USD") == {"action": "merge", "cids": ["c40", "c25"], "total": "65.0"}
+    assert select_coins(HOLDINGS, "70", "USD") == {"action": "merge_split", "cids": ["c40", "c25", "c10"],
+                                                   "total": "75.0"}
+
+
+def test_merge_uses_a_single_issuer():
+    holdings = [coin("a30", "30", issuer="A"), coin("b20", "20", issuer="B"), coin("b15", "15", issuer="B")]
+    assert select_coins(holdings, "35", "USD")["cids"] == ["b20", "b15"]
+    with pytest.raises(ValueError):
+        select_coins(holdings, "50", "USD")
+
+
+def test_insufficient_funds():
+    with pytest.raises(ValueError):
+        select_coins(HOLDINGS, "60", "EUR")
@@ -0,0 +1,16 @@
+from dazl._gen.com.daml.ledger.api.v1 import event_pb2
+
+from python_client.client import is_stakeholder
+
+
+def test_created_event_of_a_stakeholder_is_visible():
+    event = event_pb2.CreatedEvent(signatories=["Registrar::1"], observers=["Buyer::1"])
+    assert is_stakeholder(event, {"Buyer::1"})
+    assert is_stakeholder(event, {"Registrar::1"})
+
+
+def test_witnessed_create_is_not_visible():
+    # Transfer run by the old owner: the new RealEstate is in the old owner's tree,
+    # but only the registrar and the new owner are stakeholders
+    event = event_pb2.CreatedEvent(signatories=["Registrar::1"], observers=["Buyer::1"])
+    assert not is_stakeholder(event, {"Seller::1"})
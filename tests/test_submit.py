@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+
+from python_client.admission import AdaptiveLimiter
+from python_client.client import RealEstateHandler
+from python_client.json_api import JsonApiError
+from python_client.retry import DuplicateCommandError
+
+
+def make_handler(tree=None):
+    handler = RealEstateHandler.__new__(RealEstateHandler)
+    handler.app_name, handler.party, handler.retries = "app", "Alice::1", 3
+    handler.limiter = AdaptiveLimiter()
+    handler.trees = []
+
+    async def committed_tree(cmd_id):
+        handler.trees.append(cmd_id)
+        return tree
+
+    handler._committed_tree = committed_tree
+    return handler
+
+
+def sender(*errors):
+    sent = []
+
+    async def send(cmd_id):
+        sent.append(cmd_id)
+        if len(sent) <= len(errors):
+            raise errors[len(sent) - 1]
+        return "created"
+
+    return send, sent
+
+
+async def decode(tree):
+    return f"from {tree}"
+
+
+def test_retry_keeps_the_command_id(monkeypatch):
+    monkeypatch.setattr("python_client.client.backoff_delay", lambda attempt: 0)
+    send, sent = sender(JsonApiError(504, ["timed out"]))
+    assert asyncio.run(make_handler()._submit(send, "key", "create")) == "created"
+    assert len(sent) == 2 and sent[0] == sent[1]
+
+
+def test_duplicate_on_retry_returns_the_committed_result(monkeypatch):
+    # the timed out attempt did commit: the retry sees ALREADY_EXISTS
+    monkeypatch.setattr("python_client.client.backoff_delay", lambda attempt: 0)
+    handler = make_handler(tree="tx-1")
+    send, sent = sender(JsonApiError(504, ["timed out"]), JsonApiError(409, ["DUPLICATE_COMMAND"]))
+    assert asyncio.run(handler._submit(send, "key", "create", committed=decode)) == "from tx-1"
+    assert handler.trees == [sent[0]]
+
+
+def test_duplicate_on_first_attempt_is_an_earlier_submission(monkeypatch):
+    handler = make_handler(tree="tx-1")
+    send, _ = sender(JsonApiError(409, ["DUPLICATE_COMMAND"]))
+    with pytest.raises(DuplicateCommandError):
+        asyncio.run(handler._submit(send, "key", "create", committed=decode))
+    assert handler.trees == []
+
+
+def test_duplicate_on_retry_without_the_transaction_raises(monkeypatch):
+    monkeypatch.setattr("python_client.client.backoff_delay", lambda attempt: 0)
+    send, _ = sender(JsonApiError(504, ["timed out"]), JsonApiError(409, ["DUPLICATE_COMMAND"]))
+    with pytest.raises(DuplicateCommandError):
+        asyncio.run(make_handler(tree=None)._submit(send, "key", "create", committed=decode))
+
+
+def test_aborted_is_not_resubmitted():
+    send, sent = sender(JsonApiError(409, ["LOCKED_CONTRACTS"]))
+    with pytest.raises(JsonApiError):
+        asyncio.run(make_handler()._submit(send, None, "exercise"))
+    assert len(sent) == 1
@@ -0,0 +1,29 @@
+from dazl.damlast.lookup import parse_type_con_name
+from dazl.ledger.api_types import ContractId, ExerciseCommand
+
+from python_client.transaction import TransactionBuilder
+
+
+class Handler:
+    @staticmethod
+    def _contract_id(contract_id, template="RealEstate"):
+        return ContractId(parse_type_con_name(f"*:RealEstate:{template}"), contract_id)
+
+
+def test_update_listing_is_one_command():
+    tx = TransactionBuilder(Handler())
+    assert tx.update_listing("00ab", "100.0", "USD", '{"rooms": 3}') == 0
+    (command,) = tx.commands
+    assert isinstance(command, ExerciseCommand)
+    assert command.choice == "UpdateListing"
+    assert command.argument == {"newPrice": "100.0", "newCurrency": "USD", "newMetaJson": '{"rooms": 3}'}
+
+
+def test_mint_and_buy_acts_as_buyer_and_seller():
+    tx = TransactionBuilder(Handler())
+    tx.mint_and_buy("00ab", "250.0", "USD", buyer="Buyer::1", seller="Seller::1", issuer="Seller::1")
+    (command,) = tx.commands
+    assert command.choice == "MintAndBuy"
+    assert command.argument == {"offeredPrice": "250.0", "offeredCurrency": "USD",
+                                "buyer": "Buyer::1", "issuer": "Seller::1"}
+    assert tx.act_as == ["Buyer::1", "Seller::1"]
@@ -0,0 +1,60 @@
+import asyncio
+import json
+
+import main
+
+
+class WatchHandler:
+    party = "Alice::1"
+
+    def __init__(self, **_):
+        self.stream_calls = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return None
+
+    async def resolve_parties_async(self, hints):
+        return {hint: hint for hint in hints}
+
+    async def get_ledger_end_async(self):
+        return "0009"
+
+    async def iter_snapshot_async(self, templates):
+        yield {"template": "RealEstate:RealEstate", "contractId": "old", "payload": {"propertyId": "P-1", "owner": "Alice"}}
+        yield {"offset": "0005"}
+
+    async def stream_events_async(self, offset=None, templates=(), end_offset=None):
+        self.stream_calls.append((offset, end_offset))
+        if end_offset is not None:
+            # replay up to a resume offset
+            yield {"event": "created", "contractId": "old", "payload": {"propertyId": "P-1", "owner": "Alice"}}
+            return
+        yield {"event": "archived", "contractId": "old", "choice": "Transfer", "actingParties": ["Alice"]}
+
+
+def watch(monkeypatch, capsys, *argv):
+    handler = WatchHandler()
+    monkeypatch.setattr(main, "RealEstateHandler", lambda **_: handler)
+    asyncio.run(main.run_watch(main.parse_args(["watch", *argv])))
+    return handler, [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+
+def test_watch_filters_archives_of_contracts_created_before_it_started(monkeypatch, capsys):
+    handler, events = watch(monkeypatch, capsys, "--property-id", "P-1")
+    assert [e["contractId"] for e in events] == ["old"]
+    # the stream continues from the snapshot offset, not from a later ledger end
+    assert handler.stream_calls == [("0005", None)]
+
+
+def test_watch_resumed_at_an_offset_replays_the_contracts_alive_there(monkeypatch, capsys):
+    handler, events = watch(monkeypatch, capsys, "--property-id", "P-1", "--offset", "0003")
+    assert [e["contractId"] for e in events] == ["old"]
+    assert handler.stream_calls == [(None, "0003"), ("0003", None)]
+
+
+def test_watch_without_filters_starts_at_ledger_end(monkeypatch, capsys):
+    handler, events = watch(monkeypatch, capsys)
+    assert handler.stream_calls == [("0009", None)]
@@ -1,12 +1,16 @@
 import asyncio
+import decimal
 import os
 import sys
 import traceback
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 import streamlit as st
 
 from python_client.client import DEFAULT_LEDGER_HOST, DEFAULT_LEDGER_PORT, RealEstateHandler
+from python_client.wallet import WalletIndex
+
+LEDGER_TIMEOUT = float(os.getenv("LEDGER_TIMEOUT", "10"))  # seconds per ledger call
 
 st.set_page_config(page_title="Canton Real Estate", layout="wide")
 
@@ -231,13 +235,27 @@ def current_party() -> str:
   return st.session_state["current_party"]
 
 
-def run_with_handler(party_hint: str, action):
+def run_with_handler(party_hint: str, action, read_as: Optional[List[str]] = None):
   async def _run():
-    async with RealEstateHandler(host=host, port=int(port), party=party_hint) as handler:
+    async with RealEstateHandler(
+      host=host, port=int(port), party=party_hint, read_as=read_as,
+      timeout=LEDGER_TIMEOUT, hedge_reads=True,
+    ) as handler:
       return await action(handler)
   return asyncio.run(_run())
 
 
+def load_page_data(view_parties: List[str]):
+  async def action(h):
+    return await h.list_parties_async(), await h.load_party_views_async()
+  try:
+    return run_with_handler(view_parties[0], action, read_as=view_parties[1:])
+  except Exception as ex:
+    traceback.print_exc(file=sys.stderr)
+    st.error(f"Failed to load ledger data: {ex}")
+    return [], {}
+
+
 def load_properties(view_party: str) -> List[Dict[str, Any]]:
   try:
     return run_with_handler(view_party, lambda h: h.list_properties_async())
@@ -265,6 +283,9 @@ def load_cash(view_party: str) -> List[Dict[str, Any]]:
     return []
 
 
+_AUTO_PAYMENT = "auto"
+
+
 def price_display(payload: Dict[str, Any]) -> str:
   price = payload.get("price")
   currency = payload.get("currency", "")
@@ -340,9 +361,24 @@ elif role == "Registrar":
   set_current_party("Registrar")
 
 # Market snapshot for dashboard
-known_parties = load_parties(market_party)
+page_parties = list(dict.fromkeys([
+  market_party,
+  st.session_state.get("registrar-party", "Registrar"),
+  st.session_state.get("seller-party", current_party()),
+  st.session_state.get("buyer-party", current_party()),
+]))
+known_parties, party_views = load_page_data(page_parties)
 known_party_ids = [p["id"] for p in known_parties]
-market_props = load_properties(market_party)
+
+
+def party_view(view_party: str) -> Dict[str, List[Dict[str, Any]]]:
+  if view_party not in party_views:
+    # party picked in this run that was not known when the page data was loaded
+    party_views[view_party] = {"properties": load_properties(view_party), "cash": load_cash(view_party)}
+  return party_views[view_party]
+
+
+market_props = party_view(market_party)["properties"]
 listed_props = [p for p in market_props if p.get("payload", {}).get("listed")]
 stat_cols = st.columns(4)
 stat_cols[0].markdown(f"<div class='stat'><div class='label'>Total properties (view)</div><div class='value'>{len(market_props)}</div></div>", unsafe_allow_html=True)
@@ -418,7 +454,7 @@ with tab_registrar:
 with tab_seller:
   st.markdown("#### Seller workspace")
   seller_party = select_party("Seller party", current_party(), "seller-party", known_party_ids)
-  seller_props = [p for p in load_properties(seller_party) if p.get("payload", {}).get("owner") == seller_party]
+  seller_props = [p for p in party_view(seller_party)["properties"] if p.get("payload", {}).get("owner") == seller_party]
   seller_listed = [p for p in seller_props if p.get("payload", {}).get("listed")]
   st.markdown(f"<div class='chip'>Owned: {len(seller_props)} • Listed: {len(seller_listed)}</div>", unsafe_allow_html=True)
   if not seller_props:
@@ -436,6 +472,7 @@ with tab_seller:
           "price": price_display(payload),
           "listed": payload.get("listed"),
           "history": payload.get("history"),
+          "transfers": payload.get("transferCount"),
         })
         with st.form(f"seller-actions-{cid}"):
           col1, col2, col3 = st.columns([1, 1, 1])
@@ -472,7 +509,9 @@ with tab_seller:
 with tab_buyer:
   st.markdown("#### Buyer workspace")
   buyer_party = select_party("Buyer party", current_party(), "buyer-party", known_party_ids)
-  buyer_cash = load_cash(buyer_party)
+  buyer_cash = party_view(buyer_party)["cash"]
+  buyer_wallet = WalletIndex()
+  buyer_wallet.load(buyer_cash)
   wallet_cols = st.columns(2)
   with wallet_cols[0]:
     st.markdown("Wallet")
@@ -539,28 +578,24 @@ with tab_buyer:
       cols[2].markdown(f"Price: {price_display(payload)}")
       cols[3].markdown(f"Owner: `{payload.get('owner')}`")
 
-      eligible_cash = [
-        c for c in buyer_cash
-        if c["payload"].get("currency") == payload.get("currency")
-        and str(c["payload"].get("amount")) == str(payload.get("price"))
-      ]
+      listing_currency = payload.get("currency", "USD")
+      exact_cid = buyer_wallet.find_exact(buyer_party, listing_currency, str(payload.get("price", "0")))
+      balance = buyer_wallet.balance(buyer_party, listing_currency)
       with st.form(f"buy-{cid}"):
-        st.caption("Purchase: buyer + seller co-sign (cash + property)")
+        st.caption(f"Purchase: buyer + seller co-sign (cash + property) • Wallet: {balance} {listing_currency}")
         seller_party = payload.get("owner")
-        payment_cid = None
-        if eligible_cash:
-          payment_cid = st.selectbox(
-            "Pick payment (exact amount)",
-            options=[c["contractId"] for c in eligible_cash],
-            format_func=lambda cid_opt: f"{cid_opt} ({eligible_cash[[c['contractId'] for c in eligible_cash].index(cid_opt)]['payload']['amount']} {payload.get('currency')})",
-            key=f"pay-{cid}",
-          )
-        else:
-          st.info("No matching cash: mint exact amount/currency first.")
+        payment_cid = st.selectbox(
+          "Payment",
+          options=[_AUTO_PAYMENT] + ([exact_cid] if exact_cid else []),
+          format_func=lambda opt: "Auto-select from wallet (split/merge if needed)" if opt == _AUTO_PAYMENT else f"{opt} (exact amount)",
+          key=f"pay-{cid}",
+        )
         buy_btn = st.form_submit_button("Buy property")
         if buy_btn:
-          if not payment_cid:
-            st.error("Cash with exact price/currency is required.")
+          if payment_cid == _AUTO_PAYMENT:
+            payment_cid = None
+          if payment_cid is None and balance < decimal.Decimal(str(payload.get("price", "0"))):
+            st.error("Insufficient funds: mint cash in this currency first.")
           else:
             try:
               resp = run_with_handler(
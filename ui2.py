@@ -13,6 +13,10 @@ from plotly.subplots import make_subplots
 import pandas as pd
 
 from python_client.client import DEFAULT_LEDGER_HOST, DEFAULT_LEDGER_PORT, RealEstateHandler
+from python_client.geo import GeoIndex
+from python_client.search import MODES, TextIndex
+
+LEDGER_TIMEOUT = float(os.getenv("LEDGER_TIMEOUT", "10"))  # seconds per ledger call
 
 # Page configuration
 st.set_page_config(
@@ -229,7 +233,10 @@ def current_party() -> str:
 def run_with_handler(party_hint: str, action):
     """Execute an action with a RealEstateHandler"""
     async def _run():
-        async with RealEstateHandler(host=host, port=int(port), party=party_hint) as handler:
+        async with RealEstateHandler(
+            host=host, port=int(port), party=party_hint,
+            timeout=LEDGER_TIMEOUT, hedge_reads=True,
+        ) as handler:
             return await action(handler)
     return asyncio.run(_run())
 
@@ -260,6 +267,20 @@ def load_cash(view_party: str, _host: str, _port: int) -> List[Dict[str, Any]]:
         st.error(f"Failed to load wallet: {ex}")
         return []
 
+def search_index(view_party: str, properties: List[Dict[str, Any]]) -> TextIndex:
+    """Text index of the viewed properties, updated only for changed contracts"""
+    indexes = st.session_state.setdefault("search_indexes", {})
+    index = indexes.setdefault(view_party, TextIndex())
+    index.load(properties)
+    return index
+
+def geo_index(view_party: str, properties: List[Dict[str, Any]]) -> GeoIndex:
+    """Spatial index of the viewed properties, updated only for changed contracts"""
+    indexes = st.session_state.setdefault("geo_indexes", {})
+    index = indexes.setdefault(view_party, GeoIndex())
+    index.load(properties)
+    return index
+
 def format_price(price: Any, currency: str) -> str:
     """Format price with currency"""
     if price is None:
@@ -405,4 +426,46 @@ market_stats = calculate_market_stats(properties)
 # Main navigation tabs
 tab_dashboard, tab_marketplace, tab_portfolio, tab_wallet, tab_admin = st.tabs([
     "📊 Dashboard", "🏪 Marketplace", "📁 Portfolio", "💰 Wallet", "⚙️ Admin"
-])
\ No newline at end of file
+])
+
+with tab_dashboard:
+    st.markdown("### 🗺️ Property Map")
+    geo = geo_index(market_party, properties)
+    if not len(geo):
+        st.info("No properties with coordinates in metaJson (lat/lon)")
+    else:
+        zoom = st.slider("Zoom", min_value=0, max_value=14, value=4)
+        clusters = geo.clusters(zoom)
+        map_fig = px.scatter_mapbox(
+            pd.DataFrame(clusters), lat="lat", lon="lon", size="count", hover_data=["count"],
+            zoom=zoom, size_max=40, height=500,
+        )
+        map_fig.update_layout(mapbox_style="open-street-map", margin=dict(l=0, r=0, t=0, b=0))
+        st.plotly_chart(map_fig, use_container_width=True)
+        st.caption(f"{len(geo)} geotagged properties in {len(clusters)} clusters")
+
+with tab_marketplace:
+    st.markdown("### 🔎 Search Properties")
+    col_query, col_mode = st.columns([4, 1])
+    with col_query:
+        search_query = st.text_input("Search", placeholder="Address, property ID or type",
+                                     label_visibility="collapsed")
+    with col_mode:
+        search_mode = st.selectbox("Mode", options=list(MODES), label_visibility="collapsed")
+
+    if search_query.strip():
+        matches = search_index(market_party, properties).search(search_query, limit=50, mode=search_mode)
+        if matches:
+            st.dataframe(pd.DataFrame([
+                {
+                    "Property ID": m["payload"].get("propertyId"),
+                    "Type": m["payload"].get("propertyType"),
+                    "Address": m["payload"].get("address"),
+                    "Price": format_price(m["payload"].get("price"), m["payload"].get("currency", "")),
+                    "Listed": bool(m["payload"].get("listed")),
+                    "Score": m["score"],
+                }
+                for m in matches
+            ]), use_container_width=True, hide_index=True)
+        else:
+            st.info("No properties match the search")